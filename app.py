@@ -7,16 +7,20 @@ and Custom GPT Actions API with a web interface for file uploads.
 
 import os
 import logging
-from flask import Flask, render_template, request, jsonify, send_from_directory, redirect, url_for, flash
+from flask import Flask, Request, render_template, request, jsonify, send_from_directory, redirect, url_for, flash
 from werkzeug.utils import secure_filename
 from pathlib import Path
 import threading
+import multiprocessing
 from datetime import datetime
 
 from config import Config
 from services.file_processor import FileProcessor
 from services.aggregator import Aggregator
 from services.file_watcher import FileWatcher
+from services.catalog import DocumentCatalog
+from services.upload_store import ALLOWED_EXTENSIONS, HashingSpoolFile, unique_upload_path
+from services.upload_sessions import UploadSessionStore, UploadSessionError
 from services.actions_api import ActionsAPI, OPENAPI_SPEC
 
 # Configure logging
@@ -31,9 +35,40 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Endpoints that accept whole archives instead of single documents
+BULK_UPLOAD_ENDPOINTS = {'bulk_upload'}
+
+class UploadRequest(Request):
+    """Request that spools multipart file parts straight into the upload directory while hashing them."""
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        spool = HashingSpoolFile(Config.UPLOAD_DIR)
+        self.__dict__.setdefault('_upload_spools', []).append(spool)
+        return spool
+    
+    @property
+    def max_content_length(self):
+        if self.endpoint in BULK_UPLOAD_ENDPOINTS:
+            return Config.MAX_BULK_UPLOAD_SIZE
+        return super().max_content_length
+    
+    @property
+    def max_form_parts(self):
+        if self.endpoint in BULK_UPLOAD_ENDPOINTS:
+            return Config.MAX_BULK_UPLOAD_FILES + 1
+        return Request.max_form_parts
+    
+    def close(self):
+        super().close()
+        # Spools that were not moved into place (rejected or unused) are removed
+        for spool in self.__dict__.get('_upload_spools', []):
+            if spool.path.exists():
+                spool.discard()
+
 def create_app():
     """Application factory function."""
     app = Flask(__name__)
+    app.request_class = UploadRequest
     
     # Configuration
     app.config.update(
@@ -45,8 +80,10 @@ def create_app():
     # Initialize services
     file_processor = FileProcessor()
     aggregator = Aggregator()
-    file_watcher = FileWatcher()
-    actions_api = ActionsAPI(app)
+    file_watcher = FileWatcher(file_processor)
+    actions_api = ActionsAPI(app, file_processor=file_processor)
+    catalog = DocumentCatalog()
+    upload_sessions = UploadSessionStore()
     
     # Ensure directories exist
     Config.UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -56,6 +93,8 @@ def create_app():
     # Start file watcher in background
     def start_file_watcher():
         try:
+            catalog.sync_with_directory(Config.RAG_DATA_DIR)
+            upload_sessions.expire_stale()
             file_watcher.process_existing_files()
             file_watcher.start()
             logger.info("File watcher started successfully")
@@ -66,13 +105,39 @@ def create_app():
     watcher_thread = threading.Thread(target=start_file_watcher, daemon=True)
     watcher_thread.start()
     
+    def store_upload(file, filename):
+        """
+        Moves an uploaded file into the upload directory unless its content is already known
+        
+        Returns:
+            (file_path, duplicate) - file_path is None for duplicates
+        """
+        spool = file.stream
+        if not isinstance(spool, HashingSpoolFile):
+            spool = HashingSpoolFile.from_stream(file.stream, Config.UPLOAD_DIR)
+        spool.close()
+        
+        file_hash = spool.hexdigest()
+        file_path = unique_upload_path(Config.UPLOAD_DIR, filename)
+        
+        if not file_processor.claim_upload_hash(file_path, file_hash, spool.size):
+            spool.discard()
+            return None, True
+        
+        # Atomic rename: the watcher only ever sees the complete file
+        try:
+            return spool.move_to(file_path), False
+        except Exception:
+            file_processor.release_upload_hash(file_path)
+            raise
+    
     # Routes
     @app.route('/')
     def index():
         """Main upload interface."""
         try:
             # Get some stats for the dashboard
-            total_files = len(list(Config.RAG_DATA_DIR.glob('*.md')))
+            total_files = catalog.count()
             knowledge_base = aggregator.get_structured_knowledge()
             total_categories = len(knowledge_base) if knowledge_base else 0
             
@@ -110,29 +175,21 @@ def create_app():
                     return redirect(url_for('index'))
                 
                 # Check file extension
-                allowed_extensions = {'.pdf', '.docx', '.txt', '.html', '.md', '.htm'}
                 file_ext = Path(filename).suffix.lower()
                 
-                if file_ext not in allowed_extensions:
+                if file_ext not in ALLOWED_EXTENSIONS:
                     flash(f'Unsupported file type: {file_ext}', 'error')
                     return redirect(url_for('index'))
                 
-                # Save file to upload directory
-                file_path = Config.UPLOAD_DIR / filename
-                
-                # Handle duplicate filenames
-                counter = 1
-                original_path = file_path
-                while file_path.exists():
-                    stem = original_path.stem
-                    suffix = original_path.suffix
-                    file_path = Config.UPLOAD_DIR / f"{stem}_{counter}{suffix}"
-                    counter += 1
-                
-                file.save(str(file_path))
+                # Hash while streaming; duplicates never reach the upload directory
+                file_path, duplicate = store_upload(file, filename)
                 
-                flash(f'File uploaded successfully: {file_path.name}', 'success')
-                logger.info(f"File uploaded via web interface: {file_path}")
+                if duplicate:
+                    flash(f'File already indexed: {filename}', 'info')
+                    logger.info(f"Duplicate upload rejected via web interface: {filename}")
+                else:
+                    flash(f'File uploaded successfully: {file_path.name}', 'success')
+                    logger.info(f"File uploaded via web interface: {file_path}")
                 
                 return redirect(url_for('index'))
                 
@@ -166,32 +223,30 @@ def create_app():
                 }), 400
             
             # Check file extension
-            allowed_extensions = {'.pdf', '.docx', '.txt', '.html', '.md', '.htm'}
             file_ext = Path(filename).suffix.lower()
             
-            if file_ext not in allowed_extensions:
+            if file_ext not in ALLOWED_EXTENSIONS:
                 return jsonify({
                     'success': False,
                     'error': f'Unsupported file type: {file_ext}',
-                    'supported_types': list(allowed_extensions)
+                    'supported_types': list(ALLOWED_EXTENSIONS)
                 }), 400
             
-            # Save file
-            file_path = Config.UPLOAD_DIR / filename
+            # Hash while streaming; duplicates never reach the upload directory
+            file_path, duplicate = store_upload(file, filename)
             
-            # Handle duplicates
-            counter = 1
-            original_path = file_path
-            while file_path.exists():
-                stem = original_path.stem
-                suffix = original_path.suffix
-                file_path = Config.UPLOAD_DIR / f"{stem}_{counter}{suffix}"
-                counter += 1
-            
-            file.save(str(file_path))
+            if duplicate:
+                return jsonify({
+                    'success': True,
+                    'duplicate': True,
+                    'message': 'File already indexed',
+                    'filename': filename,
+                    'timestamp': datetime.now().isoformat()
+                })
             
             return jsonify({
                 'success': True,
+                'duplicate': False,
                 'message': 'File uploaded successfully',
                 'filename': file_path.name,
                 'timestamp': datetime.now().isoformat()
@@ -204,41 +259,142 @@ def create_app():
                 'error': str(e)
             }), 500
     
+    @app.route('/api/upload/sessions', methods=['POST'])
+    def api_create_upload_session():
+        """Start a resumable chunked upload."""
+        data = request.get_json(silent=True) or {}
+        filename = secure_filename(str(data.get('filename', '')))
+        if not filename:
+            return jsonify({
+                'success': False,
+                'error': 'Invalid filename'
+            }), 400
+        
+        file_ext = Path(filename).suffix.lower()
+        if file_ext not in ALLOWED_EXTENSIONS:
+            return jsonify({
+                'success': False,
+                'error': f'Unsupported file type: {file_ext}',
+                'supported_types': list(ALLOWED_EXTENSIONS)
+            }), 400
+        
+        try:
+            session = upload_sessions.create(filename, int(data.get('size', 0)))
+        except (UploadSessionError, TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({'success': True, **session}), 201
+    
+    @app.route('/api/upload/sessions/<upload_id>', methods=['GET'])
+    def api_upload_session_status(upload_id):
+        """Report received chunks so an interrupted upload can resume."""
+        session = upload_sessions.get(upload_id)
+        if session is None:
+            return jsonify({
+                'success': False,
+                'error': 'Upload session not found'
+            }), 404
+        
+        return jsonify({'success': True, **session})
+    
+    @app.route('/api/upload/sessions/<upload_id>/chunks/<int:index>', methods=['PUT'])
+    def api_upload_chunk(upload_id, index):
+        """Store one chunk; the request body is the raw chunk data."""
+        try:
+            session = upload_sessions.write_chunk(
+                upload_id, index, request.stream, request.headers.get('X-Chunk-SHA256')
+            )
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'error': 'Upload session not found'
+            }), 404
+        except UploadSessionError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        return jsonify({
+            'success': True,
+            'chunk': index,
+            'received': len(session['received_chunks']),
+            'chunk_count': session['chunk_count']
+        })
+    
+    @app.route('/api/upload/sessions/<upload_id>/complete', methods=['POST'])
+    def api_complete_upload_session(upload_id):
+        """Verify the assembled file (optional whole-file sha256) and hand it to the watcher."""
+        data = request.get_json(silent=True) or {}
+        
+        try:
+            session, file_hash = upload_sessions.verify(upload_id, data.get('sha256'))
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'error': 'Upload session not found'
+            }), 404
+        except UploadSessionError as e:
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+        
+        file_path = unique_upload_path(Config.UPLOAD_DIR, session['filename'])
+        if not file_processor.claim_upload_hash(file_path, file_hash, session['total_size']):
+            upload_sessions.discard(upload_id)
+            return jsonify({
+                'success': True,
+                'duplicate': True,
+                'message': 'File already indexed',
+                'filename': session['filename'],
+                'timestamp': datetime.now().isoformat()
+            })
+        
+        try:
+            upload_sessions.move_to(upload_id, file_path)
+        except Exception:
+            file_processor.release_upload_hash(file_path)
+            raise
+        logger.info(f"Chunked upload completed: {file_path}")
+        
+        return jsonify({
+            'success': True,
+            'duplicate': False,
+            'message': 'File uploaded successfully',
+            'filename': file_path.name,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    @app.route('/api/upload/sessions/<upload_id>', methods=['DELETE'])
+    def api_abort_upload_session(upload_id):
+        """Abort an upload and delete its chunks."""
+        upload_sessions.discard(upload_id)
+        return jsonify({'success': True})
+    
     @app.route('/dashboard')
     def dashboard():
         """Dashboard with system status and file management."""
         try:
-            # Get processed files
-            rag_files = list(Config.RAG_DATA_DIR.glob('*.md'))
-            
-            files_info = []
-            for file_path in rag_files[:20]:  # Limit to 20 most recent
-                try:
-                    content = file_path.read_text(encoding='utf-8')
-                    if content.startswith('---'):
-                        frontmatter_end = content.find('---', 3)
-                        if frontmatter_end > 0:
-                            frontmatter = content[3:frontmatter_end].strip()
-                            metadata = {}
-                            for line in frontmatter.split('\n'):
-                                if ':' in line:
-                                    key, value = line.split(':', 1)
-                                    metadata[key.strip()] = value.strip()
-                            
-                            files_info.append({
-                                'filename': file_path.name,
-                                'original_file': metadata.get('original_file', 'unknown'),
-                                'processed_date': metadata.get('processed_date', 'unknown'),
-                                'file_type': metadata.get('file_type', 'unknown')
-                            })
-                except Exception as e:
-                    logger.warning(f"Could not read metadata from {file_path}: {e}")
+            # Most recently processed files from the metadata catalog
+            files_info = [
+                {
+                    'filename': document['rag_filename'],
+                    'original_file': document['original_filename'],
+                    'processed_date': document['processed_at'] or 'unknown',
+                    'file_type': document['mime_type'] or 'unknown'
+                }
+                for document in catalog.recent_documents(limit=20)
+            ]
             
             # Get knowledge base stats
             knowledge_base = aggregator.get_structured_knowledge()
             
             stats = {
-                'total_files': len(rag_files),
+                'total_files': catalog.count(),
                 'total_categories': len(knowledge_base) if knowledge_base else 0,
                 'knowledge_base': knowledge_base,
                 'watcher_running': file_watcher.is_running(),
@@ -276,7 +432,8 @@ def create_app():
                     'upload_dir': Config.UPLOAD_DIR.exists(),
                     'rag_dir': Config.RAG_DATA_DIR.exists(),
                     'knowledge_base_dir': Config.KNOWLEDGE_BASE_DIR.exists()
-                }
+                },
+                'quarantined_files': catalog.count_quarantined()
             }
             
             # Check if any critical components are down
@@ -319,6 +476,7 @@ def create_app():
         """Cleanup function called on app shutdown."""
         try:
             file_watcher.stop()
+            file_processor.close()
             logger.info("Application cleanup completed")
         except Exception as e:
             logger.error(f"Cleanup error: {e}")
@@ -329,8 +487,10 @@ def create_app():
     
     return app
 
-# Create the Flask app instance
-app = create_app()
+# Create the Flask app instance (not in spawned worker processes, which
+# import the main module again: converter sandbox, PDF page extraction)
+if multiprocessing.parent_process() is None:
+    app = create_app()
 
 def main():
     """Main entry point."""
@@ -0,0 +1,13 @@
+"""
+AITON-RAG ASGI Entry Point
+
+Async serving mode: search, knowledge base and files endpoints run on the
+event loop, all other routes are served by the Flask app.
+
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker --workers 4
+"""
+
+from app import app as flask_app
+from services.async_api import create_asgi_app
+
+application = create_asgi_app(flask_app)
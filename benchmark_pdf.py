@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+AITON-RAG PDF Backend Benchmark
+Measures pages per second of every installed PDF backend on a sample corpus
+
+    python benchmark_pdf.py samples/ [more.pdf ...] [--backends pymupdf,pypdf2] [--repeat 3]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+# Add project root to path
+PROJECT_ROOT = Path(__file__).parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+from services.pdf_backends import available_backends, get_backend, select_backend
+
+
+def collect_pdfs(paths):
+    """PDF files of the given files and directories (recursive)"""
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob('*') if p.suffix.lower() == '.pdf'))
+        elif path.suffix.lower() == '.pdf':
+            files.append(path)
+    return files
+
+
+def benchmark(backend_name, files, repeat):
+    """(pages, characters, seconds, failed files) of the fastest of repeat runs over files"""
+    backend = get_backend(backend_name)
+    best = None
+    for _ in range(repeat):
+        pages = characters = failed = 0
+        started = time.perf_counter()
+        for path in files:
+            try:
+                for text in backend.iter_pages(path):
+                    pages += 1
+                    characters += len(text)
+            except Exception:
+                failed += 1
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[2]:
+            best = (pages, characters, elapsed, failed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction backends")
+    parser.add_argument('paths', nargs='+', help="PDF files or directories with PDF files")
+    parser.add_argument('--backends', default=','.join(available_backends()),
+                        help="Comma-separated backends (default: all installed)")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per backend, the fastest counts")
+    args = parser.parse_args()
+    
+    files = collect_pdfs(args.paths)
+    if not files:
+        print("No PDF files found")
+        return 1
+    
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    print(f"📄 {len(files)} PDF files, installed backends: {', '.join(available_backends()) or 'none'}")
+    print()
+    print(f"{'Backend':<10} {'Pages':>8} {'Seconds':>9} {'Pages/s':>9} {'Chars':>12} {'Failed':>7}")
+    print("-" * 60)
+    
+    for name in backends:
+        try:
+            pages, characters, elapsed, failed = benchmark(name, files, max(1, args.repeat))
+        except ValueError as e:
+            print(f"{name:<10} {e}")
+            continue
+        rate = pages / elapsed if elapsed > 0 else 0.0
+        print(f"{name:<10} {pages:>8} {elapsed:>9.2f} {rate:>9.1f} {characters:>12} {failed:>7}")
+    
+    # Which backend PDF_BACKEND=auto picks per document
+    print()
+    print("Automatic selection:")
+    for path in files:
+        try:
+            backend, pages = select_backend(path)
+            print(f"  {path.name}: {backend.name} ({pages} pages)")
+        except Exception as e:
+            print(f"  {path.name}: failed ({e})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
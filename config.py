@@ -21,6 +21,10 @@ class Config:
     RAG_DATA_DIR = DATA_DIR / "rag"   # Updated name for consistency
     KNOWLEDGE_BASE_DIR = DATA_DIR / "knowledge_base"
     LOG_DIR = BASE_DIR / "logs"       # Updated name for consistency
+    RAG_DIR = RAG_DATA_DIR            # Alias used by the services
+    CATALOG_DB = DATA_DIR / "catalog.db"
+    UPLOAD_SESSION_DIR = DATA_DIR / "upload_sessions"
+    PDF_PAGE_CACHE_DIR = DATA_DIR / "pdf_pages"
     
     # Create directories if they don't exist
     for directory in [DATA_DIR, UPLOAD_DIR, RAG_DATA_DIR, KNOWLEDGE_BASE_DIR, LOG_DIR]:
@@ -37,6 +41,21 @@ class Config:
     API_PORT = int(os.getenv('API_PORT', 5000))
     API_VERSION = os.getenv('ACTIONS_API_VERSION', '1.0')
     
+    # Thread pool for parsing, scoring and serialization in async serving mode (asgi.py)
+    ASYNC_EXECUTOR_WORKERS = int(os.getenv('ASYNC_EXECUTOR_WORKERS', 8))
+    
+    # Search result cache (per process, invalidated when the knowledge base changes)
+    SEARCH_CACHE_SIZE = int(os.getenv('SEARCH_CACHE_SIZE', 1024))  # 0 disables caching
+    SEARCH_CACHE_TTL = int(os.getenv('SEARCH_CACHE_TTL', 300))  # seconds
+    
+    # Typo tolerance: misspelled query terms match words up to this edit distance (0 disables)
+    SEARCH_MAX_EDIT_DISTANCE = int(os.getenv('SEARCH_MAX_EDIT_DISTANCE', 2))
+    
+    # Near-duplicate detection at ingest (MinHash/LSH over word shingles)
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.9))  # 0 disables
+    NEAR_DUPLICATE_ACTION = os.getenv('NEAR_DUPLICATE_ACTION', 'mark')  # mark | skip
+    MINHASH_PERMUTATIONS = int(os.getenv('MINHASH_PERMUTATIONS', 128))
+    
     # OpenAI Configuration
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     OPENAI_MODEL = 'gpt-4o'
@@ -44,11 +63,37 @@ class Config:
     
     # File Processing Configuration
     MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 10485760))  # 10MB
+    
+    # Resumable chunked uploads (each chunk is a request below MAX_FILE_SIZE)
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 8388608))  # 8MB
+    MAX_CHUNKED_UPLOAD_SIZE = int(os.getenv('MAX_CHUNKED_UPLOAD_SIZE', 2147483648))  # 2GB
+    UPLOAD_SESSION_TTL = int(os.getenv('UPLOAD_SESSION_TTL', 86400))  # seconds
+    
+    # Bulk archive uploads (/api/v1/upload/bulk)
+    MAX_BULK_UPLOAD_SIZE = int(os.getenv('MAX_BULK_UPLOAD_SIZE', 2147483648))  # 2GB
+    MAX_BULK_UPLOAD_FILES = int(os.getenv('MAX_BULK_UPLOAD_FILES', 10000))  # multipart parts
     SUPPORTED_EXTENSIONS = os.getenv(
         'SUPPORTED_EXTENSIONS', 
         '.pdf,.docx,.txt,.html,.md,.csv'
     ).split(',')
     
+    # Rows per Markdown table section of converted CSV files (each repeats the header)
+    CSV_CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', 500))
+    
+    # PDF text extraction library: auto (per document, see pdf_backends.select_backend)
+    # or one of pymupdf, pdfium, pypdf, pdfminer, pypdf2
+    PDF_BACKEND = os.getenv('PDF_BACKEND', 'auto')
+    
+    # Page-parallel extraction of large PDFs in worker processes (resumable page cache)
+    PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 200))  # 0 disables
+    PDF_WORKERS = int(os.getenv('PDF_WORKERS', os.cpu_count() or 1))
+    
+    # Converter sandbox: conversions run in worker processes (0 converts in-process)
+    CONVERTER_WORKERS = int(os.getenv('CONVERTER_WORKERS', 2))
+    CONVERTER_TIMEOUT = int(os.getenv('CONVERTER_TIMEOUT', 600))  # seconds per file
+    CONVERTER_MEMORY_LIMIT = int(os.getenv('CONVERTER_MEMORY_LIMIT', 2147483648))  # 2GB address space, 0 = unlimited
+    CONVERTER_MAX_TASKS = int(os.getenv('CONVERTER_MAX_TASKS', 100))  # files per worker before it is replaced
+        
         # Logging Configuration
     LOG_LEVEL = getattr(logging, os.getenv('LOG_LEVEL', 'INFO').upper())
     LOG_FILE = LOG_DIR / 'aiton-rag.log'
@@ -5,25 +5,53 @@ REST API endpoints specifically designed for ChatGPT Custom GPT Actions integrat
 Provides optimized responses for AI consumption with proper formatting and metadata.
 """
 
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, List, Any, Mapping, Optional, Tuple
 from datetime import datetime
 import json
 from pathlib import Path
 
 from .aggregator import Aggregator
 from .file_processor import FileProcessor
+from .catalog import DocumentCatalog, SORT_ORDERS
+from .bulk_import import BulkImporter, BulkImportError
+from .events import broker
+from .upload_store import ALLOWED_EXTENSIONS
+from .streaming import streaming_json_response
+from .metadata_columns import RANGE_FILTERS, parse_range_filters
+from .pagination import (
+    PaginationError, decode_cursor, encode_cursor, page_bounds,
+    parse_fields, parse_limit, project
+)
 from config import Config
 
+# Fields available for ?fields= projection
+FILE_FIELDS = ('filename', 'processed_date', 'original_file', 'file_type', 'file_size', 'file_hash', 'category')
+KNOWLEDGE_ENTRY_FIELDS = ('title', 'category', 'source_file', 'content')
+
+# Facet filters accepted by the search endpoints (besides category); type is an alias of extension
+SEARCH_FILTER_FIELDS = ('mime_type', 'extension', 'date')
+SEARCH_FILTER_PARAMS = SEARCH_FILTER_FIELDS + ('type',) + tuple(RANGE_FILTERS)
+
+# Upper bound for queries in one /api/v1/search/batch request
+MAX_BATCH_QUERIES = 20
+
+# Origins allowed to call the API (Custom GPT Actions)
+CORS_ORIGINS = ('https://chat.openai.com', 'https://chatgpt.com')
+
 class ActionsAPI:
     """API service optimized for ChatGPT Custom GPT Actions."""
     
-    def __init__(self, app: Flask = None):
+    def __init__(self, app: Flask = None, file_processor: Optional[FileProcessor] = None):
         self.logger = logging.getLogger(__name__)
         self.aggregator = Aggregator()
-        self.file_processor = FileProcessor()
+        # Shared with the upload handlers so duplicate checks see pending uploads
+        self.file_processor = file_processor or FileProcessor()
+        self.catalog = DocumentCatalog()
+        self.bulk_importer = BulkImporter(self.file_processor, ALLOWED_EXTENSIONS)
         
         if app:
             self.init_app(app)
@@ -35,12 +63,15 @@ class ActionsAPI:
         # Enable CORS for Custom GPT Actions
         CORS(app, resources={
             r"/api/*": {
-                "origins": ["https://chat.openai.com", "https://chatgpt.com"],
+                "origins": list(CORS_ORIGINS),
                 "methods": ["GET", "POST"],
                 "allow_headers": ["Content-Type", "Authorization"]
             }
         })
         
+        # Lets the async serving mode reuse this instance (see services/async_api.py)
+        app.extensions['actions_api'] = self
+        
         # Register API routes
         self._register_routes()
         
@@ -54,42 +85,8 @@ class ActionsAPI:
         def search_knowledge():
             """Search the knowledge base with Custom GPT optimization."""
             try:
-                query = request.args.get('query', '').strip()
-                category = request.args.get('category', '')
-                limit = min(int(request.args.get('limit', 10)), 50)  # Max 50 results
-                
-                if not query:
-                    return jsonify({
-                        "success": False,
-                        "error": "Query parameter is required",
-                        "usage_guidance": "Use ?query=your_search_terms to search the knowledge base"
-                    }), 400
-                
-                # Perform search
-                results = self.aggregator.search_content(
-                    query=query,
-                    category=category,
-                    limit=limit
-                )
-                
-                # Format response for Custom GPT Actions
-                response = {
-                    "success": True,
-                    "query": query,
-                    "category": category or "all",
-                    "total_results": len(results),
-                    "results": results,
-                    "timestamp": datetime.now().isoformat(),
-                    "actions_metadata": {
-                        "response_type": "search_results",
-                        "content_optimized": True,
-                        "categories_available": ["processes", "definitions", "analysis", "reference"],
-                        "usage_tip": "Results are pre-structured for AI consumption"
-                    }
-                }
-                
-                self.logger.info(f"Search API called: query='{query}', results={len(results)}")
-                return jsonify(response)
+                response, status = self.build_search_response(request.args)
+                return jsonify(response), status
                 
             except Exception as e:
                 self.logger.error(f"Search API error: {e}")
@@ -99,39 +96,44 @@ class ActionsAPI:
                     "timestamp": datetime.now().isoformat()
                 }), 500
         
+        @self.app.route('/api/v1/search/batch', methods=['POST'])
+        def search_batch():
+            """Answer several searches with one request and one pass over the index."""
+            try:
+                response, status = self.build_search_batch_response(request.get_json(silent=True))
+                return jsonify(response), status
+            
+            except Exception as e:
+                self.logger.error(f"Batch search API error: {e}")
+                return jsonify({
+                    "success": False,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }), 500
+        
+        @self.app.route('/api/v1/suggest', methods=['GET'])
+        def suggest_terms():
+            """Complete a prefix to terms that occur in the knowledge base."""
+            try:
+                response, status = self.build_suggest_response(request.args)
+                return jsonify(response), status
+            
+            except Exception as e:
+                self.logger.error(f"Suggest API error: {e}")
+                return jsonify({
+                    "success": False,
+                    "error": str(e),
+                    "timestamp": datetime.now().isoformat()
+                }), 500
+        
         @self.app.route('/api/v1/knowledge-base', methods=['GET'])
         def get_knowledge_base():
             """Get the complete structured knowledge base."""
             try:
-                # Get structured knowledge base
-                knowledge_base = self.aggregator.get_structured_knowledge()
-                
-                if not knowledge_base:
-                    return jsonify({
-                        "success": True,
-                        "message": "Knowledge base is empty",
-                        "knowledge_base": {},
-                        "actions_metadata": {
-                            "response_type": "empty_knowledge_base",
-                            "suggestion": "Upload files to populate the knowledge base"
-                        }
-                    })
-                
-                # Add metadata for Custom GPT Actions
-                response = {
-                    "success": True,
-                    "knowledge_base": knowledge_base,
-                    "timestamp": datetime.now().isoformat(),
-                    "actions_metadata": {
-                        "response_type": "complete_knowledge_base",
-                        "content_optimized": True,
-                        "total_categories": len(knowledge_base),
-                        "usage_tip": "Content is pre-structured and ready for analysis"
-                    }
-                }
-                
-                self.logger.info("Knowledge base API called")
-                return jsonify(response)
+                response, status = self.build_knowledge_base_response(request.args)
+                if status != 200:
+                    return jsonify(response), status
+                return streaming_json_response(response)
                 
             except Exception as e:
                 self.logger.error(f"Knowledge base API error: {e}")
@@ -175,48 +177,12 @@ class ActionsAPI:
         
         @self.app.route('/api/v1/files', methods=['GET'])
         def get_processed_files():
-            """Get list of processed files with metadata."""
+            """Get a page of processed files with metadata."""
             try:
-                rag_files = list(Config.RAG_DATA_DIR.glob('*.md'))
-                
-                files_info = []
-                for file_path in rag_files:
-                    try:
-                        # Read file metadata from frontmatter
-                        content = file_path.read_text(encoding='utf-8')
-                        if content.startswith('---'):
-                            frontmatter_end = content.find('---', 3)
-                            if frontmatter_end > 0:
-                                frontmatter = content[3:frontmatter_end].strip()
-                                # Parse basic metadata
-                                metadata = {}
-                                for line in frontmatter.split('\n'):
-                                    if ':' in line:
-                                        key, value = line.split(':', 1)
-                                        metadata[key.strip()] = value.strip()
-                                
-                                files_info.append({
-                                    "filename": file_path.name,
-                                    "processed_date": metadata.get('processed_date', 'unknown'),
-                                    "original_file": metadata.get('original_file', 'unknown'),
-                                    "file_type": metadata.get('file_type', 'unknown'),
-                                    "file_hash": metadata.get('file_hash', 'unknown')
-                                })
-                    except Exception as e:
-                        self.logger.warning(f"Could not read metadata from {file_path}: {e}")
-                
-                response = {
-                    "success": True,
-                    "total_files": len(files_info),
-                    "files": files_info,
-                    "timestamp": datetime.now().isoformat(),
-                    "actions_metadata": {
-                        "response_type": "files_list",
-                        "usage_tip": "Shows all processed files in the knowledge base"
-                    }
-                }
-                
-                return jsonify(response)
+                response, status = self.build_files_response(request.args)
+                if status != 200:
+                    return jsonify(response), status
+                return streaming_json_response(response)
                 
             except Exception as e:
                 self.logger.error(f"Files API error: {e}")
@@ -226,12 +192,12 @@ class ActionsAPI:
                 }), 500
         
         @self.app.route('/api/v1/health', methods=['GET'])
-        def health_check():
+        def api_health_check():
             """Health check endpoint for monitoring."""
             try:
                 # Check if services are working
                 knowledge_base = self.aggregator.get_structured_knowledge()
-                total_files = len(list(Config.RAG_DATA_DIR.glob('*.md')))
+                total_files = self.catalog.count()
                 
                 response = {
                     "success": True,
@@ -240,7 +206,8 @@ class ActionsAPI:
                     "stats": {
                         "total_processed_files": total_files,
                         "knowledge_base_categories": len(knowledge_base) if knowledge_base else 0,
-                        "openai_configured": bool(Config.OPENAI_API_KEY)
+                        "openai_configured": bool(Config.OPENAI_API_KEY),
+                        "search_cache": self.aggregator.search_cache.stats()
                     },
                     "actions_metadata": {
                         "response_type": "health_status",
@@ -259,6 +226,38 @@ class ActionsAPI:
                     "timestamp": datetime.now().isoformat()
                 }), 500
         
+        @self.app.route('/api/v1/events', methods=['GET'])
+        def events():
+            """Server-sent events: ingest progress, knowledge base generations and status."""
+            last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+            try:
+                last_event_id = int(last_event_id) if last_event_id else None
+            except ValueError:
+                last_event_id = None
+            
+            # Reconnecting clients get the missed events replayed instead of a snapshot;
+            # the status snapshot is computed once per change, not once per client
+            initial = None
+            if last_event_id is None:
+                initial = broker.latest('status')
+                if initial is None:
+                    broker.publish('status', self.aggregator.get_status())
+                    initial = broker.latest('status')
+            
+            return Response(
+                broker.stream(last_event_id, initial=initial),
+                mimetype='text/event-stream',
+                headers={
+                    'Cache-Control': 'no-cache',
+                    'X-Accel-Buffering': 'no'
+                }
+            )
+        
+        @self.app.route('/api/v1/upload/bulk', methods=['POST'])
+        def bulk_upload():
+            """Bulk import of document archives or multiple files."""
+            return self._bulk_upload()
+        
         @self.app.route('/api/v1/update-knowledge-base', methods=['POST'])
         def update_knowledge_base():
             """Manually trigger knowledge base update."""
@@ -268,7 +267,7 @@ class ActionsAPI:
                 
                 # Get updated stats
                 knowledge_base = self.aggregator.get_structured_knowledge()
-                total_files = len(list(Config.RAG_DATA_DIR.glob('*.md')))
+                total_files = self.catalog.count()
                 
                 response = {
                     "success": True,
@@ -295,6 +294,359 @@ class ActionsAPI:
                     "timestamp": datetime.now().isoformat()
                 }), 500
     
+    def _bulk_upload(self):
+        """Import a zip/tar body or a multi-file multipart request in one go."""
+        try:
+            if request.mimetype == 'multipart/form-data':
+                files = request.files.getlist('files') + request.files.getlist('file')
+                if not files:
+                    return jsonify({
+                        "success": False,
+                        "error": "No files provided",
+                        "usage_guidance": "Send files as multipart field 'files' or a zip/tar archive as request body"
+                    }), 400
+                result = self.bulk_importer.import_files(files)
+            else:
+                result = self.bulk_importer.import_stream(request.stream, request.content_type)
+        except BulkImportError as e:
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "supported_types": list(ALLOWED_EXTENSIONS)
+            }), 400
+        except Exception as e:
+            self.logger.error(f"Bulk upload error: {e}")
+            return jsonify({
+                "success": False,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }), 500
+        
+        # One knowledge base rebuild for the whole import
+        if result['counts']['processed']:
+            threading.Thread(target=self.aggregator.update_knowledge_base, daemon=True).start()
+        
+        return jsonify({
+            "success": True,
+            "message": f"Imported {result['counts']['processed']} files",
+            **result,
+            "timestamp": datetime.now().isoformat()
+        })
+    
+    def build_search_response(self, args: Mapping[str, str]) -> Tuple[Dict[str, Any], int]:
+        """Search response for the given query parameters, with HTTP status."""
+        query = args.get('query', '').strip()
+        category = args.get('category', '')
+        limit = min(int(args.get('limit', 10)), 50)  # Max 50 results
+        
+        if not query:
+            return {
+                "success": False,
+                "error": "Query parameter is required",
+                "usage_guidance": "Use ?query=your_search_terms to search the knowledge base"
+            }, 400
+        
+        try:
+            filters, ranges = self._parse_metadata_filters(args)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "usage_guidance": "Dates as YYYY-MM-DD (processed_after=2024-01-01), sizes in bytes (max_size=1048576)"
+            }, 400
+        
+        # Perform search
+        search = self.aggregator.search(
+            query=query,
+            category=category,
+            limit=limit,
+            filters=filters,
+            ranges=ranges
+        )
+        results = search['results']
+        
+        # Format response for Custom GPT Actions
+        response = {
+            "success": True,
+            "query": query,
+            "category": category or "all",
+            "filters": {name: args[name] for name in SEARCH_FILTER_PARAMS if args.get(name)},
+            "total_results": len(results),
+            "total_matches": search['total_matches'],
+            "results": results,
+            "facets": search['facets'],
+            "timestamp": datetime.now().isoformat(),
+            "actions_metadata": {
+                "response_type": "search_results",
+                "content_optimized": True,
+                "categories_available": ["processes", "definitions", "analysis", "reference"],
+                "usage_tip": "Results are pre-structured for AI consumption"
+            }
+        }
+        
+        # Misspelled terms were searched as their closest indexed words
+        corrections = self.aggregator.query_corrections(query)
+        if corrections:
+            response["corrected_terms"] = corrections
+        
+        self.logger.info(f"Search API called: query='{query}', results={len(results)}")
+        return response, 200
+    
+    def build_search_batch_response(self, body: Any) -> Tuple[Dict[str, Any], int]:
+        """Batch search response for a JSON body {"queries": [...]}, with HTTP status."""
+        try:
+            queries = self._parse_batch_queries(body)
+        except ValueError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "usage_guidance": 'POST {"queries": [{"query": "...", "category": "...", "limit": 10}]}'
+            }, 400
+        
+        results = self.aggregator.search_batch(queries)
+        
+        response = {
+            "success": True,
+            "total_queries": len(queries),
+            "results": {
+                query['id']: {
+                    "query": query['query'],
+                    "category": query['category'] or "all",
+                    "filters": query['filter_params'],
+                    "total_results": len(query_results),
+                    "results": query_results
+                }
+                for query, query_results in zip(queries, results)
+            },
+            "timestamp": datetime.now().isoformat(),
+            "actions_metadata": {
+                "response_type": "batch_search_results",
+                "content_optimized": True,
+                "usage_tip": "Results are keyed by query id, or by the query text when no id was given"
+            }
+        }
+        
+        self.logger.info(f"Batch search API called: queries={len(queries)}")
+        return response, 200
+    
+    @staticmethod
+    def _parse_batch_queries(body: Any) -> List[Dict[str, Any]]:
+        """Validate the queries of a batch search; plain strings are accepted as queries."""
+        queries = body.get('queries') if isinstance(body, dict) else None
+        if not isinstance(queries, list) or not queries:
+            raise ValueError("A non-empty 'queries' list is required")
+        if len(queries) > MAX_BATCH_QUERIES:
+            raise ValueError(f"Too many queries. Maximum is {MAX_BATCH_QUERIES} per request")
+        
+        parsed = []
+        for position, query in enumerate(queries):
+            if isinstance(query, str):
+                query = {'query': query}
+            if not isinstance(query, dict) or not str(query.get('query') or '').strip():
+                raise ValueError(f"Query {position} needs a non-empty 'query'")
+            try:
+                limit = min(int(query.get('limit', 10)), 50)  # Max 50 results
+            except (TypeError, ValueError):
+                raise ValueError(f"Query {position} has an invalid limit")
+            if limit < 1:
+                raise ValueError(f"Query {position} has an invalid limit")
+            try:
+                filters, ranges = ActionsAPI._parse_metadata_filters(query)
+            except ValueError as e:
+                raise ValueError(f"Query {position}: {e}")
+            
+            parsed.append({
+                'id': str(query.get('id') or query['query']).strip(),
+                'query': str(query['query']).strip(),
+                'category': query.get('category') or '',
+                'limit': limit,
+                'filters': filters,
+                'ranges': ranges,
+                # Echoed as given, like the filters of a single search
+                'filter_params': {name: query[name] for name in SEARCH_FILTER_PARAMS if query.get(name)}
+            })
+        
+        ids = [query['id'] for query in parsed]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Queries must be unique; set an 'id' to repeat a query with other options")
+        return parsed
+    
+    @staticmethod
+    def _parse_metadata_filters(args: Mapping[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Facet filters (comma separated alternatives) and date/size range filters of a request."""
+        filters = {field: args[field] for field in SEARCH_FILTER_FIELDS if args.get(field)}
+        if args.get('type') and 'extension' not in filters:
+            filters['extension'] = args['type']
+        return filters, parse_range_filters(args)
+    
+    def build_suggest_response(self, args: Mapping[str, str]) -> Tuple[Dict[str, Any], int]:
+        """Term completions for ?prefix=, with HTTP status."""
+        prefix = args.get('prefix', '').strip()
+        try:
+            limit = max(1, min(int(args.get('limit', 10)), 50))  # Max 50 suggestions
+        except ValueError:
+            return {
+                "success": False,
+                "error": "limit must be an integer",
+                "usage_guidance": "Use ?prefix=beginning_of_term&limit=10"
+            }, 400
+        
+        suggestions = self.aggregator.suggest_terms(prefix, limit)
+        
+        response = {
+            "success": True,
+            "prefix": prefix,
+            "total_results": len(suggestions),
+            "suggestions": suggestions,
+            "timestamp": datetime.now().isoformat(),
+            "actions_metadata": {
+                "response_type": "term_suggestions",
+                "usage_tip": "Suggested terms exist in the knowledge base; use them in /api/v1/search queries"
+            }
+        }
+        return response, 200
+    
+    def build_knowledge_base_response(self, args: Mapping[str, str]) -> Tuple[Dict[str, Any], int]:
+        """Complete or paginated knowledge base response, with HTTP status."""
+        # Paginated access when the client asks for a page or a projection
+        if any(arg in args for arg in ('limit', 'cursor', 'fields')):
+            return self._knowledge_base_page(args)
+        
+        # Get structured knowledge base
+        knowledge_base = self.aggregator.get_structured_knowledge()
+        
+        if not knowledge_base:
+            return {
+                "success": True,
+                "message": "Knowledge base is empty",
+                "knowledge_base": {},
+                "actions_metadata": {
+                    "response_type": "empty_knowledge_base",
+                    "suggestion": "Upload files to populate the knowledge base"
+                }
+            }, 200
+        
+        # Add metadata for Custom GPT Actions
+        response = {
+            "success": True,
+            "knowledge_base": knowledge_base,
+            "timestamp": datetime.now().isoformat(),
+            "actions_metadata": {
+                "response_type": "complete_knowledge_base",
+                "content_optimized": True,
+                "total_categories": len(knowledge_base),
+                "usage_tip": "Content is pre-structured and ready for analysis"
+            }
+        }
+        
+        self.logger.info("Knowledge base API called")
+        return response, 200
+    
+    def build_files_response(self, args: Mapping[str, str]) -> Tuple[Dict[str, Any], int]:
+        """One page of processed files from the catalog, with HTTP status."""
+        try:
+            limit = parse_limit(args.get('limit'))
+            cursor = args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            fields = parse_fields(args.get('fields'), FILE_FIELDS)
+            sort = args.get('sort', 'filename')
+            if sort not in SORT_ORDERS:
+                raise PaginationError(f"Invalid sort: {sort}. Available: {', '.join(SORT_ORDERS)}")
+            metadata_filters, ranges = self._parse_metadata_filters(args)
+            filters = {
+                'category': args.get('category') or None,
+                'mime_type': metadata_filters.get('mime_type'),
+                'extension': metadata_filters.get('extension'),
+                'ranges': ranges
+            }
+            # Fetch one extra row to know whether another page follows
+            documents = self.catalog.list_documents(
+                limit=limit + 1, after=after, sort=sort, **filters
+            )
+        except (PaginationError, ValueError) as e:
+            return {
+                "success": False,
+                "error": str(e)
+            }, 400
+        
+        has_more = len(documents) > limit
+        documents = documents[:limit]
+        files_info = [project(self._file_record(document), fields) for document in documents]
+        
+        response = {
+            "success": True,
+            "total_files": self.catalog.count(**filters),
+            "files": files_info,
+            "pagination": {
+                "limit": limit,
+                "sort": sort,
+                "has_more": has_more,
+                "next_cursor": encode_cursor(
+                    self.catalog.sort_key(documents[-1], sort)
+                ) if has_more else None
+            },
+            "timestamp": datetime.now().isoformat(),
+            "actions_metadata": {
+                "response_type": "files_list",
+                "usage_tip": "Pass next_cursor as ?cursor= to fetch the next page of processed files"
+            }
+        }
+        
+        return response, 200
+    
+    def _knowledge_base_page(self, args: Mapping[str, str]) -> Tuple[Dict[str, Any], int]:
+        """One cursor page of knowledge base entries, grouped by category."""
+        try:
+            limit = parse_limit(args.get('limit'))
+            cursor = args.get('cursor')
+            after = decode_cursor(cursor) if cursor else None
+            fields = parse_fields(args.get('fields'), KNOWLEDGE_ENTRY_FIELDS)
+            keys, entries = self.aggregator.get_knowledge_entries()
+            start, end = page_bounds(keys, after, limit)
+        except PaginationError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }, 400
+        
+        page = {}
+        for entry in entries[start:end]:
+            page.setdefault(entry['category'], []).append(project(entry, fields))
+        
+        has_more = end < len(entries)
+        response = {
+            "success": True,
+            "knowledge_base": page,
+            "pagination": {
+                "limit": limit,
+                "has_more": has_more,
+                "next_cursor": encode_cursor(keys[end - 1]) if has_more else None,
+                "total_items": len(entries)
+            },
+            "timestamp": datetime.now().isoformat(),
+            "actions_metadata": {
+                "response_type": "knowledge_base_page",
+                "content_optimized": True,
+                "usage_tip": "Pass next_cursor as ?cursor= to continue reading the knowledge base"
+            }
+        }
+        
+        self.logger.info(f"Knowledge base page API called: limit={limit}, items={end - start}")
+        return response, 200
+    
+    def _file_record(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Map a catalog row to the files API record format."""
+        return {
+            "filename": document['rag_filename'],
+            "processed_date": document['processed_at'] or 'unknown',
+            "original_file": document['original_filename'],
+            "file_type": document['mime_type'] or 'unknown',
+            "file_size": document['file_size'],
+            "file_hash": document['file_hash'],
+            "category": document['category']
+        }
+    
     def _register_error_handlers(self):
         """Register error handlers for the API."""
         
@@ -305,6 +657,8 @@ class ActionsAPI:
                 "error": "Endpoint not found",
                 "available_endpoints": [
                     "/api/v1/search",
+                    "/api/v1/search/batch",
+                    "/api/v1/suggest",
                     "/api/v1/knowledge-base",
                     "/api/v1/categories",
                     "/api/v1/files",
@@ -377,6 +731,41 @@ OPENAPI_SPEC = {
                         "required": False,
                         "schema": {"type": "integer", "minimum": 1, "maximum": 50},
                         "description": "Maximum number of results (default: 10)"
+                    },
+                    {
+                        "name": "mime_type",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "string"},
+                        "description": "Filter by MIME type of the original file (comma separated alternatives)"
+                    },
+                    {
+                        "name": "extension",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "string"},
+                        "description": "Filter by extension of the original file, e.g. pdf,docx"
+                    },
+                    {
+                        "name": "date",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "string"},
+                        "description": "Filter by processing date, YYYY or YYYY-MM (comma separated alternatives)"
+                    },
+                    {
+                        "name": "processed_after",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "string", "format": "date"},
+                        "description": "Only documents processed on or after this date (also: processed_before, created_after, created_before)"
+                    },
+                    {
+                        "name": "max_size",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "integer", "minimum": 0},
+                        "description": "Only original files up to this size in bytes (also: min_size)"
                     }
                 ],
                 "responses": {
@@ -389,6 +778,100 @@ OPENAPI_SPEC = {
                                     "properties": {
                                         "success": {"type": "boolean"},
                                         "results": {"type": "array"},
+                                        "total_results": {"type": "integer"},
+                                        "total_matches": {"type": "integer"},
+                                        "facets": {"type": "object"}
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "/api/v1/search/batch": {
+            "post": {
+                "summary": "Batch search knowledge base",
+                "description": "Run several searches in one request; results are keyed by query id or query text",
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "application/json": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "queries": {
+                                        "type": "array",
+                                        "maxItems": MAX_BATCH_QUERIES,
+                                        "items": {
+                                            "type": "object",
+                                            "properties": {
+                                                "id": {"type": "string"},
+                                                "query": {"type": "string"},
+                                                "category": {"type": "string"},
+                                                "limit": {"type": "integer", "minimum": 1, "maximum": 50},
+                                                "mime_type": {"type": "string"},
+                                                "extension": {"type": "string"},
+                                                "date": {"type": "string"}
+                                            },
+                                            "required": ["query"]
+                                        }
+                                    }
+                                },
+                                "required": ["queries"]
+                            }
+                        }
+                    }
+                },
+                "responses": {
+                    "200": {
+                        "description": "Search results per query",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "results": {"type": "object"},
+                                        "total_queries": {"type": "integer"}
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        },
+        "/api/v1/suggest": {
+            "get": {
+                "summary": "Suggest search terms",
+                "description": "Complete a prefix to terms that occur in the knowledge base, most frequent first",
+                "parameters": [
+                    {
+                        "name": "prefix",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "string"},
+                        "description": "Beginning of a term (empty: most frequent terms)"
+                    },
+                    {
+                        "name": "limit",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "integer", "minimum": 1, "maximum": 50},
+                        "description": "Maximum number of suggestions (default: 10)"
+                    }
+                ],
+                "responses": {
+                    "200": {
+                        "description": "Term suggestions",
+                        "content": {
+                            "application/json": {
+                                "schema": {
+                                    "type": "object",
+                                    "properties": {
+                                        "success": {"type": "boolean"},
+                                        "suggestions": {"type": "array"},
                                         "total_results": {"type": "integer"}
                                     }
                                 }
@@ -401,7 +884,30 @@ OPENAPI_SPEC = {
         "/api/v1/knowledge-base": {
             "get": {
                 "summary": "Get complete knowledge base",
-                "description": "Retrieve the entire structured knowledge base",
+                "description": "Retrieve the entire structured knowledge base, or one page of it when limit, cursor or fields are given",
+                "parameters": [
+                    {
+                        "name": "limit",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "integer", "minimum": 1, "maximum": 1000},
+                        "description": "Page size (default: 100 when paginating)"
+                    },
+                    {
+                        "name": "cursor",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "string"},
+                        "description": "next_cursor value from the previous page"
+                    },
+                    {
+                        "name": "fields",
+                        "in": "query",
+                        "required": False,
+                        "schema": {"type": "string"},
+                        "description": "Comma separated entry fields to return (title, category, source_file, content)"
+                    }
+                ],
                 "responses": {
                     "200": {
                         "description": "Complete knowledge base",
@@ -7,11 +7,28 @@ import json
 import logging
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 import openai
 
 from config import Config
+from .catalog import DocumentCatalog
+from .events import broker
+from .rag_document import RagCorpus, RagDocument
+from .facets import normalize_filters
+from .positional_index import POSITIONAL_INDEX_FILE, PositionalIndex, parse_query
+from .query_cache import QueryCache
+from .search_index import TERM_DICTIONARY_FILE, SearchIndex, TermDictionary, query_key
+
+# Keywords of the fallback categorization, in priority order
+FALLBACK_CATEGORY_KEYWORDS = [
+    ('processes', ['schritt', 'prozess', 'anleitung', 'workflow']),
+    ('definitions', ['definition', 'bedeutung', 'begriff']),
+    ('analysis', ['analyse', 'bericht', 'ergebnis'])
+]
+
+# Upper bound for the combined document excerpts sent to the model
+AI_INPUT_CHAR_BUDGET = 400000
 
 class Aggregator:
     """Actions-optimierte Strukturierung von RAG-Inhalten"""
@@ -19,6 +36,9 @@ class Aggregator:
     def __init__(self):
         self.config = Config()
         self.logger = logging.getLogger(__name__)
+        self._knowledge_cache = None
+        self.search_cache = QueryCache(self.config.SEARCH_CACHE_SIZE, self.config.SEARCH_CACHE_TTL)
+        self.catalog = DocumentCatalog()
         
         # OpenAI setup
         if self.config.OPENAI_API_KEY:
@@ -44,8 +64,19 @@ class Aggregator:
             # Structure content using OpenAI
             structured_content = self._structure_content_with_ai(rag_files)
             
+            # Record category assignments in the metadata catalog
+            self._update_catalog_categories(rag_files, structured_content)
+            
+            # Word counts (keywords) and document frequencies (completion) of the full documents
+            word_freq, document_frequencies = self._count_terms(rag_files)
+            
             # Build knowledge base
-            knowledge_base = self._build_knowledge_base(rag_files, structured_content)
+            knowledge_base = self._build_knowledge_base(rag_files, structured_content, word_freq)
+            
+            # Word positions for phrase and NEAR queries and the term dictionary; saved before
+            # the knowledge base, so a new knowledge base generation always finds them
+            self._build_positional_index(rag_files)
+            self._save_term_dictionary(TermDictionary(document_frequencies))
             
             # Save to knowledge base directory
             self._save_knowledge_base(knowledge_base)
@@ -56,50 +87,242 @@ class Aggregator:
             self.logger.error(f"Error aggregating knowledge base: {str(e)}")
             return self._create_empty_knowledge_base()
     
-    def _load_rag_files(self) -> List[Dict]:
-        """Lädt alle Markdown-Dateien aus dem RAG-Verzeichnis"""
-        rag_files = []
-        
-        for file_path in self.config.RAG_DIR.glob('*.md'):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # Parse frontmatter
-                metadata, markdown_content = self._parse_frontmatter(content)
-                
-                rag_files.append({
-                    'file_path': str(file_path),
-                    'filename': file_path.name,
-                    'metadata': metadata,
-                    'content': markdown_content
+    def update_knowledge_base(self) -> Dict[str, Any]:
+        """Baut die Wissensbasis nach Änderungen im RAG-Verzeichnis neu auf"""
+        knowledge_base = self.aggregate_knowledge_base()
+        
+        # Push the new generation to open event streams
+        status = self.get_status()
+        broker.publish('knowledge_base', {
+            'generation': status['knowledge_base_generation'],
+            'categories': status['knowledge_base_categories']
+        })
+        broker.publish('status', status)
+        
+        return knowledge_base
+    
+    def knowledge_base_generation(self) -> Optional[int]:
+        """Stand der gespeicherten Wissensbasis (mtime in ns), None wenn noch keine existiert"""
+        knowledge_base_path = self.config.KNOWLEDGE_BASE_DIR / "knowledge_base.json"
+        return knowledge_base_path.stat().st_mtime_ns if knowledge_base_path.exists() else None
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Kennzahlen für Health-Check und Event-Stream"""
+        knowledge_base = self.get_structured_knowledge()
+        return {
+            'total_processed_files': self.catalog.count(),
+            'knowledge_base_categories': len(knowledge_base) if knowledge_base else 0,
+            'knowledge_base_generation': self.knowledge_base_generation()
+        }
+    
+    def get_structured_knowledge(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Liefert die gespeicherte Wissensbasis gruppiert nach Kategorien
+
+        Returns:
+            Dict mit Kategorie -> Liste der zugeordneten Einträge
+        """
+        return self._knowledge_snapshot()['structured']
+
+    def get_knowledge_entries(self) -> Tuple[List[List[str]], List[Dict[str, Any]]]:
+        """
+        Liefert alle Einträge der Wissensbasis sortiert nach Kategorie und Titel
+        
+        Die sortierte Liste wird pro Stand der Wissensbasis einmal aufgebaut,
+        damit Seiten per Binärsuche statt per Vollscan gefunden werden.
+        
+        Returns:
+            Tuple aus sortierten Schlüsseln [Kategorie, Titel] und den Einträgen
+        """
+        snapshot = self._knowledge_snapshot()
+        return snapshot['keys'], snapshot['entries']
+    
+    def search_content(self, query: str, category: Optional[str] = None, limit: int = 10,
+                       filters: Optional[Dict[str, Any]] = None,
+                       ranges: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Durchsucht die Einträge der Wissensbasis nach den Begriffen der Anfrage
+        
+        Args:
+            query: Suchbegriffe
+            category: Optionaler Kategorie-Filter
+            limit: Maximale Anzahl Treffer
+            filters: Optionale Facetten-Filter (mime_type, extension, date)
+            ranges: Optionale Bereichs-Filter (siehe metadata_columns.parse_range_filters)
+        
+        Returns:
+            Treffer mit relevance_score (0-1), bester Treffer zuerst
+        """
+        return list(self.search(query, category, limit, filters, ranges)['results'])
+    
+    def search(self, query: str, category: Optional[str] = None, limit: int = 10,
+               filters: Optional[Dict[str, Any]] = None,
+               ranges: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Wie search_content, zusätzlich mit Gesamtzahl der Treffer und Facetten-Zählern
+        
+        Returns:
+            Dict mit results, total_matches und facets (Feld -> Wert -> Anzahl)
+        """
+        snapshot = self._knowledge_snapshot()
+        # Gleiche Anfragen (auch gleichzeitige) werden pro Stand der Wissensbasis nur einmal berechnet
+        key = (
+            query_key(query), category or None, limit,
+            tuple(sorted(normalize_filters(filters).items())), tuple(sorted((ranges or {}).items()))
+        )
+        return self.search_cache.get_or_compute(key, snapshot['generation'], lambda: self._attach_snippets(
+            snapshot['index'], query, snapshot['index'].facet_search(query, category, limit, filters, ranges)
+        ))
+    
+    def search_batch(self, queries: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Beantwortet mehrere Suchanfragen in einem Durchlauf über den Suchindex
+        
+        Args:
+            queries: Anfragen mit query, optional category und limit
+        
+        Returns:
+            Trefferlisten in der Reihenfolge der Anfragen (wie search_content)
+        """
+        index = self._knowledge_snapshot()['index']
+        batch = index.search_batch(queries)
+        for spec, results in zip(queries, batch):
+            self._attach_snippets(index, spec.get('query', ''), {'results': results})
+        return batch
+    
+    def query_corrections(self, query: str) -> Dict[str, List[str]]:
+        """
+        Liefert die Korrekturen für Suchbegriffe, die in keinem Wort der Wissensbasis vorkommen
+        
+        Returns:
+            Dict mit Suchbegriff -> ersatzweise gesuchte Wörter (leer wenn alle Begriffe vorkommen)
+        """
+        snapshot = self._knowledge_snapshot()
+        return self.search_cache.get_or_compute(
+            ('corrections', query_key(query)),
+            snapshot['generation'],
+            lambda: snapshot['index'].query_corrections(query)
+        )
+    
+    def suggest_terms(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Vervollständigt ein Präfix zu Begriffen der Wissensbasis
+        
+        Args:
+            prefix: Wortanfang (Groß-/Kleinschreibung egal)
+            limit: Maximale Anzahl Vorschläge
+        
+        Returns:
+            Begriffe mit document_frequency, häufigster Begriff zuerst
+        """
+        completions = self._knowledge_snapshot()['index'].terms.complete(prefix.strip(), limit)
+        return [{'term': term, 'document_frequency': frequency} for term, frequency in completions]
+    
+    def _attach_snippets(self, index: SearchIndex, query: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Ergänzt die Treffer um snippet: Textausschnitt mit hervorgehobenen Suchbegriffen
+        
+        Gelesen wird nur ein Fenster um die beste Trefferstelle (Byte-Offsets aus
+        dem Positionsindex). Ohne Positionsindex bleibt es bei content.
+        """
+        positions = index.positional_index()
+        if positions is None or not result['results']:
+            return result
+        
+        # Die bei der Suche aufgelösten Wörter (gecached im Suchindex)
+        terms = parse_query(query).terms
+        matches = {term: index.resolve(term)[0] for term in terms}
+        
+        for item in result['results']:
+            snippet = positions.snippet(RagDocument(self.config.RAG_DIR / item['title']), terms, matches=matches)
+            if snippet:
+                item['snippet'] = snippet
+        return result
+    
+    def load_knowledge_snapshot(self, generation: Optional[int], kb_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Baut die gruppierte und die sortierte Sicht einer Wissensbasis samt Suchindex und cached sie
+        
+        Args:
+            generation: Stand der Wissensbasis (siehe knowledge_base_generation)
+            kb_data: knowledge_base Abschnitt der gespeicherten Wissensbasis
+        """
+        documents = {doc.get('filename'): doc for doc in kb_data.get('documents', [])}
+        structured = {}
+
+        for category, cat_data in kb_data.get('categories', {}).items():
+            items = []
+            for entry in cat_data.get('documents', []):
+                doc = documents.get(entry, {})
+                items.append({
+                    'title': entry,
+                    'category': category,
+                    'source_file': doc.get('metadata', {}).get('filename', entry),
+                    'content': doc.get('content_preview', '')
                 })
-                
-            except Exception as e:
-                self.logger.error(f"Error loading {file_path}: {str(e)}")
-                
-        return rag_files
-    
-    def _parse_frontmatter(self, content: str) -> tuple:
-        """Parst YAML Frontmatter aus Markdown"""
-        metadata = {}
-        markdown_content = content
-        
-        if content.startswith('---'):
-            parts = content.split('---', 2)
-            if len(parts) >= 3:
-                frontmatter = parts[1].strip()
-                markdown_content = parts[2].strip()
-                
-                # Simple YAML parsing
-                for line in frontmatter.split('\n'):
-                    if ':' in line:
-                        key, value = line.split(':', 1)
-                        metadata[key.strip()] = value.strip()
-        
-        return metadata, markdown_content
-    
-    def _structure_content_with_ai(self, rag_files: List[Dict]) -> Dict[str, Any]:
+            structured[category] = items
+        
+        entries = [item for items in structured.values() for item in items]
+        entries.sort(key=lambda item: (item['category'], item['title']))
+        
+        snapshot = {
+            'generation': generation,
+            'structured': structured,
+            'keys': [[item['category'], item['title']] for item in entries],
+            'entries': entries,
+            'index': SearchIndex(
+                entries,
+                self.config.SEARCH_MAX_EDIT_DISTANCE,
+                positions=lambda: PositionalIndex.load(self.config.KNOWLEDGE_BASE_DIR / POSITIONAL_INDEX_FILE),
+                metadata=[documents.get(item['title'], {}).get('metadata', {}) for item in entries],
+                terms=TermDictionary.load(self.config.KNOWLEDGE_BASE_DIR / TERM_DICTIONARY_FILE)
+            )
+        }
+        self._knowledge_cache = snapshot
+        return snapshot
+    
+    def cached_knowledge_generation(self) -> Optional[int]:
+        """Stand der zuletzt geladenen Wissensbasis (-1 wenn noch keine geladen wurde)"""
+        snapshot = self._knowledge_cache
+        return snapshot['generation'] if snapshot else -1
+    
+    def _knowledge_snapshot(self) -> Dict[str, Any]:
+        """Aktuelle Sicht der Wissensbasis; wird nur nach Änderungen neu geladen"""
+        generation = self.knowledge_base_generation()
+        snapshot = self._knowledge_cache
+        if snapshot is None or snapshot['generation'] != generation:
+            snapshot = self.load_knowledge_snapshot(generation, self._load_knowledge_base_data())
+        return snapshot
+    
+    @staticmethod
+    def parse_knowledge_base(raw: bytes) -> Dict[str, Any]:
+        """Extrahiert den knowledge_base Abschnitt aus der gespeicherten JSON-Datei"""
+        knowledge_base = json.loads(raw)
+        return knowledge_base.get("action_response", {}).get("data", {}).get("knowledge_base", {})
+    
+    def _load_knowledge_base_data(self) -> Dict[str, Any]:
+        """Lädt den knowledge_base Abschnitt der gespeicherten Wissensbasis"""
+        knowledge_base_path = self.config.KNOWLEDGE_BASE_DIR / "knowledge_base.json"
+
+        if not knowledge_base_path.exists():
+            return {}
+
+        try:
+            return self.parse_knowledge_base(knowledge_base_path.read_bytes())
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Error loading knowledge base: {str(e)}")
+            return {}
+
+    def _load_rag_files(self) -> RagCorpus:
+        """
+        Momentaufnahme der RAG-Dateien als Lazy Handles (Inhalte werden erst bei Bedarf gelesen)
+        
+        Als Near-Duplicate markierte Dokumente (duplicate_of im Frontmatter) bleiben außen vor.
+        """
+        corpus = RagCorpus.from_directory(self.config.RAG_DIR)
+        return RagCorpus(document.file_path for document in corpus if not document.metadata.get('duplicate_of'))
+    
+    def _structure_content_with_ai(self, rag_files: RagCorpus) -> Dict[str, Any]:
         """Strukturiert Inhalte mit OpenAI für Actions-Optimierung"""
         if not self.config.OPENAI_API_KEY:
             return self._structure_content_fallback(rag_files)
@@ -132,19 +355,23 @@ class Aggregator:
             self.logger.error(f"Error structuring with AI: {str(e)}")
             return self._structure_content_fallback(rag_files)
     
-    def _prepare_content_for_ai(self, rag_files: List[Dict]) -> str:
+    def _prepare_content_for_ai(self, rag_files: RagCorpus) -> str:
         """Bereitet Inhalte für AI-Verarbeitung vor"""
         content_parts = []
+        total_chars = 0
         
-        for file_data in rag_files:
-            filename = file_data['filename']
-            content = file_data['content']
-            
-            # Truncate very long content
+        for document in rag_files:
+            # Only the first 2000 characters are read from each file
+            content = document.read_prefix(2001)
             if len(content) > 2000:
                 content = content[:2000] + "... [truncated]"
             
-            content_parts.append(f"=== FILE: {filename} ===\n{content}\n")
+            part = f"=== FILE: {document.filename} ===\n{content}\n"
+            total_chars += len(part)
+            if total_chars > AI_INPUT_CHAR_BUDGET:
+                self.logger.warning("AI input budget reached, remaining files are categorized without their content")
+                break
+            content_parts.append(part)
         
         return "\n".join(content_parts)
     
@@ -216,25 +443,19 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
             "structured_procedures": {}
         }
     
-    def _structure_content_fallback(self, rag_files: List[Dict]) -> Dict[str, Any]:
+    def _structure_content_fallback(self, rag_files: RagCorpus) -> Dict[str, Any]:
         """Fallback-Strukturierung ohne AI"""
         categories = {"processes": [], "definitions": [], "analysis": [], "reference": []}
         key_concepts = {}
         structured_procedures = {}
         
-        for file_data in rag_files:
-            content = file_data['content'].lower()
-            filename = file_data['filename']
-            
-            # Simple keyword-based categorization
-            if any(word in content for word in ['schritt', 'prozess', 'anleitung', 'workflow']):
-                categories['processes'].append(filename)
-            elif any(word in content for word in ['definition', 'bedeutung', 'begriff']):
-                categories['definitions'].append(filename)
-            elif any(word in content for word in ['analyse', 'bericht', 'ergebnis']):
-                categories['analysis'].append(filename)
-            else:
-                categories['reference'].append(filename)
+        for document in rag_files:
+            # Simple keyword-based categorization, streamed through the document
+            category = next(
+                (name for name, words in FALLBACK_CATEGORY_KEYWORDS if document.contains_any(words)),
+                'reference'
+            )
+            categories[category].append(document.filename)
         
         return {
             "categories": categories,
@@ -242,11 +463,12 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
             "structured_procedures": structured_procedures
         }
     
-    def _build_knowledge_base(self, rag_files: List[Dict], structured_content: Dict[str, Any]) -> Dict[str, Any]:
+    def _build_knowledge_base(self, rag_files: RagCorpus, structured_content: Dict[str, Any],
+                              word_freq: Dict[str, int]) -> Dict[str, Any]:
         """Baut die finale Wissensbasis für Custom GPT Actions"""
         
         # Build search index
-        search_index = self._build_search_index(rag_files)
+        search_index = self._build_search_index(rag_files, word_freq)
         
         knowledge_base = {
             "action_response": {
@@ -271,12 +493,8 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
                         },
                         "action_search_index": search_index,
                         "documents": [
-                            {
-                                "filename": file_data['filename'],
-                                "content_preview": file_data['content'][:200] + "..." if len(file_data['content']) > 200 else file_data['content'],
-                                "metadata": file_data['metadata']
-                            }
-                            for file_data in rag_files
+                            self._document_summary(document)
+                            for document in rag_files
                         ]
                     }
                 },
@@ -297,6 +515,31 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
         
         return knowledge_base
     
+    def _update_catalog_categories(self, rag_files: RagCorpus, structured_content: Dict[str, Any]) -> None:
+        """Überträgt die Kategorie-Zuordnung der RAG-Dateien in den Katalog"""
+        filenames = set(rag_files.filenames())
+        assignments = {}
+        
+        for category, items in structured_content.get("categories", {}).items():
+            for item in items:
+                if item in filenames:
+                    assignments[item] = category
+        
+        try:
+            self.catalog.update_categories(assignments)
+        except Exception as e:
+            self.logger.warning(f"Could not update catalog categories: {str(e)}")
+    
+    def _document_summary(self, document: RagDocument) -> Dict[str, Any]:
+        """Vorschau und Metadaten eines Dokuments, ohne den ganzen Inhalt zu laden"""
+        preview = document.read_prefix(201)
+        
+        return {
+            "filename": document.filename,
+            "content_preview": preview[:200] + "..." if len(preview) > 200 else preview,
+            "metadata": document.metadata
+        }
+    
     def _format_categories_for_actions(self, categories: Dict[str, List]) -> Dict[str, Any]:
         """Formatiert Kategorien für Actions-Optimierung"""
         formatted_categories = {}
@@ -311,7 +554,7 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
         
         return formatted_categories
     
-    def _extract_definitions(self, rag_files: List[Dict], structured_content: Dict[str, Any]) -> Dict[str, Any]:
+    def _extract_definitions(self, rag_files: RagCorpus, structured_content: Dict[str, Any]) -> Dict[str, Any]:
         """Extrahiert Definitionen aus den Inhalten"""
         definitions = {}
         
@@ -328,17 +571,28 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
         
         return definitions
     
-    def _build_search_index(self, rag_files: List[Dict]) -> Dict[str, Any]:
-        """Baut Search Index für Actions"""
-        all_text = " ".join([file_data['content'] for file_data in rag_files])
+    def _count_terms(self, rag_files: RagCorpus) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Zählt die Wörter aller Dokumente in einem Durchlauf, Wort für Wort gestreamt
         
-        # Extract keywords (simple approach)
-        words = re.findall(r'\w+', all_text.lower())
+        Returns:
+            Tuple aus Häufigkeiten der Wörter mit mehr als 3 Zeichen (Keywords)
+            und Dokumenthäufigkeiten aller Wörter (Termwörterbuch)
+        """
         word_freq = {}
-        for word in words:
-            if len(word) > 3:  # Only meaningful words
-                word_freq[word] = word_freq.get(word, 0) + 1
-        
+        document_frequencies = {}
+        for document in rag_files:
+            words = set()
+            for word in document.iter_words():
+                words.add(word)
+                if len(word) > 3:  # Only meaningful words
+                    word_freq[word] = word_freq.get(word, 0) + 1
+            for word in words:
+                document_frequencies[word] = document_frequencies.get(word, 0) + 1
+        return word_freq, document_frequencies
+    
+    def _build_search_index(self, rag_files: RagCorpus, word_freq: Dict[str, int]) -> Dict[str, Any]:
+        """Baut Search Index für Actions"""
         # Top keywords
         top_keywords = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:50]
         keywords = [word for word, freq in top_keywords]
@@ -346,7 +600,7 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
         return {
             "optimized_for_actions": True,
             "keywords": keywords,
-            "topics": list(set([file_data['filename'].split('_')[0] for file_data in rag_files])),
+            "topics": list(set([filename.split('_')[0] for filename in rag_files.filenames()])),
             "entities": [],  # Could be enhanced with NER
             "custom_gpt_queries": [
                 "What processes are documented?",
@@ -375,6 +629,20 @@ Antworte ausschließlich mit gültigem JSON in folgendem Format:
         except Exception as e:
             self.logger.error(f"Error saving knowledge base: {str(e)}")
     
+    def _build_positional_index(self, rag_files: RagCorpus) -> None:
+        """Baut den Positionsindex direkt in die Datei neben der Wissensbasis"""
+        try:
+            PositionalIndex.build(rag_files, self.config.KNOWLEDGE_BASE_DIR / POSITIONAL_INDEX_FILE)
+        except Exception as e:
+            self.logger.error(f"Error building positional index: {str(e)}")
+    
+    def _save_term_dictionary(self, term_dictionary: TermDictionary) -> None:
+        """Speichert das Termwörterbuch (Vervollständigung) neben der Wissensbasis"""
+        try:
+            term_dictionary.save(self.config.KNOWLEDGE_BASE_DIR / TERM_DICTIONARY_FILE)
+        except Exception as e:
+            self.logger.error(f"Error saving term dictionary: {str(e)}")
+    
     def _create_empty_knowledge_base(self) -> Dict[str, Any]:
         """Erstellt leere Wissensbasis"""
         return {
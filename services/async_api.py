@@ -0,0 +1,193 @@
+"""
+Async Serving Mode for AITON-RAG
+
+ASGI application that serves the read-heavy Actions API endpoints (search,
+suggest, knowledge base, files) on an event loop. The knowledge base file is read
+without blocking the loop, while JSON parsing, scoring and serialization run
+in a thread pool. Responses are sent chunk by chunk as the pool serializes
+(and compresses) them. All other routes are passed through to the Flask app.
+
+Run with an ASGI server, e.g.:
+    gunicorn asgi:application -k uvicorn.workers.UvicornWorker
+"""
+
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl
+
+try:
+    import aiofiles
+    import aiofiles.os
+except ImportError:
+    aiofiles = None
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:
+    WsgiToAsgi = None
+
+from config import Config
+from .actions_api import ActionsAPI, CORS_ORIGINS
+from .streaming import compress_chunks, iter_json, negotiate_encoding
+
+# Path -> ActionsAPI method building the response
+ASYNC_ROUTES = {
+    '/api/v1/search': 'build_search_response',
+    '/api/v1/suggest': 'build_suggest_response',
+    '/api/v1/knowledge-base': 'build_knowledge_base_response',
+    '/api/v1/files': 'build_files_response'
+}
+
+# Routes answered from the knowledge base snapshot
+KNOWLEDGE_ROUTES = {'/api/v1/search', '/api/v1/suggest', '/api/v1/knowledge-base'}
+
+def iter_body(payload: Any, encoding: Optional[str]) -> Iterator[bytes]:
+    """Serialize (and optionally compress) a JSON payload chunk by chunk."""
+    chunks = iter_json(payload)
+    if encoding:
+        chunks = compress_chunks(chunks, encoding)
+    return chunks
+
+class AsyncActionsApp:
+    """ASGI front for the Actions API with non-blocking knowledge base reads."""
+    
+    def __init__(self, actions_api: ActionsAPI, wsgi_app=None, max_workers: Optional[int] = None):
+        self.api = actions_api
+        self.aggregator = actions_api.aggregator
+        self.logger = logging.getLogger(__name__)
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or Config.ASYNC_EXECUTOR_WORKERS,
+            thread_name_prefix='actions-api'
+        )
+        self._reload_lock: Optional[asyncio.Lock] = None
+        
+        self.fallback = None
+        if wsgi_app is not None:
+            if WsgiToAsgi is None:
+                raise RuntimeError("asgiref is required to serve the Flask routes in async mode")
+            self.fallback = WsgiToAsgi(wsgi_app)
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif (scope['type'] == 'http' and scope['method'] in ('GET', 'HEAD')
+              and scope['path'] in ASYNC_ROUTES):
+            await self._handle(scope, send)
+        elif self.fallback is not None:
+            await self.fallback(scope, receive, send)
+        else:
+            await self._respond(scope, send, {"success": False, "error": "Endpoint not found"}, 404)
+    
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+    
+    async def _handle(self, scope, send):
+        loop = asyncio.get_running_loop()
+        path = scope['path']
+        args = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1'), keep_blank_values=True))
+        
+        try:
+            if path in KNOWLEDGE_ROUTES:
+                await self.refresh_knowledge()
+            builder = getattr(self.api, ASYNC_ROUTES[path])
+            payload, status = await loop.run_in_executor(self.executor, builder, args)
+        except Exception as e:
+            self.logger.error(f"Async API error on {path}: {e}")
+            payload, status = {
+                "success": False,
+                "error": str(e),
+                "timestamp": datetime.now().isoformat()
+            }, 500
+        
+        await self._respond(scope, send, payload, status)
+    
+    async def refresh_knowledge(self) -> None:
+        """Reload the knowledge base snapshot if the file changed, without blocking the loop."""
+        path = self.aggregator.config.KNOWLEDGE_BASE_DIR / "knowledge_base.json"
+        generation = await self._generation(path)
+        if generation == self.aggregator.cached_knowledge_generation():
+            return
+        
+        if self._reload_lock is None:
+            self._reload_lock = asyncio.Lock()
+        
+        # Concurrent requests wait for a single reload
+        async with self._reload_lock:
+            if generation == self.aggregator.cached_knowledge_generation():
+                return
+            raw = await self._read_bytes(path) if generation is not None else None
+            await asyncio.get_running_loop().run_in_executor(
+                self.executor, self._load_snapshot, generation, raw
+            )
+    
+    def _load_snapshot(self, generation: Optional[int], raw: Optional[bytes]) -> None:
+        kb_data = {}
+        if raw:
+            try:
+                kb_data = self.aggregator.parse_knowledge_base(raw)
+            except ValueError as e:
+                self.logger.error(f"Error loading knowledge base: {e}")
+        self.aggregator.load_knowledge_snapshot(generation, kb_data)
+    
+    async def _generation(self, path: Path) -> Optional[int]:
+        try:
+            if aiofiles is not None:
+                stat = await aiofiles.os.stat(path)
+            else:
+                stat = await asyncio.get_running_loop().run_in_executor(self.executor, os.stat, path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns
+    
+    async def _read_bytes(self, path: Path) -> bytes:
+        if aiofiles is not None:
+            async with aiofiles.open(path, 'rb') as f:
+                return await f.read()
+        return await asyncio.get_running_loop().run_in_executor(self.executor, path.read_bytes)
+    
+    async def _respond(self, scope, send, payload: Dict[str, Any], status: int) -> None:
+        request_headers = {
+            name.decode('latin-1').lower(): value.decode('latin-1')
+            for name, value in scope.get('headers', [])
+        }
+        encoding = negotiate_encoding(request_headers.get('accept-encoding', '')) if status == 200 else None
+        
+        # No content-length: the server sends the body with chunked transfer encoding
+        headers: List[Tuple[bytes, bytes]] = [
+            (b'content-type', b'application/json'),
+            (b'vary', b'Accept-Encoding, Origin')
+        ]
+        if encoding:
+            headers.append((b'content-encoding', encoding.encode('latin-1')))
+        origin = request_headers.get('origin')
+        if origin in CORS_ORIGINS:
+            headers.append((b'access-control-allow-origin', origin.encode('latin-1')))
+        
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        if scope['method'] != 'HEAD':
+            # Each chunk is serialized in the pool and sent before the next one is produced
+            loop = asyncio.get_running_loop()
+            chunks = iter_body(payload, encoding)
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+def create_asgi_app(flask_app) -> AsyncActionsApp:
+    """Wrap a Flask app created by create_app() for async serving."""
+    return AsyncActionsApp(flask_app.extensions['actions_api'], wsgi_app=flask_app)
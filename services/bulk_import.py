@@ -0,0 +1,170 @@
+"""
+Bulk Import for AITON-RAG
+
+Feeds zip archives, tar streams (optionally compressed) and multi-file
+multipart uploads entry by entry into the FileProcessor. Every entry is
+spooled and hashed once, duplicates are dropped before conversion and the
+knowledge base is rebuilt once per import instead of once per file.
+"""
+
+import logging
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from config import Config
+from .file_processor import FileProcessor
+from .events import broker
+from .upload_store import HashingSpoolFile
+
+ZIP_TYPES = ('application/zip', 'application/x-zip-compressed')
+TAR_TYPES = ('application/x-tar', 'application/gzip', 'application/x-gzip',
+             'application/x-bzip2', 'application/x-xz', 'application/x-gtar')
+
+# Entry status -> ingest event stage
+BULK_STAGES = {'processed': 'completed', 'duplicate': 'skipped', 'skipped': 'skipped', 'failed': 'failed'}
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+class BulkImportError(ValueError):
+    """Raised when the request body is not a supported archive or upload."""
+
+def is_archive(filename: str) -> bool:
+    """True for file names the importer unpacks instead of processing directly."""
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+class BulkImporter:
+    """Streams archive entries straight into the FileProcessor."""
+    
+    def __init__(self, file_processor: FileProcessor, allowed_extensions: Iterable[str],
+                 staging_dir: Optional[Path] = None):
+        self.file_processor = file_processor
+        self.allowed_extensions = {ext.lower() for ext in allowed_extensions}
+        self.staging_dir = Path(staging_dir or Config.UPLOAD_SESSION_DIR)
+        self.max_entry_size = Config.MAX_CHUNKED_UPLOAD_SIZE
+        self.logger = logging.getLogger(__name__)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+    
+    def import_stream(self, stream: BinaryIO, content_type: str) -> Dict[str, Any]:
+        """Import a raw zip or tar request body."""
+        content_type = (content_type or '').split(';')[0].strip().lower()
+        
+        if content_type in ZIP_TYPES:
+            return self._run(lambda staging: self._zip_entries(stream, staging))
+        if content_type in TAR_TYPES:
+            return self._run(lambda staging: self._tar_entries(stream))
+        
+        raise BulkImportError(f"Unsupported content type for bulk upload: {content_type or 'none'}")
+    
+    def import_files(self, files: Iterable[Any]) -> Dict[str, Any]:
+        """Import multipart file parts (werkzeug FileStorage); archives among them are unpacked."""
+        def entries(staging: Path) -> Iterator[Tuple[str, Any]]:
+            for storage in files:
+                name = storage.filename or ''
+                if name.lower().endswith('.zip'):
+                    yield from self._zip_entries(storage.stream, staging)
+                elif is_archive(name):
+                    yield from self._tar_entries(storage.stream)
+                else:
+                    yield name, storage.stream
+        
+        return self._run(entries)
+    
+    def _run(self, entries) -> Dict[str, Any]:
+        """Process all entries inside a private staging directory."""
+        results: List[Dict[str, Any]] = []
+        counts = {'processed': 0, 'duplicate': 0, 'skipped': 0, 'failed': 0}
+        
+        with tempfile.TemporaryDirectory(dir=str(self.staging_dir), prefix='bulk-') as staging:
+            staging = Path(staging)
+            try:
+                for name, stream in entries(staging):
+                    result = self._import_entry(name, stream, staging)
+                    counts[result['status']] += 1
+                    results.append(result)
+                    broker.publish('ingest', {
+                        'stage': BULK_STAGES[result['status']],
+                        'file': result['name'],
+                        'rag_file': result.get('rag_file'),
+                        'source': 'bulk',
+                        'progress': len(results)
+                    })
+            except (zipfile.BadZipFile, tarfile.TarError) as e:
+                raise BulkImportError(f"Invalid archive: {e}") from e
+        
+        self.logger.info(
+            f"Bulk import finished: {counts['processed']} processed, {counts['duplicate']} duplicates, "
+            f"{counts['skipped']} skipped, {counts['failed']} failed"
+        )
+        return {'counts': counts, 'files': results}
+    
+    def _import_entry(self, name: str, stream: Any, staging: Path) -> Dict[str, Any]:
+        """Hash, de-duplicate, convert and store a single entry."""
+        filename = secure_filename(PurePosixPath(name.replace('\\', '/')).name)
+        if not filename:
+            return {'name': name, 'status': 'skipped', 'reason': 'Invalid filename'}
+        
+        file_ext = Path(filename).suffix.lower()
+        if file_ext not in self.allowed_extensions:
+            return {'name': name, 'status': 'skipped', 'reason': f'Unsupported file type: {file_ext}'}
+        if stream is None:
+            return {'name': name, 'status': 'skipped', 'reason': 'File too large'}
+        
+        # Multipart parts were already hashed while the request was parsed
+        spool = stream if isinstance(stream, HashingSpoolFile) else HashingSpoolFile.from_stream(stream, staging)
+        spool.close()
+        
+        file_hash = spool.hexdigest()
+        if self.file_processor.is_known_hash(file_hash):
+            spool.discard()
+            return {'name': name, 'status': 'duplicate'}
+        
+        staged_path = spool.move_to(staging / filename)
+        try:
+            processed = self.file_processor.process_file(staged_path, file_hash=file_hash)
+            rag_path = self.file_processor.save_to_rag(processed) if processed else None
+        finally:
+            staged_path.unlink(missing_ok=True)
+        
+        if rag_path is None:
+            return {'name': name, 'status': 'failed', 'reason': 'Conversion failed'}
+        return {'name': name, 'status': 'processed', 'rag_file': rag_path.name}
+    
+    def _zip_entries(self, stream: BinaryIO, staging: Path) -> Iterator[Tuple[str, Any]]:
+        """Zip needs its central directory, so the archive itself is spooled first."""
+        archive = stream if isinstance(stream, HashingSpoolFile) else HashingSpoolFile.from_stream(stream, staging)
+        archive.close()
+        
+        try:
+            with zipfile.ZipFile(archive.path) as zf:
+                for info in zf.infolist():
+                    if info.is_dir() or self._is_metadata_entry(info.filename):
+                        continue
+                    if info.file_size > self.max_entry_size:
+                        yield info.filename, None
+                        continue
+                    with zf.open(info) as member:
+                        yield info.filename, member
+        finally:
+            archive.discard()
+    
+    def _tar_entries(self, stream: BinaryIO) -> Iterator[Tuple[str, Any]]:
+        """Tar streams are read strictly sequentially, without seeking."""
+        with tarfile.open(fileobj=stream, mode='r|*') as tf:
+            for member in tf:
+                if not member.isfile() or self._is_metadata_entry(member.name):
+                    continue
+                if member.size > self.max_entry_size:
+                    yield member.name, None
+                    continue
+                yield member.name, tf.extractfile(member)
+    
+    @staticmethod
+    def _is_metadata_entry(name: str) -> bool:
+        """macOS resource forks and hidden files are never documents."""
+        parts = PurePosixPath(name.replace('\\', '/')).parts
+        return any(part == '__MACOSX' or part.startswith('.') for part in parts)
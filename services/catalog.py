@@ -0,0 +1,339 @@
+"""
+AITON-RAG Document Catalog
+SQLite-Katalog der Metadaten aller RAG-Dokumente
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import Config
+from .facets import normalize_filters
+from .metadata_columns import RANGE_FILTERS, RANGE_OPERATORS
+from .rag_document import RagDocument
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    rag_filename TEXT PRIMARY KEY,
+    original_filename TEXT NOT NULL,
+    file_hash TEXT NOT NULL,
+    file_size INTEGER,
+    mime_type TEXT,
+    file_extension TEXT,
+    created_at TEXT,
+    processed_at TEXT,
+    category TEXT,
+    rag_path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_documents_recent ON documents (processed_at DESC, rag_filename DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_hash ON documents (file_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_category ON documents (category, processed_at DESC);
+CREATE INDEX IF NOT EXISTS idx_documents_mime_type ON documents (mime_type, processed_at DESC);
+CREATE TABLE IF NOT EXISTS minhash_signatures (
+    rag_filename TEXT PRIMARY KEY,
+    signature BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS minhash_bands (
+    band_hash INTEGER NOT NULL,
+    rag_filename TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_minhash_bands ON minhash_bands (band_hash);
+CREATE INDEX IF NOT EXISTS idx_minhash_bands_document ON minhash_bands (rag_filename);
+CREATE TABLE IF NOT EXISTS quarantine (
+    file_hash TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    quarantined_at TEXT NOT NULL
+);
+"""
+
+# Supported orderings for list_documents
+SORT_ORDERS = ('filename', 'recent')
+
+class DocumentCatalog:
+    """Indizierter Metadaten-Katalog statt Frontmatter-Scans pro Request"""
+    
+    def __init__(self, db_path: Optional[Path] = None):
+        self.config = Config()
+        self.logger = logging.getLogger(__name__)
+        self.db_path = Path(db_path or self.config.CATALOG_DB)
+        self._local = threading.local()
+        
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Liefert die Verbindung des aktuellen Threads"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+    
+    def add_document(self, rag_path: Path, processed_data: Dict) -> None:
+        """
+        Trägt ein gespeichertes RAG-Dokument in den Katalog ein
+        
+        Args:
+            rag_path: Pfad der geschriebenen Markdown-Datei
+            processed_data: Ergebnis von FileProcessor.process_file
+        """
+        metadata = processed_data['metadata']
+        
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO documents (
+                    rag_filename, original_filename, file_hash, file_size, mime_type,
+                    file_extension, created_at, processed_at, category, rag_path
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL, ?)
+                """,
+                (
+                    rag_path.name,
+                    metadata['filename'],
+                    processed_data['file_hash'],
+                    metadata.get('file_size'),
+                    metadata.get('mime_type'),
+                    metadata.get('file_extension') or Path(metadata['filename']).suffix.lower(),
+                    metadata.get('created_at'),
+                    processed_data['processed_at'],
+                    str(rag_path)
+                )
+            )
+    
+    def remove_document(self, rag_filename: str) -> None:
+        """Entfernt ein Dokument aus dem Katalog"""
+        with self._connect() as conn:
+            conn.execute('DELETE FROM documents WHERE rag_filename = ?', (rag_filename,))
+            self._remove_signatures(conn, [rag_filename])
+    
+    def has_hash(self, file_hash: str) -> bool:
+        """Prüft, ob eine Datei mit diesem SHA-256 bereits indexiert ist"""
+        row = self._connect().execute(
+            'SELECT 1 FROM documents WHERE file_hash = ? LIMIT 1', (file_hash,)
+        ).fetchone()
+        return row is not None
+    
+    def add_signature(self, rag_filename: str, signature: bytes, band_hashes: List[int]) -> None:
+        """
+        Speichert die MinHash-Signatur eines Dokuments samt LSH-Bändern
+        
+        Args:
+            rag_filename: Name der RAG-Datei
+            signature: Signatur als Bytes (siehe MinHasher.to_bytes)
+            band_hashes: Hash pro LSH-Band (siehe MinHasher.band_hashes)
+        """
+        with self._connect() as conn:
+            self._remove_signatures(conn, [rag_filename])
+            conn.execute(
+                'INSERT INTO minhash_signatures (rag_filename, signature) VALUES (?, ?)',
+                (rag_filename, signature)
+            )
+            conn.executemany(
+                'INSERT INTO minhash_bands (band_hash, rag_filename) VALUES (?, ?)',
+                [(band_hash, rag_filename) for band_hash in band_hashes]
+            )
+    
+    def near_duplicate_candidates(self, band_hashes: List[int]) -> List[Tuple[str, bytes]]:
+        """Dokumente (rag_filename, Signatur), die mindestens ein LSH-Band teilen"""
+        if not band_hashes:
+            return []
+        rows = self._connect().execute(
+            f"""
+            SELECT s.rag_filename, s.signature FROM minhash_signatures s
+            WHERE s.rag_filename IN (
+                SELECT rag_filename FROM minhash_bands WHERE band_hash IN ({', '.join('?' * len(band_hashes))})
+            )
+            """,
+            band_hashes
+        ).fetchall()
+        return [(row[0], row[1]) for row in rows]
+    
+    @staticmethod
+    def _remove_signatures(conn: sqlite3.Connection, rag_filenames: List[str]) -> None:
+        params = [(name,) for name in rag_filenames]
+        conn.executemany('DELETE FROM minhash_signatures WHERE rag_filename = ?', params)
+        conn.executemany('DELETE FROM minhash_bands WHERE rag_filename = ?', params)
+    
+    def quarantine(self, file_hash: str, filename: str, reason: str) -> None:
+        """Sperrt eine Datei, deren Konvertierung den Sandbox-Worker überfordert hat"""
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO quarantine (file_hash, filename, reason, quarantined_at) VALUES (?, ?, ?, ?)',
+                (file_hash, filename, reason, datetime.now().isoformat())
+            )
+    
+    def is_quarantined(self, file_hash: str) -> bool:
+        row = self._connect().execute(
+            'SELECT 1 FROM quarantine WHERE file_hash = ?', (file_hash,)
+        ).fetchone()
+        return row is not None
+    
+    def quarantined(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """Gesperrte Dateien, neueste zuerst"""
+        rows = self._connect().execute(
+            'SELECT * FROM quarantine ORDER BY quarantined_at DESC LIMIT ?', (limit,)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def count_quarantined(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM quarantine').fetchone()[0]
+    
+    def release(self, file_hash: str) -> bool:
+        """Hebt die Sperre einer Datei auf (z.B. nach einem Konverter-Update)"""
+        with self._connect() as conn:
+            return conn.execute('DELETE FROM quarantine WHERE file_hash = ?', (file_hash,)).rowcount > 0
+    
+    def update_categories(self, categories: Dict[str, str]) -> None:
+        """Schreibt die vom Aggregator vergebenen Kategorien (rag_filename -> Kategorie)"""
+        if not categories:
+            return
+        
+        with self._connect() as conn:
+            conn.executemany(
+                'UPDATE documents SET category = ? WHERE rag_filename = ?',
+                [(category, rag_filename) for rag_filename, category in categories.items()]
+            )
+    
+    def count(self, category: Optional[str] = None, mime_type: Optional[str] = None,
+              extension: Optional[str] = None, ranges: Optional[Dict[str, Any]] = None) -> int:
+        """Anzahl der Dokumente, optional gefiltert"""
+        clauses, params = self._filter_clauses(category, mime_type, extension, ranges)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        row = self._connect().execute(f'SELECT COUNT(*) FROM documents {where}', params).fetchone()
+        return row[0]
+    
+    def list_documents(self, limit: int = 100, after: Optional[List[Any]] = None,
+                       sort: str = 'filename', category: Optional[str] = None,
+                       mime_type: Optional[str] = None, extension: Optional[str] = None,
+                       ranges: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Liefert eine Seite von Dokumenten per Keyset-Pagination
+        
+        Args:
+            limit: Maximale Anzahl Einträge
+            after: Sortierschlüssel des letzten Eintrags der vorherigen Seite (siehe sort_key)
+            sort: 'filename' (alphabetisch) oder 'recent' (neueste zuerst)
+            category: Optionaler Kategorie-Filter
+            mime_type: Optionale MIME-Types, kommagetrennt (wie bei der Suche)
+            extension: Optionale Dateiendungen, kommagetrennt (pdf,docx)
+            ranges: Optionale Bereichs-Filter (siehe metadata_columns.parse_range_filters)
+        
+        Returns:
+            Liste der Katalogeinträge als Dicts
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"Unsupported sort order: {sort}")
+        
+        clauses, params = self._filter_clauses(category, mime_type, extension, ranges)
+        
+        if sort == 'recent':
+            order_by = 'processed_at DESC, rag_filename DESC'
+            if after is not None:
+                if not isinstance(after, list) or len(after) != 2:
+                    raise ValueError("Cursor does not belong to this sort order")
+                clauses.append('(processed_at, rag_filename) < (?, ?)')
+                params.extend(after)
+        else:
+            order_by = 'rag_filename'
+            if after is not None:
+                if not isinstance(after, list) or len(after) != 1:
+                    raise ValueError("Cursor does not belong to this sort order")
+                clauses.append('rag_filename > ?')
+                params.extend(after)
+        
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._connect().execute(
+            f'SELECT * FROM documents {where} ORDER BY {order_by} LIMIT ?',
+            params + [limit]
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def recent_documents(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Die zuletzt verarbeiteten Dokumente"""
+        return self.list_documents(limit=limit, sort='recent')
+    
+    @staticmethod
+    def sort_key(record: Dict[str, Any], sort: str = 'filename') -> List[Any]:
+        """Sortierschlüssel eines Eintrags, Grundlage für Cursor"""
+        if sort == 'recent':
+            return [record['processed_at'], record['rag_filename']]
+        return [record['rag_filename']]
+    
+    def sync_with_directory(self, rag_dir: Optional[Path] = None) -> None:
+        """
+        Gleicht den Katalog mit dem RAG-Verzeichnis ab
+        
+        Trägt Dateien nach, die vor Einführung des Katalogs geschrieben wurden,
+        und entfernt Einträge, deren Datei nicht mehr existiert.
+        """
+        rag_dir = Path(rag_dir or self.config.RAG_DATA_DIR)
+        on_disk = {
+            entry.name: Path(entry.path) for entry in os.scandir(rag_dir)
+            if entry.name.endswith('.md') and entry.is_file()
+        }
+        
+        conn = self._connect()
+        cataloged = {row[0] for row in conn.execute('SELECT rag_filename FROM documents')}
+        
+        missing = [on_disk[name] for name in on_disk.keys() - cataloged]
+        stale = cataloged - on_disk.keys()
+        
+        for rag_path in missing:
+            try:
+                metadata = RagDocument(rag_path).metadata
+                self.add_document(rag_path, {
+                    'file_hash': metadata.get('file_hash', ''),
+                    'processed_at': metadata.get('processed_at'),
+                    'metadata': {
+                        'filename': metadata.get('filename', rag_path.name),
+                        'file_size': _to_int(metadata.get('file_size')),
+                        'mime_type': metadata.get('mime_type'),
+                        'created_at': metadata.get('created_at')
+                    }
+                })
+            except Exception as e:
+                self.logger.warning(f"Could not catalog {rag_path}: {e}")
+        
+        if stale:
+            with conn:
+                conn.executemany('DELETE FROM documents WHERE rag_filename = ?', [(name,) for name in stale])
+                self._remove_signatures(conn, list(stale))
+        
+        if missing or stale:
+            self.logger.info(f"Catalog synchronized: {len(missing)} added, {len(stale)} removed")
+    
+    def _filter_clauses(self, category: Optional[str], mime_type: Optional[str],
+                        extension: Optional[str] = None, ranges: Optional[Dict[str, Any]] = None):
+        """SQL-Bedingungen für die optionalen Filter"""
+        clauses, params = [], []
+        if category:
+            clauses.append('category = ?')
+            params.append(category)
+        mime_types = normalize_filters({'mime_type': mime_type}).get('mime_type')
+        if mime_types:
+            clauses.append(f"mime_type IN ({', '.join('?' * len(mime_types))})")
+            params.extend(mime_types)
+        extensions = normalize_filters({'extension': extension}).get('extension')
+        if extensions:
+            clauses.append(f"file_extension IN ({', '.join('?' * len(extensions))})")
+            params.extend(extensions)
+        for name, value in (ranges or {}).items():
+            column, compare = RANGE_FILTERS[name]
+            clauses.append(f'{column} {RANGE_OPERATORS[compare]} ?')
+            # Timestamps are stored as ISO strings, which sort chronologically
+            params.append(value if column == 'file_size' else value.isoformat())
+        return clauses, params
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
@@ -0,0 +1,169 @@
+"""
+Converter Sandbox for AITON-RAG
+
+Runs conversions in worker processes instead of the web/watcher process.
+Every task has a wall-clock timeout; workers run with a memory limit
+(RLIMIT_AS: Linux does not enforce RLIMIT_RSS, so the address space is
+capped) and are replaced after max_tasks tasks, a timeout, the memory limit
+or a crash. An exception raised by the task itself is caught in the worker,
+which stays in the pool for the next task. A worker is
+the leader of its own process group, so a timeout also kills the processes
+it started (page-parallel PDF extraction).
+"""
+
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+from multiprocessing.util import Finalize
+from typing import Any, Callable, List
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, timeouts still apply
+    resource = None
+
+# Seconds a worker gets to exit after its pipe is closed
+SHUTDOWN_TIMEOUT = 5
+
+class SandboxError(Exception):
+    """A task that did not finish in its worker; reason is 'timeout', 'memory', 'crashed' or 'error'."""
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+def _worker_main(conn, target: Callable, memory_limit: int) -> None:
+    """Worker loop: run target(*args) for every task until the pipe is closed."""
+    if hasattr(os, 'setpgrp'):
+        os.setpgrp()
+    if resource is not None and memory_limit > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    
+    while True:
+        try:
+            args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = ('ok', target(*args))
+        except MemoryError:
+            reply = ('memory', 'memory limit exceeded')
+        except Exception as e:
+            reply = ('error', f"{type(e).__name__}: {e}")
+        conn.send(reply)
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'tasks')
+    
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+        self.tasks = 0
+    
+    def kill(self) -> None:
+        """Kill the worker and its process group."""
+        if hasattr(os, 'killpg'):
+            try:
+                os.killpg(self.process.pid, signal.SIGKILL)
+            except OSError:
+                pass  # not yet its own group leader
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+    
+    def stop(self) -> None:
+        """Let an idle worker exit (EOF on its pipe), kill it if it does not."""
+        self.conn.close()
+        self.process.join(SHUTDOWN_TIMEOUT)
+        if self.process.is_alive():
+            self.kill()
+
+def _stop_workers(workers: List[_Worker]) -> None:
+    while workers:
+        workers.pop().stop()
+
+class ConverterSandbox:
+    """
+    Pool of worker processes for target(*args) calls
+    
+    target and its arguments are pickled, so target must be a module-level
+    function (or a functools.partial of one). Workers are started on demand.
+    """
+    
+    def __init__(self, target: Callable, workers: int = 2, timeout: float = 600,
+                 memory_limit: int = 0, max_tasks: int = 100):
+        self.target = target
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_tasks = max(1, max_tasks)
+        self.logger = logging.getLogger(__name__)
+        
+        # Spawned workers do not inherit the locks and threads of the app process
+        self._context = multiprocessing.get_context('spawn')
+        self._slots = threading.BoundedSemaphore(max(1, workers))
+        self._lock = threading.Lock()
+        self._idle: List[_Worker] = []
+        
+        # Idle workers are stopped with the sandbox, and at interpreter exit before
+        # multiprocessing joins its (non-daemonic) children
+        Finalize(self, _stop_workers, args=(self._idle,), exitpriority=10)
+    
+    def run(self, *args) -> Any:
+        """
+        target(*args) in a worker process
+        
+        Raises:
+            SandboxError: on timeout, memory limit, worker crash or an exception in target
+        """
+        with self._slots:
+            worker = self._take_worker()
+            try:
+                worker.conn.send(args)
+                if not worker.conn.poll(self.timeout):
+                    worker.kill()
+                    raise SandboxError('timeout', f"no result after {self.timeout}s")
+                status, value = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                worker.kill()
+                raise SandboxError('crashed', f"worker exited with code {worker.process.exitcode}") from e
+            
+            if status == 'memory':
+                worker.kill()
+                raise SandboxError(status, value)
+            
+            # An exception in target leaves the worker intact, it is reused
+            worker.tasks += 1
+            self._release_worker(worker)
+            if status == 'error':
+                raise SandboxError(status, value)
+            return value
+    
+    def close(self) -> None:
+        """Stop the idle workers; running tasks finish first."""
+        with self._lock:
+            _stop_workers(self._idle)
+    
+    def _take_worker(self) -> _Worker:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main, args=(child_conn, self.target, self.memory_limit),
+            name='converter-sandbox'
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+    
+    def _release_worker(self, worker: _Worker) -> None:
+        """Back to the idle list, or recycled after max_tasks tasks."""
+        if worker.tasks >= self.max_tasks:
+            self.logger.debug(f"Recycling converter worker {worker.process.pid} after {worker.tasks} tasks")
+            worker.stop()
+            return
+        with self._lock:
+            self._idle.append(worker)
@@ -0,0 +1,108 @@
+"""
+Streaming CSV Conversion for AITON-RAG
+
+Rows are read with the csv module and written as Markdown tables of
+CSV_CHUNK_ROWS rows each. Every section has its own heading with the row
+range and repeats the header row, so a section found on its own (search
+snippet, retrieval chunk) still says what its columns mean. The delimiter
+and the presence of a header row are detected on a sample; the file is
+never loaded as a whole.
+"""
+
+import csv
+import io
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+from .docx_stream import markdown_table
+from .text_convert import TextSource
+
+# Characters inspected for delimiter and header detection
+DIALECT_SAMPLE_SIZE = 16 * 1024
+DELIMITERS = ',;\t|'
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value.strip().replace(',', '.'))
+        return True
+    except ValueError:
+        return False
+
+def sniff_dialect(sample: str) -> Tuple[str, bool]:
+    """
+    (delimiter, has_header) of a CSV sample
+    
+    The delimiter is the candidate that splits the sample rows into the
+    same number (> 1) of columns most often; csv.Sniffer guesses wrong on
+    quoted multi-line fields and decimal commas. A first row without any
+    numeric cell is taken as the header.
+    """
+    # Only complete lines, a cut-off last line would count as an odd row
+    if '\n' in sample:
+        sample = sample[:sample.rindex('\n') + 1]
+    
+    best, best_score, best_rows = ',', (0, 0), []
+    for delimiter in DELIMITERS:
+        try:
+            rows = [row for row in csv.reader(io.StringIO(sample), delimiter=delimiter) if row]
+        except csv.Error:
+            continue
+        widths = Counter(len(row) for row in rows)
+        if not widths:
+            continue
+        width, count = widths.most_common(1)[0]
+        score = (count if width > 1 else 0, width)
+        if score > best_score:
+            best, best_score, best_rows = delimiter, score, rows
+    
+    has_header = not best_rows or not any(_is_number(value) for value in best_rows[0] if value.strip())
+    return best, has_header
+
+def _cell(value: str) -> str:
+    return ' '.join(value.split()).replace('|', '\\|')
+
+def iter_csv_markdown(source: TextIO, chunk_rows: int = 500) -> Iterator[str]:
+    """Markdown sections of chunk_rows rows from a CSV text stream."""
+    # Read on instead of seeking back: decoded sources are not seekable
+    sample = source.read(DIALECT_SAMPLE_SIZE)
+    sample += source.readline()
+    delimiter, has_header = sniff_dialect(sample)
+    
+    reader = csv.reader(chain(io.StringIO(sample), source), delimiter=delimiter)
+    header: Optional[List[str]] = None
+    if has_header:
+        header = [_cell(value) for value in next(reader, [])]
+    
+    rows: List[List[str]] = []
+    first = 1
+    for row in reader:
+        if not any(value.strip() for value in row):
+            continue
+        rows.append([_cell(value) for value in row])
+        if len(rows) == chunk_rows:
+            yield _section(header, rows, first)
+            first += len(rows)
+            rows = []
+    if rows:
+        yield _section(header, rows, first)
+
+def _section(header: Optional[List[str]], rows: List[List[str]], first: int) -> str:
+    if header is None:
+        header = [f"Spalte {i + 1}" for i in range(max(len(row) for row in rows))]
+    table = markdown_table([header] + rows) or ''
+    return f"## Zeilen {first}–{first + len(rows) - 1}\n\n{table}\n\n"
+
+def convert_csv_file(path: Path, target: TextIO, chunk_rows: int = 500) -> str:
+    """
+    Stream a CSV file as Markdown sections into target
+    
+    Returns:
+        The detected encoding
+    """
+    source = TextSource(path)
+    with source.text(newline='') as text:
+        for section in iter_csv_markdown(text, chunk_rows):
+            target.write(section)
+    return source.encoding
@@ -0,0 +1,228 @@
+"""
+Streaming DOCX Conversion for AITON-RAG
+
+Reads word/document.xml straight from the DOCX zip with incremental XML
+parsing and emits Markdown block by block: headings (from the paragraph
+style or its outline level), bulleted and numbered lists (from
+numbering.xml) and tables. Parsed elements are dropped as soon as they are
+converted, so memory stays flat no matter how long the document is.
+"""
+
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+DOCUMENT_PART = 'word/document.xml'
+STYLES_PART = 'word/styles.xml'
+NUMBERING_PART = 'word/numbering.xml'
+
+# Built-in heading style names ("heading 1") and the title style
+HEADING_NAME = re.compile(r'^heading\s*(\d)$')
+
+# Depth of the direct children of <w:body> (w:document > w:body > child)
+BLOCK_DEPTH = 3
+
+def _val(element: Optional[ET.Element], tag: str) -> Optional[str]:
+    """w:val attribute of a child element, None if absent."""
+    if element is None:
+        return None
+    child = element.find(W + tag)
+    return child.get(W + 'val') if child is not None else None
+
+class _Style:
+    __slots__ = ('heading', 'num_id', 'level', 'based_on')
+    
+    def __init__(self, heading: Optional[int], num_id: Optional[str], level: Optional[str], based_on: Optional[str]):
+        self.heading = heading
+        self.num_id = num_id
+        self.level = level
+        self.based_on = based_on
+
+def _read_styles(archive: zipfile.ZipFile) -> Dict[str, _Style]:
+    """Paragraph styles with heading level and list numbering, inheritance resolved."""
+    if STYLES_PART not in archive.namelist():
+        return {}
+    
+    styles: Dict[str, _Style] = {}
+    with archive.open(STYLES_PART) as f:
+        for style in ET.parse(f).getroot().iter(W + 'style'):
+            if style.get(W + 'type') != 'paragraph':
+                continue
+            name = (_val(style, 'name') or '').lower()
+            properties = style.find(W + 'pPr')
+            outline = _val(properties, 'outlineLvl')
+            match = HEADING_NAME.match(name)
+            
+            heading = None
+            if outline is not None and outline.isdigit() and int(outline) < 9:
+                heading = int(outline) + 1
+            elif match:
+                heading = int(match.group(1))
+            elif name == 'title':
+                heading = 1
+            
+            numbering = properties.find(W + 'numPr') if properties is not None else None
+            styles[style.get(W + 'styleId')] = _Style(
+                heading, _val(numbering, 'numId'), _val(numbering, 'ilvl'), _val(style, 'basedOn')
+            )
+    
+    # Inherit heading level and numbering from base styles
+    for style in styles.values():
+        base, seen = style.based_on, set()
+        while base in styles and base not in seen and (style.heading is None or style.num_id is None):
+            seen.add(base)
+            parent = styles[base]
+            style.heading = style.heading if style.heading is not None else parent.heading
+            if style.num_id is None:
+                style.num_id, style.level = parent.num_id, parent.level
+            base = parent.based_on
+    return styles
+
+def _read_numbering(archive: zipfile.ZipFile) -> Dict[Tuple[str, str], bool]:
+    """(numId, level) -> True for numbered, False for bulleted lists."""
+    if NUMBERING_PART not in archive.namelist():
+        return {}
+    
+    with archive.open(NUMBERING_PART) as f:
+        root = ET.parse(f).getroot()
+    
+    abstract_formats: Dict[str, Dict[str, str]] = {}
+    for abstract in root.iter(W + 'abstractNum'):
+        abstract_formats[abstract.get(W + 'abstractNumId')] = {
+            level.get(W + 'ilvl'): _val(level, 'numFmt') or 'bullet' for level in abstract.iter(W + 'lvl')
+        }
+    
+    ordered = {}
+    for num in root.iter(W + 'num'):
+        formats = abstract_formats.get(_val(num, 'abstractNumId'), {})
+        for level, number_format in formats.items():
+            ordered[(num.get(W + 'numId'), level)] = number_format not in ('bullet', 'none')
+    return ordered
+
+def _paragraph_text(paragraph: ET.Element, line_break: str = '\n') -> str:
+    """Visible text of a paragraph (deleted revisions and field codes excluded)."""
+    parts = []
+    for element in paragraph.iter():
+        if element.tag == W + 't':
+            parts.append(element.text or '')
+        elif element.tag == W + 'tab':
+            parts.append('\t')
+        elif element.tag in (W + 'br', W + 'cr'):
+            parts.append(line_break)
+    return ''.join(parts).strip()
+
+def _table_markdown(table: ET.Element) -> Optional[str]:
+    """Markdown table; the first row is the header, merged cells keep their columns."""
+    rows: List[List[str]] = []
+    for row in table.findall(W + 'tr'):
+        cells = []
+        for cell in row.findall(W + 'tc'):
+            text = '<br>'.join(
+                filter(None, (_paragraph_text(p, ' ') for p in cell.iter(W + 'p')))
+            )
+            cells.append(' '.join(text.split()).replace('|', '\\|'))
+            span = _val(cell.find(W + 'tcPr'), 'gridSpan')
+            if span and span.isdigit():
+                cells.extend([''] * (int(span) - 1))
+        rows.append(cells)
+    
+    return markdown_table(rows)
+
+def markdown_table(rows: List[List[str]]) -> Optional[str]:
+    """Rows of cell texts as a Markdown table (first row as header); None if all cells are empty."""
+    if not any(any(cells) for cells in rows):
+        return None
+    
+    width = max(len(cells) for cells in rows)
+    lines = []
+    for index, cells in enumerate(rows):
+        cells = cells + [''] * (width - len(cells))
+        lines.append('| ' + ' | '.join(cells) + ' |')
+        if index == 0:
+            lines.append('|' + ' --- |' * width)
+    return '\n'.join(lines)
+
+def _paragraph_block(paragraph: ET.Element, styles: Dict[str, _Style],
+                     numbering: Dict[Tuple[str, str], bool]) -> Optional[Tuple[str, str]]:
+    """(kind, Markdown) of a paragraph outside tables; None for empty paragraphs."""
+    text = _paragraph_text(paragraph)
+    if not text:
+        return None
+    
+    properties = paragraph.find(W + 'pPr')
+    style = styles.get(_val(properties, 'pStyle') or 'Normal')
+    
+    outline = _val(properties, 'outlineLvl')
+    heading = style.heading if style else None
+    if outline is not None and outline.isdigit() and int(outline) < 9:
+        heading = int(outline) + 1
+    if heading:
+        return 'heading', f"{'#' * min(heading, 6)} {' '.join(text.split())}"
+    
+    numbering_properties = properties.find(W + 'numPr') if properties is not None else None
+    num_id = _val(numbering_properties, 'numId') or (style.num_id if style else None)
+    if num_id and num_id != '0':
+        level = _val(numbering_properties, 'ilvl') or (style.level if style else None) or '0'
+        marker = '1.' if numbering.get((num_id, level)) else '-'
+        indent = '  ' * int(level) if level.isdigit() else ''
+        return 'list', f"{indent}{marker} {' '.join(text.split())}"
+    
+    return 'paragraph', text
+
+def iter_docx_markdown(path: Path) -> Iterator[str]:
+    """
+    Stream a DOCX file as Markdown chunks
+    
+    Blocks are separated by blank lines, consecutive list items by single
+    newlines, so ''.join() of the chunks is the whole document.
+    
+    Raises:
+        zipfile.BadZipFile, KeyError, ET.ParseError: for files that are not valid DOCX
+    """
+    with zipfile.ZipFile(path) as archive:
+        styles = _read_styles(archive)
+        numbering = _read_numbering(archive)
+        
+        previous: Optional[str] = None
+        depth = 0
+        table_depth = 0
+        body: Optional[ET.Element] = None
+        
+        with archive.open(DOCUMENT_PART) as f:
+            for event, element in ET.iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    depth += 1
+                    if element.tag == W + 'tbl':
+                        table_depth += 1
+                    elif element.tag == W + 'body':
+                        body = element
+                    continue
+                
+                depth -= 1
+                block: Optional[Tuple[str, str]] = None
+                
+                if element.tag == W + 'tbl':
+                    table_depth -= 1
+                    if table_depth == 0:
+                        markdown = _table_markdown(element)
+                        block = ('table', markdown) if markdown else None
+                elif element.tag == W + 'p' and table_depth == 0:
+                    block = _paragraph_block(element, styles, numbering)
+                
+                if block is not None:
+                    kind, markdown = block
+                    if previous is not None:
+                        yield '\n' if kind == previous == 'list' else '\n\n'
+                    yield markdown
+                    previous = kind
+                
+                # Converted blocks are not needed any more
+                if depth == BLOCK_DEPTH - 1 and body is not None and element is not body:
+                    body.clear()
+        
+        if previous is not None:
+            yield '\n'
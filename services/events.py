@@ -0,0 +1,115 @@
+"""
+Server-Sent Events for AITON-RAG
+
+In-process publish/subscribe broker behind /api/v1/events. Services publish
+ingest progress and knowledge base changes; every open event stream gets
+them pushed instead of polling the health endpoint.
+"""
+
+import json
+import queue
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+# Events kept for clients reconnecting with Last-Event-ID
+HISTORY_SIZE = 200
+
+# Per-subscriber backlog; slow clients lose their oldest events first
+SUBSCRIBER_QUEUE_SIZE = 500
+
+HEARTBEAT_INTERVAL = 15.0
+
+def format_event(record: Dict[str, Any]) -> str:
+    """Serialize an event record in text/event-stream format."""
+    data = json.dumps(record['data'], ensure_ascii=False, default=str)
+    return f"id: {record['id']}\nevent: {record['event']}\ndata: {data}\n\n"
+
+class EventBroker:
+    """Fan-out of published events to all connected streams."""
+    
+    def __init__(self, history_size: int = HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._history = deque(maxlen=history_size)
+        self._latest: Dict[str, Dict[str, Any]] = {}
+        self._next_id = 1
+    
+    def publish(self, event: str, data: Dict[str, Any]) -> int:
+        """Send an event to every subscriber; returns its id."""
+        with self._lock:
+            record = {
+                'id': self._next_id,
+                'event': event,
+                'data': {**data, 'timestamp': datetime.now().isoformat()}
+            }
+            self._next_id += 1
+            self._history.append(record)
+            self._latest[event] = record
+            subscribers = list(self._subscribers)
+        
+        for subscriber in subscribers:
+            self._offer(subscriber, record)
+        return record['id']
+    
+    def latest(self, event: str) -> Optional[Dict[str, Any]]:
+        """Most recent record of an event type, if any was published."""
+        with self._lock:
+            return self._latest.get(event)
+    
+    def subscribe(self, last_event_id: Optional[int] = None) -> queue.Queue:
+        """Register a subscriber, replaying history after last_event_id."""
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if last_event_id is not None:
+                for record in self._history:
+                    if record['id'] > last_event_id:
+                        self._offer(subscriber, record)
+            self._subscribers.add(subscriber)
+        return subscriber
+    
+    def unsubscribe(self, subscriber: queue.Queue) -> None:
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+    
+    def stream(self, last_event_id: Optional[int] = None, initial: Optional[Dict[str, Any]] = None,
+               heartbeat: float = HEARTBEAT_INTERVAL) -> Iterator[str]:
+        """
+        Generator for a text/event-stream response
+        
+        Sends `initial` first (typically the current status), then every
+        published event; a comment line keeps idle connections open.
+        """
+        subscriber = self.subscribe(last_event_id)
+        try:
+            yield 'retry: 5000\n\n'
+            if initial is not None:
+                yield format_event(initial)
+            while True:
+                try:
+                    yield format_event(subscriber.get(timeout=heartbeat))
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+        finally:
+            self.unsubscribe(subscriber)
+    
+    @staticmethod
+    def _offer(subscriber: queue.Queue, record: Dict[str, Any]) -> None:
+        while True:
+            try:
+                subscriber.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+
+# Shared by all services of this process
+broker = EventBroker()
@@ -0,0 +1,113 @@
+"""
+Search Facets for AITON-RAG
+
+One bitmap per facet value (category, MIME type, file extension, month of
+processing) over the knowledge base entries, stored as Python integers.
+Filters are ANDed/ORed as whole bitmaps and facet counts are popcounts of
+the candidate bitmap ANDed with each value bitmap.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+FACET_FIELDS = ('category', 'mime_type', 'extension', 'date')
+
+def facet_values(entry: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Facet values of a knowledge base entry; metadata is the RAG frontmatter of its document."""
+    filename = metadata.get('filename') or entry.get('source_file') or ''
+    processed_at = str(metadata.get('processed_at') or metadata.get('created_at') or '')
+    return {
+        'category': entry.get('category'),
+        'mime_type': metadata.get('mime_type'),
+        'extension': Path(filename).suffix.lower() or None,
+        'date': processed_at[:7] or None  # YYYY-MM
+    }
+
+def to_bitmap(doc_ids: Iterable[int], size: int) -> int:
+    """Bitmap with the bits of doc_ids set."""
+    bits = bytearray((size + 7) // 8)
+    for doc_id in doc_ids:
+        bits[doc_id >> 3] |= 1 << (doc_id & 7)
+    return int.from_bytes(bits, 'little')
+
+if hasattr(int, 'bit_count'):  # Python 3.10+
+    popcount = int.bit_count
+else:
+    def popcount(bitmap: int) -> int:
+        return bin(bitmap).count('1')
+
+class BitmapSet:
+    """Constant-time membership tests on a bitmap (an int shift per test would copy it)."""
+    
+    def __init__(self, bitmap: int, size: int):
+        self._bits = bitmap.to_bytes((size + 7) // 8, 'little')
+    
+    def __contains__(self, doc_id: int) -> bool:
+        return bool(self._bits[doc_id >> 3] & (1 << (doc_id & 7)))
+
+class FacetIndex:
+    """Per-value bitmaps of the facet fields."""
+    
+    def __init__(self, values: Sequence[Dict[str, Optional[str]]]):
+        self.size = len(values)
+        self.bitmaps: Dict[str, Dict[str, int]] = {field: {} for field in FACET_FIELDS}
+        
+        doc_ids: Dict[str, Dict[str, List[int]]] = {field: {} for field in FACET_FIELDS}
+        for doc_id, doc_values in enumerate(values):
+            for field in FACET_FIELDS:
+                value = doc_values.get(field)
+                if value:
+                    doc_ids[field].setdefault(value, []).append(doc_id)
+        
+        for field, value_ids in doc_ids.items():
+            for value, ids in value_ids.items():
+                self.bitmaps[field][value] = to_bitmap(ids, self.size)
+    
+    def filter_bitmap(self, filters: Mapping[str, Iterable[str]]) -> Optional[int]:
+        """
+        Entries matching all fields (any of the values per field); None without filters
+        
+        Date values match by prefix, so "2024" selects every month of 2024.
+        """
+        result: Optional[int] = None
+        for field, wanted in filters.items():
+            wanted = [value for value in wanted if value]
+            if not wanted:
+                continue
+            
+            field_bitmaps = self.bitmaps.get(field, {})
+            bitmap = 0
+            for value, value_bitmap in field_bitmaps.items():
+                if value in wanted or (field == 'date' and value.startswith(tuple(wanted))):
+                    bitmap |= value_bitmap
+            result = bitmap if result is None else result & bitmap
+        return result
+    
+    def counts(self, candidates: int) -> Dict[str, Dict[str, int]]:
+        """Number of candidates per facet value, most frequent first."""
+        facets = {}
+        for field, field_bitmaps in self.bitmaps.items():
+            counts = {}
+            for value, value_bitmap in field_bitmaps.items():
+                count = popcount(candidates & value_bitmap)
+                if count:
+                    counts[value] = count
+            facets[field] = dict(sorted(counts.items(), key=lambda item: (-item[1], item[0])))
+        return facets
+
+def normalize_filters(filters: Optional[Mapping[str, Any]]) -> Dict[str, tuple]:
+    """Facet filters as field -> sorted tuple of values; comma separated strings are split."""
+    normalized = {}
+    for field in FACET_FIELDS:
+        values = (filters or {}).get(field)
+        if isinstance(values, str):
+            values = values.split(',')
+        values = {str(value).strip() for value in values or ()} - {''}
+        if field == 'extension':
+            values = {'.' + value.lower().lstrip('.') for value in values}
+        elif field == 'mime_type':
+            values = {value.lower() for value in values}
+        values = tuple(sorted(values))
+        if values:
+            normalized[field] = values
+    return normalized
@@ -4,20 +4,23 @@ Konvertiert verschiedene Dateiformate zu Markdown mit Metadaten
 """
 
 import os
+import functools
 import hashlib
 import logging
 import mimetypes
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+import zipfile
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple, Union
 from datetime import datetime
 import uuid
 
 # File processing imports
-try:
-    import PyPDF2
-except ImportError:
-    PyPDF2 = None
-
 try:
     from docx import Document
 except ImportError:
@@ -28,66 +31,190 @@ try:
 except ImportError:
     markdownify = None
 
-try:
-    import chardet
-except ImportError:
-    chardet = None
-
 from config import Config
+from .catalog import DocumentCatalog
+from .converter_sandbox import ConverterSandbox, SandboxError
+from .csv_convert import convert_csv_file
+from .docx_stream import iter_docx_markdown
+from .html_convert import BeautifulSoup, decode_html, html_to_markdown
+from .near_duplicates import DUPLICATE_ACTIONS, SIGNATURE_SAMPLE_CHARS, MinHasher
+from .pdf_backends import PdfBackend, available_backends, select_backend
+from .pdf_extract import extract_pdf_pages, page_section, remove_stale_caches
+from .text_convert import convert_text_file
+
+# Config values a sandbox worker takes over from the FileProcessor that started it
+SANDBOX_SETTINGS = (
+    'RAG_DIR', 'CSV_CHUNK_ROWS', 'PDF_BACKEND', 'PDF_PARALLEL_MIN_PAGES', 'PDF_WORKERS', 'PDF_PAGE_CACHE_DIR'
+)
+
+# Sandbox failures that put a file into quarantine (a converter exception does not)
+QUARANTINE_REASONS = ('timeout', 'memory', 'crashed')
+
+# Spooled conversions in the RAG directory (not matched by *.md)
+SPOOL_SUFFIX = '.md.part'
+SPOOL_MAX_AGE = 86400  # seconds; older spools belong to aborted runs
+COPY_BUFFER_SIZE = 1024 * 1024
+
+def _remove_spool_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+class MarkdownSpool:
+    """
+    Spool-Datei einer gestreamten Konvertierung
+    
+    Die Datei wird mit close() entfernt, spätestens aber wenn das Handle
+    nicht mehr referenziert wird (oder der Prozess endet) – auch wenn das
+    Ergebnis von process_file nie gespeichert wird.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._finalizer = weakref.finalize(self, _remove_spool_file, str(self.path))
+    
+    def __fspath__(self) -> str:
+        return str(self.path)
+    
+    def __enter__(self) -> 'MarkdownSpool':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+    
+    def open(self) -> TextIO:
+        return open(self.path, 'r', encoding='utf-8')
+    
+    def close(self) -> None:
+        """Entfernt die Spool-Datei (mehrfacher Aufruf unschädlich)"""
+        self._finalizer()
 
 class FileProcessor:
     """Intelligente Dateiverarbeitung für verschiedene Formate"""
     
-    def __init__(self):
+    def __init__(self, sandbox_settings: Optional[Dict[str, Any]] = None):
+        """
+        Args:
+            sandbox_settings: Nur im Sandbox-Worker: Config-Werte des startenden
+                Prozesses (SANDBOX_SETTINGS). Ein solcher FileProcessor konvertiert
+                nur; Katalog, Near-Duplicate-Erkennung und Aufräumen entfallen.
+        """
         self.config = Config()
+        # Applied before anything touches the file system
+        for name, value in (sandbox_settings or {}).items():
+            setattr(self.config, name, value)
         self.logger = logging.getLogger(__name__)
         self.processed_hashes = set()
         
-    def process_file(self, file_path: Path) -> Optional[Dict]:
+        # Hashes computed while an upload was streamed: path -> (hash, size)
+        self._upload_hashes: Dict[str, Tuple[str, int]] = {}
+        self._hash_lock = threading.Lock()
+        
+        # Worker processes for conversions, started on first use (see _convert)
+        self._sandbox: Optional[ConverterSandbox] = None
+        self._sandbox_lock = threading.Lock()
+        
+        self.catalog: Optional[DocumentCatalog] = None
+        self.minhasher = None
+        if sandbox_settings is not None:
+            return
+        
+        self.catalog = DocumentCatalog()
+        
+        # Near-duplicate detection (MinHash/LSH), disabled with a threshold of 0
+        if self.config.NEAR_DUPLICATE_THRESHOLD > 0:
+            self.minhasher = MinHasher(self.config.MINHASH_PERMUTATIONS, self.config.NEAR_DUPLICATE_THRESHOLD)
+        if self.config.NEAR_DUPLICATE_ACTION not in DUPLICATE_ACTIONS:
+            self.logger.warning(f"Unknown NEAR_DUPLICATE_ACTION {self.config.NEAR_DUPLICATE_ACTION!r}, using 'mark'")
+        
+        self._remove_stale_spools()
+    
+    def process_file(self, file_path: Path, file_hash: Optional[str] = None) -> Optional[Dict]:
         """
         Verarbeitet eine einzelne Datei zu Markdown
         
         Args:
             file_path: Pfad zur zu verarbeitenden Datei
+            file_hash: Bereits bekannter SHA-256 der Datei (spart das erneute Lesen)
             
         Returns:
-            Dict mit verarbeiteten Daten oder None bei Fehler
+            Dict mit verarbeiteten Daten oder None bei Fehler. Gestreamte
+            Konvertierungen stehen in markdown_file (MarkdownSpool) statt in
+            markdown_content; save_to_rag übernimmt sie, sonst close() aufrufen.
         """
         try:
+            file_path = Path(file_path)
+            
+            # The upload claim on this path ends here, also on the early returns below
+            upload_hash = self._take_upload_hash(file_path)
+            
             # File validation
             if not file_path.exists():
                 self.logger.error(f"File not found: {file_path}")
                 return None
                 
-            if file_path.stat().st_size > self.config.MAX_FILE_SIZE:
+            # Chunked uploads may exceed the per-request MAX_FILE_SIZE
+            if file_path.stat().st_size > self.config.MAX_CHUNKED_UPLOAD_SIZE:
                 self.logger.error(f"File too large: {file_path}")
                 return None
             
-            # Generate file hash for duplicate detection
-            file_hash = self._generate_file_hash(file_path)
-            if file_hash in self.processed_hashes:
+            # Generate file hash for duplicate detection, unless the upload already did
+            if file_hash is None:
+                file_hash = upload_hash or self._generate_file_hash(file_path)
+            if self.is_known_hash(file_hash):
                 self.logger.info(f"File already processed: {file_path}")
                 return None
+            if self.catalog.is_quarantined(file_hash):
+                self.logger.info(f"File is quarantined: {file_path}")
+                return None
                 
             # Extract metadata
             metadata = self._extract_metadata(file_path)
             
             # Convert to markdown based on file type
-            markdown_content = self._convert_to_markdown(file_path)
+            markdown_content = self._convert(file_path, file_hash)
             
             if markdown_content is None:
                 return None
+            
+            # Large conversions are spooled to disk instead of held in memory; the
+            # handle removes the spool file unless save_to_rag has done so already
+            markdown_file = None
+            if isinstance(markdown_content, Path):
+                markdown_file, markdown_content = MarkdownSpool(markdown_content), None
+            
+            # Near-duplicates of indexed documents (re-exports, other formats, minor revisions)
+            signature, duplicate = self._find_near_duplicate(
+                markdown_content if markdown_file is None else self._read_sample(markdown_file)
+            )
+            if duplicate and self.config.NEAR_DUPLICATE_ACTION == 'skip':
+                self.logger.info(f"Near-duplicate of {duplicate[0]} ({duplicate[1]:.2f}), skipped: {file_path}")
+                self.processed_hashes.add(file_hash)
+                if markdown_file is not None:
+                    markdown_file.close()
+                return None
                 
             # Store hash to prevent reprocessing
             self.processed_hashes.add(file_hash)
             
-            return {
+            processed = {
                 'file_path': str(file_path),
                 'file_hash': file_hash,
                 'metadata': metadata,
                 'markdown_content': markdown_content,
-                'processed_at': datetime.now().isoformat()
+                'markdown_file': markdown_file,
+                'processed_at': datetime.now().isoformat(),
+                'minhash': signature
             }
+            if duplicate:
+                self.logger.info(f"Near-duplicate of {duplicate[0]} ({duplicate[1]:.2f}): {file_path}")
+                processed['duplicate_of'], processed['duplicate_similarity'] = duplicate
+            return processed
             
         except Exception as e:
             self.logger.error(f"Error processing file {file_path}: {str(e)}")
@@ -95,13 +222,13 @@ class FileProcessor:
     
     def process_batch(self, upload_dir: Path) -> List[Dict]:
         """
-        Verarbeitet alle Dateien in einem Verzeichnis
+        Verarbeitet alle Dateien in einem Verzeichnis und speichert sie im RAG-Verzeichnis
         
         Args:
             upload_dir: Verzeichnis mit zu verarbeitenden Dateien
             
         Returns:
-            Liste der verarbeiteten Dateien
+            Liste der verarbeiteten Dateien, jeweils mit rag_path der gespeicherten Datei
         """
         processed_files = []
         
@@ -113,7 +240,10 @@ class FileProcessor:
             if file_path.is_file():
                 result = self.process_file(file_path)
                 if result:
-                    processed_files.append(result)
+                    # Saving also removes the spool file of streamed conversions
+                    result['rag_path'] = self.save_to_rag(result)
+                    if result['rag_path']:
+                        processed_files.append(result)
                     
         return processed_files
     
@@ -134,20 +264,110 @@ class FileProcessor:
             rag_filename = f"{original_name}_{unique_id}.md"
             rag_path = self.config.RAG_DIR / rag_filename
             
-            # Prepare content with metadata
-            content = self._format_markdown_with_metadata(processed_data)
-            
-            # Save to file
+            # Save to file; spooled conversions are copied over in blocks
+            markdown_file = processed_data.get('markdown_file')
             with open(rag_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+                if markdown_file is None:
+                    f.write(self._format_markdown_with_metadata(processed_data))
+                else:
+                    f.write(self._format_markdown_header(processed_data))
+                    with markdown_file.open() as spool:
+                        shutil.copyfileobj(spool, f, COPY_BUFFER_SIZE)
+                    f.write('\n')
+                    markdown_file.close()
+            
+            # Register in the metadata catalog
+            self.catalog.add_document(rag_path, processed_data)
+            if processed_data.get('minhash') is not None:
+                self.catalog.add_signature(
+                    rag_filename,
+                    MinHasher.to_bytes(processed_data['minhash']),
+                    self.minhasher.band_hashes(processed_data['minhash'])
+                )
                 
             self.logger.info(f"Saved to RAG: {rag_path}")
             return rag_path
             
         except Exception as e:
             self.logger.error(f"Error saving to RAG: {str(e)}")
+            if processed_data.get('markdown_file') is not None:
+                processed_data['markdown_file'].close()
             return None
     
+    def is_known_hash(self, file_hash: str) -> bool:
+        """Prüft, ob eine Datei mit diesem Hash verarbeitet, indexiert oder gerade hochgeladen wurde"""
+        with self._hash_lock:
+            if file_hash in self.processed_hashes:
+                return True
+            if any(pending == file_hash for pending, _ in self._upload_hashes.values()):
+                return True
+        
+        return self.catalog.has_hash(file_hash)
+    
+    def claim_upload_hash(self, file_path: Path, file_hash: str, file_size: int) -> bool:
+        """
+        Reserviert den Hash eines Uploads vor dem Verschieben nach uploads/
+        
+        Args:
+            file_path: Zielpfad im Upload-Verzeichnis
+            file_hash: Beim Streamen berechneter SHA-256
+            file_size: Größe in Bytes (zur Plausibilisierung bei der Verarbeitung)
+        
+        Returns:
+            False, wenn der Inhalt bereits bekannt ist (Duplikat)
+        """
+        if self.catalog.has_hash(file_hash):
+            return False
+        
+        with self._hash_lock:
+            if file_hash in self.processed_hashes:
+                return False
+            if any(pending == file_hash for pending, _ in self._upload_hashes.values()):
+                return False
+            self._upload_hashes[str(file_path)] = (file_hash, file_size)
+        
+        return True
+    
+    def release_upload_hash(self, file_path: Path) -> Optional[Tuple[str, int]]:
+        """
+        Gibt den reservierten Hash eines Uploads wieder frei (z.B. wenn das Verschieben scheitert)
+        
+        Returns:
+            (file_hash, file_size) der Reservierung oder None
+        """
+        with self._hash_lock:
+            return self._upload_hashes.pop(str(file_path), None)
+    
+    def _take_upload_hash(self, file_path: Path) -> Optional[str]:
+        """Übernimmt den beim Upload berechneten Hash, falls die Datei unverändert ist"""
+        entry = self.release_upload_hash(file_path)
+        
+        try:
+            if entry and entry[1] == file_path.stat().st_size:
+                return entry[0]
+        except OSError:
+            pass
+        return None
+    
+    def _find_near_duplicate(self, markdown_content: str):
+        """
+        MinHash-Signatur des Inhalts und ähnlichstes bereits indexiertes Dokument
+        
+        Verglichen wird nur mit Dokumenten, die ein LSH-Band mit der Signatur teilen.
+        
+        Returns:
+            Tuple aus Signatur (None wenn deaktiviert) und (rag_filename, Ähnlichkeit) oder None
+        """
+        if self.minhasher is None:
+            return None, None
+        
+        signature = self.minhasher.signature(markdown_content)
+        if signature is None:
+            return None, None
+        
+        candidates = self.catalog.near_duplicate_candidates(self.minhasher.band_hashes(signature))
+        return signature, self.minhasher.best_match(signature, candidates)
+    
     def _generate_file_hash(self, file_path: Path) -> str:
         """Generiert SHA-256 Hash einer Datei"""
         hash_sha256 = hashlib.sha256()
@@ -173,52 +393,140 @@ class FileProcessor:
         
         return metadata
     
-    def _convert_to_markdown(self, file_path: Path) -> Optional[str]:
-        """Konvertiert Datei zu Markdown basierend auf Dateityp"""
+    def _convert(self, file_path: Path, file_hash: str) -> Optional[Union[str, Path]]:
+        """
+        Konvertiert in einem Sandbox-Worker (CONVERTER_WORKERS > 0) oder im eigenen Prozess
+        
+        Dateien, deren Konvertierung das Zeit- oder Speicherlimit überschreitet
+        oder den Worker abstürzen lässt, kommen in die Quarantäne des Katalogs
+        und werden nicht erneut versucht. Eine gewöhnliche Exception des
+        Konverters (reason 'error') wird nur protokolliert, wie ohne Sandbox.
+        """
+        if self.config.CONVERTER_WORKERS <= 0:
+            return self._convert_to_markdown(file_path, file_hash)
+        
+        try:
+            return self._get_sandbox().run(str(file_path), file_hash)
+        except SandboxError as e:
+            self.logger.error(f"Conversion of {file_path} failed in sandbox ({e.reason}): {e}")
+            if e.reason in QUARANTINE_REASONS:
+                self.catalog.quarantine(file_hash, file_path.name, f"{e.reason}: {e}")
+            return None
+    
+    def _get_sandbox(self) -> ConverterSandbox:
+        with self._sandbox_lock:
+            if self._sandbox is None:
+                settings = {name: getattr(self.config, name) for name in SANDBOX_SETTINGS}
+                self._sandbox = ConverterSandbox(
+                    functools.partial(_convert_in_worker, settings),
+                    workers=self.config.CONVERTER_WORKERS,
+                    timeout=self.config.CONVERTER_TIMEOUT,
+                    memory_limit=self.config.CONVERTER_MEMORY_LIMIT,
+                    max_tasks=self.config.CONVERTER_MAX_TASKS
+                )
+            return self._sandbox
+    
+    def close(self) -> None:
+        """Beendet die Sandbox-Worker"""
+        with self._sandbox_lock:
+            if self._sandbox is not None:
+                self._sandbox.close()
+                self._sandbox = None
+    
+    def _convert_to_markdown(self, file_path: Path, file_hash: Optional[str] = None) -> Optional[Union[str, Path]]:
+        """
+        Konvertiert Datei zu Markdown basierend auf Dateityp
+        
+        Returns:
+            Markdown, bei Text-, CSV- und großen PDF-Dateien den Pfad einer Spool-Datei, None bei Fehler
+        """
         file_extension = file_path.suffix.lower()
         
         try:
             if file_extension == '.pdf':
-                return self._convert_pdf_to_markdown(file_path)
+                return self._convert_pdf_to_markdown(file_path, file_hash)
             elif file_extension == '.docx':
                 return self._convert_docx_to_markdown(file_path)
             elif file_extension in ['.txt', '.md']:
                 return self._convert_text_to_markdown(file_path)
             elif file_extension in ['.html', '.htm']:
                 return self._convert_html_to_markdown(file_path)
+            elif file_extension == '.csv':
+                return self._convert_csv_to_markdown(file_path)
             else:
                 self.logger.warning(f"Unsupported file type: {file_extension}")
                 return None
                 
+        except MemoryError:
+            raise  # reported by the sandbox worker, see _convert
         except Exception as e:
             self.logger.error(f"Error converting {file_path}: {str(e)}")
             return None
     
-    def _convert_pdf_to_markdown(self, file_path: Path) -> Optional[str]:
-        """Konvertiert PDF zu Markdown"""
-        if PyPDF2 is None:
-            self.logger.error("PyPDF2 not installed")
+    def _convert_pdf_to_markdown(self, file_path: Path, file_hash: Optional[str] = None) -> Optional[Union[str, Path]]:
+        """
+        Konvertiert PDF zu Markdown
+        
+        Die Extraktions-Bibliothek wählt PDF_BACKEND bzw. select_backend nach
+        Seitenzahl und Textdichte der ersten Seite. PDFs ab PDF_PARALLEL_MIN_PAGES
+        Seiten werden seitenbereichsweise in Worker-Prozessen extrahiert
+        (siehe _convert_pdf_parallel).
+        """
+        if not available_backends():
+            self.logger.error("No PDF library installed (PyPDF2, pypdf, PyMuPDF, pypdfium2 or pdfminer.six)")
             return None
             
         try:
+            backend, pages = select_backend(file_path, self.config.PDF_BACKEND)
+            self.logger.debug(f"Extracting {file_path} ({pages} pages) with {backend.name}")
+            
+            min_pages = self.config.PDF_PARALLEL_MIN_PAGES
+            if min_pages > 0 and self.config.PDF_WORKERS > 1 and pages >= min_pages:
+                return self._convert_pdf_parallel(file_path, file_hash or self._generate_file_hash(file_path), backend)
+            
             text_content = []
             
-            with open(file_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                
-                for page_num, page in enumerate(pdf_reader.pages):
-                    text = page.extract_text()
-                    if text.strip():
-                        text_content.append(f"## Seite {page_num + 1}\n\n{text}\n")
+            for page_num, text in enumerate(backend.iter_pages(file_path)):
+                section = page_section(page_num, text)
+                if section:
+                    text_content.append(section)
                         
             return '\n'.join(text_content)
             
+        except MemoryError:
+            raise
         except Exception as e:
             self.logger.error(f"Error converting PDF {file_path}: {str(e)}")
             return None
     
+    def _convert_pdf_parallel(self, file_path: Path, file_hash: str, backend: PdfBackend) -> Optional[Path]:
+        """
+        Extrahiert ein großes PDF parallel in eine Spool-Datei
+        
+        Seiten werden pro Dokument (SHA-256) und Backend in PDF_PAGE_CACHE_DIR
+        zwischengespeichert; ein abgebrochener Lauf setzt bei den fehlenden Seiten fort.
+        """
+        cache_dir = self.config.PDF_PAGE_CACHE_DIR / f"{file_hash}-{backend.name}"
+        return self._convert_to_spool(
+            file_path,
+            lambda path, target: (
+                f"{extract_pdf_pages(path, target, cache_dir, self.config.PDF_WORKERS, backend.name)} pages"
+            ),
+            'PDF'
+        )
+    
     def _convert_docx_to_markdown(self, file_path: Path) -> Optional[str]:
-        """Konvertiert DOCX zu Markdown"""
+        """
+        Konvertiert DOCX zu Markdown
+        
+        Streamt word/document.xml (Überschriften, Listen, Tabellen); python-docx
+        dient nur noch als Fallback für Dateien, die das nicht erlaubt.
+        """
+        try:
+            return ''.join(iter_docx_markdown(file_path))
+        except (zipfile.BadZipFile, KeyError, ET.ParseError) as e:
+            self.logger.warning(f"Streaming DOCX conversion failed for {file_path}, using python-docx: {e}")
+        
         if Document is None:
             self.logger.error("python-docx not installed")
             return None
@@ -239,71 +547,114 @@ class FileProcessor:
                         
             return '\n'.join(markdown_content)
             
+        except MemoryError:
+            raise
         except Exception as e:
             self.logger.error(f"Error converting DOCX {file_path}: {str(e)}")
             return None
     
-    def _convert_text_to_markdown(self, file_path: Path) -> Optional[str]:
-        """Konvertiert Textdatei zu Markdown"""
+    def _convert_text_to_markdown(self, file_path: Path) -> Optional[Path]:
+        """
+        Konvertiert Textdatei zu Markdown
+        
+        Zeilenweise von der Quelldatei in eine Spool-Datei im RAG-Verzeichnis;
+        die Kodierung wird an einer begrenzten Stichprobe erkannt.
+        
+        Returns:
+            Pfad der Spool-Datei (siehe save_to_rag) oder None bei Fehler
+        """
+        return self._convert_to_spool(file_path, convert_text_file, 'text')
+    
+    def _convert_csv_to_markdown(self, file_path: Path) -> Optional[Path]:
+        """
+        Konvertiert CSV zu Markdown-Tabellen mit je CSV_CHUNK_ROWS Zeilen
+        
+        Jeder Abschnitt wiederholt die Kopfzeile; gestreamt wie Textdateien.
+        """
+        return self._convert_to_spool(
+            file_path, lambda path, target: convert_csv_file(path, target, self.config.CSV_CHUNK_ROWS), 'CSV'
+        )
+    
+    def _convert_to_spool(self, file_path: Path, convert: Callable[[Path, TextIO], str], kind: str) -> Optional[Path]:
+        """
+        Schreibt eine gestreamte Konvertierung in eine Spool-Datei im RAG-Verzeichnis
+        
+        convert(file_path, target) liefert eine Angabe fürs Log (z.B. die Kodierung).
+        """
+        spool = None
         try:
-            # Detect encoding
-            encoding = 'utf-8'
-            if chardet:
-                with open(file_path, 'rb') as f:
-                    raw_data = f.read()
-                    detected = chardet.detect(raw_data)
-                    if detected['encoding']:
-                        encoding = detected['encoding']
-            
-            with open(file_path, 'r', encoding=encoding) as f:
-                content = f.read()
-                
-            # If already markdown, return as is
-            if file_path.suffix.lower() == '.md':
-                return content
-                
-            # Convert plain text to markdown
-            lines = content.split('\n')
-            markdown_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if line:
-                    # Simple heuristics for structure
-                    if line.isupper() and len(line) < 100:
-                        markdown_lines.append(f"## {line}\n")
-                    else:
-                        markdown_lines.append(f"{line}\n")
-                else:
-                    markdown_lines.append("\n")
-                    
-            return ''.join(markdown_lines)
+            fd, spool = tempfile.mkstemp(dir=self.config.RAG_DIR, prefix='.', suffix=SPOOL_SUFFIX)
+            with open(fd, 'w', encoding='utf-8') as target:
+                detail = convert(file_path, target)
+            self.logger.debug(f"Converted {file_path} ({detail})")
+            return Path(spool)
             
+        except MemoryError:
+            self._discard_spool(spool)
+            raise
         except Exception as e:
-            self.logger.error(f"Error converting text {file_path}: {str(e)}")
+            self.logger.error(f"Error converting {kind} {file_path}: {str(e)}")
+            self._discard_spool(spool)
             return None
     
+    def _read_sample(self, markdown_file: MarkdownSpool) -> str:
+        """Anfang einer Spool-Datei, so viel wie in die MinHash-Signatur eingeht"""
+        with markdown_file.open() as f:
+            return f.read(SIGNATURE_SAMPLE_CHARS)
+    
+    def _remove_stale_spools(self) -> None:
+        """Entfernt Spool-Dateien und PDF-Seitencaches abgebrochener Verarbeitungen"""
+        cutoff = time.time() - SPOOL_MAX_AGE
+        for spool in self.config.RAG_DIR.glob(f'.*{SPOOL_SUFFIX}'):
+            try:
+                if spool.stat().st_mtime < cutoff:
+                    spool.unlink()
+            except OSError:
+                pass
+        remove_stale_caches(self.config.PDF_PAGE_CACHE_DIR)
+    
+    def _discard_spool(self, markdown_file: Optional[Path]) -> None:
+        if markdown_file is not None:
+            try:
+                os.unlink(markdown_file)
+            except OSError:
+                pass
+    
     def _convert_html_to_markdown(self, file_path: Path) -> Optional[str]:
-        """Konvertiert HTML zu Markdown"""
-        if markdownify is None:
-            self.logger.error("markdownify not installed")
-            return None
-            
+        """
+        Konvertiert HTML zu Markdown
+        
+        Zeichensatz aus BOM bzw. <meta> statt fest UTF-8; Skripte, Navigation,
+        Kopf-/Fußzeilen usw. werden vor der Konvertierung entfernt.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-                
-            markdown_content = markdownify(html_content, heading_style="ATX")
-            return markdown_content
+            html_content = decode_html(file_path.read_bytes())
+            
+            if BeautifulSoup is not None:
+                return html_to_markdown(html_content)
+            
+            if markdownify is None:
+                self.logger.error("beautifulsoup4 and markdownify not installed")
+                return None
+            return markdownify(html_content, heading_style="ATX")
             
+        except MemoryError:
+            raise
         except Exception as e:
             self.logger.error(f"Error converting HTML {file_path}: {str(e)}")
             return None
     
     def _format_markdown_with_metadata(self, processed_data: Dict) -> str:
         """Formatiert Markdown mit Metadaten Header"""
+        return f"{self._format_markdown_header(processed_data)}{processed_data['markdown_content']}\n"
+    
+    def _format_markdown_header(self, processed_data: Dict) -> str:
+        """Metadaten Header und Titelzeile, vor dem eigentlichen Inhalt"""
         metadata = processed_data['metadata']
-        content = processed_data['markdown_content']
+        duplicate_line = ''
+        if processed_data.get('duplicate_of'):
+            duplicate_line = (f"duplicate_of: {processed_data['duplicate_of']}\n"
+                              f"duplicate_similarity: {processed_data['duplicate_similarity']:.2f}\n")
         
         header = f"""---
 filename: {metadata['filename']}
@@ -312,10 +663,19 @@ file_size: {metadata['file_size']}
 mime_type: {metadata['mime_type']}
 created_at: {metadata['created_at']}
 processed_at: {processed_data['processed_at']}
----
+{duplicate_line}---
 
 # {metadata['filename']}
 
-{content}
 """
         return header
+
+# FileProcessor of a sandbox worker process, created by its first task
+_worker_processor: Optional[FileProcessor] = None
+
+def _convert_in_worker(settings: Dict, file_path: str, file_hash: Optional[str]) -> Optional[Union[str, Path]]:
+    """Konvertierung im Sandbox-Worker mit den Einstellungen des startenden Prozesses"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = FileProcessor(sandbox_settings=settings)
+    return _worker_processor._convert_to_markdown(Path(file_path), file_hash)
@@ -16,6 +16,7 @@ import threading
 
 from .file_processor import FileProcessor
 from .aggregator import Aggregator
+from .events import broker
 from config import Config
 
 class FileWatcherHandler(FileSystemEventHandler):
@@ -28,7 +29,7 @@ class FileWatcherHandler(FileSystemEventHandler):
         self.logger = logging.getLogger(__name__)
         
         # Supported file extensions
-        self.supported_extensions = {'.pdf', '.docx', '.txt', '.html', '.md', '.htm'}
+        self.supported_extensions = {'.pdf', '.docx', '.txt', '.html', '.md', '.htm', '.csv'}
         
     def on_created(self, event):
         """Handle file creation events."""
@@ -78,12 +79,25 @@ class FileWatcherHandler(FileSystemEventHandler):
         """Asynchronously process a file."""
         try:
             self.logger.info(f"Processing new file: {file_path}")
+            broker.publish('ingest', {'stage': 'started', 'file': Path(file_path).name})
             
             # Process the file
-            result = self.file_processor.process_file(file_path)
+            result = self.file_processor.process_file(Path(file_path))
             
-            if result['success']:
+            if result is None:
+                self.logger.info(f"File skipped (duplicate or not convertible): {file_path}")
+                broker.publish('ingest', {'stage': 'skipped', 'file': Path(file_path).name})
+                return
+            
+            rag_path = self.file_processor.save_to_rag(result)
+            
+            if rag_path:
                 self.logger.info(f"Successfully processed file: {file_path}")
+                broker.publish('ingest', {
+                    'stage': 'completed',
+                    'file': Path(file_path).name,
+                    'rag_file': rag_path.name
+                })
                 
                 # Trigger aggregation update
                 self.aggregator.update_knowledge_base()
@@ -97,10 +111,12 @@ class FileWatcherHandler(FileSystemEventHandler):
                     except Exception as e:
                         self.logger.warning(f"Could not remove processed file {file_path}: {e}")
             else:
-                self.logger.error(f"Failed to process file {file_path}: {result.get('error', 'Unknown error')}")
+                self.logger.error(f"Failed to save processed file {file_path} to RAG")
+                broker.publish('ingest', {'stage': 'failed', 'file': Path(file_path).name})
                 
         except Exception as e:
             self.logger.error(f"Error processing file {file_path}: {e}")
+            broker.publish('ingest', {'stage': 'failed', 'file': Path(file_path).name, 'error': str(e)})
         finally:
             # Remove from processing set
             if file_path in self.processing_files:
@@ -109,10 +125,11 @@ class FileWatcherHandler(FileSystemEventHandler):
 class FileWatcher:
     """Main file watcher service."""
     
-    def __init__(self):
+    def __init__(self, file_processor: Optional[FileProcessor] = None):
         self.logger = logging.getLogger(__name__)
         self.observer: Optional[Observer] = None
-        self.file_processor = FileProcessor()
+        # Shared with the upload handler so hashes computed during upload are reused
+        self.file_processor = file_processor or FileProcessor()
         self.aggregator = Aggregator()
         
         # Ensure upload directory exists
@@ -0,0 +1,269 @@
+"""
+HTML Conversion for AITON-RAG
+
+Decodes saved web pages with the charset they declare (BOM, <meta charset>,
+<meta http-equiv>) and converts them with a single walk over the
+BeautifulSoup tree that skips boilerplate on the way: scripts, styles,
+navigation, page headers/footers, hidden elements and form controls (the
+content of a form is kept: CMS pages often wrap the whole page in one).
+Pages with a <main> element or a single <article> are reduced to that
+element.
+"""
+
+import codecs
+import re
+from typing import Iterator, List, Optional
+
+try:
+    from bs4 import BeautifulSoup
+    from bs4.element import NavigableString, PreformattedString, Tag
+except ImportError:
+    BeautifulSoup = None
+
+try:
+    import lxml  # noqa: F401 (BeautifulSoup tree builder)
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+try:
+    import chardet
+except ImportError:
+    chardet = None
+
+from .docx_stream import markdown_table
+
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+)
+
+# Bytes searched for a charset declaration (the HTML spec prescans 1024)
+SNIFF_BYTES = 4096
+
+META_CHARSET = re.compile(rb'<meta[^>]+charset\s*=\s*["\']?\s*([a-zA-Z0-9_:.-]+)', re.IGNORECASE)
+
+# Elements that never hold page content
+BOILERPLATE_TAGS = (
+    'script', 'style', 'noscript', 'template', 'nav', 'aside', 'iframe',
+    'svg', 'canvas', 'button', 'input', 'select', 'textarea', 'object', 'embed'
+)
+BOILERPLATE_ROLES = ('navigation', 'banner', 'contentinfo', 'search', 'complementary', 'dialog')
+
+BLOCK_TAGS = {
+    'address', 'article', 'blockquote', 'body', 'center', 'dd', 'details', 'dialog', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr',
+    'html', 'li', 'main', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'ul'
+}
+HEADINGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+
+# Marks <br> through whitespace normalization
+LINE_BREAK = '\x00'
+LINE_BREAK_SPACING = re.compile(r'\s*\x00\s*')
+
+def sniff_encoding(raw: bytes) -> str:
+    """
+    Charset of an HTML document
+    
+    Order: byte order mark, a <meta> declaration in the first bytes, valid
+    UTF-8, chardet (if installed), windows-1252 (the browsers' default).
+    """
+    for bom, encoding in BOMS:
+        if raw.startswith(bom):
+            return encoding
+    
+    match = META_CHARSET.search(raw[:SNIFF_BYTES])
+    if match:
+        try:
+            encoding = codecs.lookup(match.group(1).decode('ascii')).name
+            # A page that made it to disk as bytes cannot really be UTF-16 without a BOM
+            return 'utf-8' if encoding.startswith('utf-16') else encoding
+        except (LookupError, UnicodeDecodeError):
+            pass
+    
+    try:
+        raw.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    
+    if chardet is not None:
+        detected = chardet.detect(raw[:256 * 1024])
+        if detected.get('encoding'):
+            return detected['encoding']
+    return 'windows-1252'
+
+def decode_html(raw: bytes) -> str:
+    """HTML bytes as text in their sniffed encoding (undecodable bytes replaced)."""
+    return raw.decode(sniff_encoding(raw), errors='replace')
+
+def _normalize(text: str) -> str:
+    return LINE_BREAK_SPACING.sub('\n', ' '.join(text.split())).strip()
+
+def _is_boilerplate(tag: 'Tag', in_article: bool) -> bool:
+    """Elements left out of the conversion; headers/footers inside an article belong to it."""
+    if tag.name in BOILERPLATE_TAGS:
+        return True
+    if tag.name in ('header', 'footer') and not in_article:
+        return True
+    attrs = tag.attrs
+    return bool(attrs) and (
+        'hidden' in attrs or attrs.get('aria-hidden') == 'true' or attrs.get('role') in BOILERPLATE_ROLES
+    )
+
+def _content_root(soup: 'BeautifulSoup') -> 'Tag':
+    """<main>, else the only <article>, else <body>."""
+    candidates = soup.find_all(('main', 'article'))
+    for candidate in candidates:
+        if candidate.name == 'main':
+            return candidate
+    if len(candidates) == 1:
+        return candidates[0]
+    return soup.body or soup
+
+def _inline(node: 'Tag') -> str:
+    """Inline Markdown of a node's children."""
+    return ''.join(_inline_node(child) for child in node.children)
+
+def _inline_node(node) -> str:
+    """Inline Markdown of a node: text, links, emphasis, code, line breaks."""
+    if isinstance(node, NavigableString):
+        # Comments, doctype, CDATA and processing instructions are no text
+        return '' if isinstance(node, PreformattedString) else str(node)
+    if not isinstance(node, Tag) or _is_boilerplate(node, True):
+        return ''
+    
+    name = node.name
+    if name == 'br':
+        return LINE_BREAK
+    if name == 'img':
+        return ''
+    
+    text = _inline(node)
+    if not text.strip():
+        return text
+    if name == 'a':
+        href = (node.get('href') or '').strip()
+        if href and not href.startswith(('#', 'javascript:')):
+            return f"[{' '.join(text.split())}]({href})"
+    elif name in ('strong', 'b'):
+        return f"**{text.strip()}**"
+    elif name in ('em', 'i'):
+        return f"*{text.strip()}*"
+    elif name == 'code':
+        return f"`{text.strip()}`"
+    return text
+
+def _list(node: 'Tag', depth: int) -> List[str]:
+    """Lines of a (nested) list; ordered lists use "1." and Markdown numbering."""
+    marker = '1.' if node.name == 'ol' else '-'
+    lines = []
+    for item in node.children:
+        if not isinstance(item, Tag) or item.name != 'li' or _is_boilerplate(item, True):
+            continue
+        text, nested = [], []
+        for child in item.children:
+            if isinstance(child, Tag) and child.name in ('ul', 'ol'):
+                nested.append(child)
+            else:
+                text.append(_inline_node(child))
+        line = _normalize(''.join(text)).replace('\n', ' ')
+        if line:
+            lines.append(f"{'  ' * depth}{marker} {line}")
+        for child in nested:
+            lines.extend(_list(child, depth + 1))
+    return lines
+
+def _table_rows(node: 'Tag') -> Iterator['Tag']:
+    """Rows of a table, also inside thead/tbody/tfoot, but not of nested tables."""
+    for child in node.children:
+        if isinstance(child, Tag):
+            if child.name == 'tr':
+                yield child
+            elif child.name in ('thead', 'tbody', 'tfoot'):
+                yield from _table_rows(child)
+
+def _table(node: 'Tag') -> Optional[str]:
+    rows = []
+    for row in _table_rows(node):
+        cells = []
+        for cell in row.children:
+            if not isinstance(cell, Tag) or cell.name not in ('td', 'th'):
+                continue
+            cells.append(_normalize(_inline(cell)).replace('\n', '<br>').replace('|', '\\|'))
+            span = cell.get('colspan')
+            if span and str(span).isdigit():
+                cells.extend([''] * (int(span) - 1))
+        rows.append(cells)
+    return markdown_table(rows) if rows else None
+
+def _blocks(node: 'Tag', out: List[str], in_article: bool) -> None:
+    """Append the Markdown blocks of a node's children to out, skipping boilerplate."""
+    inline: List[str] = []
+    
+    def flush():
+        text = _normalize(''.join(inline))
+        inline.clear()
+        if text:
+            out.append(text)
+    
+    for child in node.children:
+        if not isinstance(child, Tag) or child.name not in BLOCK_TAGS:
+            inline.append(_inline_node(child))
+            continue
+        if _is_boilerplate(child, in_article):
+            continue
+        
+        flush()
+        name = child.name
+        if name in HEADINGS:
+            text = _normalize(_inline(child)).replace('\n', ' ')
+            if text:
+                out.append(f"{'#' * HEADINGS[name]} {text}")
+        elif name in ('ul', 'ol'):
+            lines = _list(child, 0)
+            if lines:
+                out.append('\n'.join(lines))
+        elif name == 'pre':
+            text = child.get_text().strip('\n')
+            if text.strip():
+                out.append(f"```\n{text}\n```")
+        elif name == 'table':
+            table = _table(child)
+            if table:
+                out.append(table)
+        elif name == 'hr':
+            out.append('---')
+        elif name == 'blockquote':
+            quoted: List[str] = []
+            _blocks(child, quoted, in_article)
+            if quoted:
+                out.append('\n'.join(f"> {line}" if line else '>' for line in '\n\n'.join(quoted).split('\n')))
+        else:
+            _blocks(child, out, in_article or name in ('article', 'main'))
+    flush()
+
+def html_to_markdown(html: str) -> str:
+    """
+    Markdown of the content of an HTML page
+    
+    The page <title> becomes the top heading when the content has no <h1>.
+    
+    Raises:
+        RuntimeError: if BeautifulSoup is not installed
+    """
+    if BeautifulSoup is None:
+        raise RuntimeError("beautifulsoup4 not installed")
+    
+    soup = BeautifulSoup(html, HTML_PARSER)
+    title = _normalize(soup.title.get_text()) if soup.title else ''
+    if soup.head is not None:
+        soup.head.decompose()
+    root = _content_root(soup)
+    
+    blocks: List[str] = []
+    _blocks(root, blocks, root.name in ('article', 'main'))
+    if title and not any(block.startswith('# ') for block in blocks):
+        blocks.insert(0, f"# {title}")
+    return '\n\n'.join(blocks) + '\n' if blocks else ''
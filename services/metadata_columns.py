@@ -0,0 +1,113 @@
+"""
+Columnar Document Metadata for AITON-RAG
+
+Timestamps and sizes of the knowledge base entries' documents as int64
+columns, so range filters (processed_after=, max_size=, ...) run as
+vectorized masks instead of per-entry comparisons of frontmatter strings.
+Falls back to plain Python arrays when NumPy is not installed.
+"""
+
+import operator
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .facets import to_bitmap
+
+# Query parameter -> (column, comparison)
+RANGE_FILTERS = {
+    'processed_after': ('processed_at', operator.ge),
+    'processed_before': ('processed_at', operator.lt),
+    'created_after': ('created_at', operator.ge),
+    'created_before': ('created_at', operator.lt),
+    'min_size': ('file_size', operator.ge),
+    'max_size': ('file_size', operator.le)
+}
+
+# SQL equivalents for the catalog (see DocumentCatalog.list_documents)
+RANGE_OPERATORS = {operator.ge: '>=', operator.lt: '<', operator.le: '<='}
+
+COLUMNS = ('processed_at', 'created_at', 'file_size')
+
+# Marks a missing value; never matches a range filter
+MISSING = -(2 ** 63)
+
+def parse_datetime(value: Any) -> datetime:
+    """ISO date or datetime as naive local time (the format of processed_at/created_at)."""
+    parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return parsed
+
+def parse_range_filters(args: Mapping[str, Any]) -> Dict[str, Any]:
+    """
+    Range filters from request parameters: datetimes for dates, ints for sizes
+    
+    Raises:
+        ValueError: for values that are not ISO dates or non-negative integers
+    """
+    ranges = {}
+    for name, (column, _) in RANGE_FILTERS.items():
+        value = args.get(name)
+        if value in (None, ''):
+            continue
+        try:
+            if column == 'file_size':
+                ranges[name] = int(value)
+                if ranges[name] < 0:
+                    raise ValueError
+            else:
+                ranges[name] = parse_datetime(value)
+        except (TypeError, ValueError):
+            expected = 'a size in bytes' if column == 'file_size' else 'an ISO date (YYYY-MM-DD)'
+            raise ValueError(f"Invalid {name}: {value!r}, expected {expected}")
+    return ranges
+
+def _column_value(column: str, metadata: Dict[str, Any]) -> int:
+    value = metadata.get(column)
+    try:
+        if column == 'file_size':
+            return int(value)
+        return int(parse_datetime(value).timestamp())
+    except (TypeError, ValueError, OverflowError):
+        return MISSING
+
+def _bound(column: str, value: Any) -> int:
+    return value if column == 'file_size' else int(value.timestamp())
+
+class MetadataColumns:
+    """int64 columns of processed_at, created_at (epoch seconds) and file_size."""
+    
+    def __init__(self, metadata: Sequence[Dict[str, Any]]):
+        self.size = len(metadata)
+        self.columns = {}
+        for column in COLUMNS:
+            values = array('q', (_column_value(column, item) for item in metadata))
+            self.columns[column] = np.frombuffer(values, dtype=np.int64) if np is not None else values
+    
+    def filter_bitmap(self, ranges: Mapping[str, Any]) -> Optional[int]:
+        """Entries matching every range filter as a bitmap (see services/facets.py); None without filters."""
+        if not ranges:
+            return None
+        
+        checks = []
+        for name, value in ranges.items():
+            column, compare = RANGE_FILTERS[name]
+            checks.append((self.columns[column], compare, _bound(column, value)))
+        
+        if np is None:
+            return to_bitmap((
+                doc_id for doc_id in range(self.size)
+                if all(values[doc_id] != MISSING and compare(values[doc_id], bound)
+                       for values, compare, bound in checks)
+            ), self.size)
+        
+        mask = np.ones(self.size, dtype=bool)
+        for values, compare, bound in checks:
+            mask &= (values != MISSING) & compare(values, bound)
+        return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
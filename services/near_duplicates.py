@@ -0,0 +1,139 @@
+"""
+Near-Duplicate Detection for AITON-RAG
+
+MinHash signatures over word shingles of the converted Markdown, computed
+at ingest. Signatures are split into LSH bands; documents sharing a band
+hash are candidates, and only those are compared with the new document.
+Band hashes live in the document catalog (indexed), so a lookup costs a
+few index probes instead of a comparison with every stored document.
+"""
+
+import struct
+import zlib
+from array import array
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .rag_document import WORD_PATTERN
+
+# Words per shingle
+SHINGLE_SIZE = 5
+
+# Permutations are (a * x + b) mod MERSENNE_PRIME over 32-bit shingle hashes;
+# a, b < 2**31 keep a * x + b below 2**64
+MERSENNE_PRIME = (1 << 61) - 1
+
+# Shingle hashes per vectorized step (bounds the hashes x permutations matrix)
+HASH_BLOCK_SIZE = 8192
+
+# Characters of a document that go into its signature (bounds the cost for huge files)
+SIGNATURE_SAMPLE_CHARS = 4 * 1024 * 1024
+
+# Near-duplicate handling (see Config.NEAR_DUPLICATE_ACTION)
+DUPLICATE_ACTIONS = ('mark', 'skip')
+
+def shingle_hashes(text: str, size: int = SHINGLE_SIZE) -> List[int]:
+    """Distinct 32-bit hashes of the word n-grams of a text (the whole text if it is shorter)."""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return []
+    if len(words) <= size:
+        return [zlib.crc32(' '.join(words).encode('utf-8'))]
+    return list({
+        zlib.crc32(' '.join(words[i:i + size]).encode('utf-8'))
+        for i in range(len(words) - size + 1)
+    })
+
+def lsh_parameters(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    (bands, rows per band) for a similarity threshold
+    
+    Takes the most rows per band whose S-curve threshold (1/b)^(1/r) does not
+    exceed the configured one, so pairs at the threshold are rarely missed.
+    """
+    best = (num_perm, 1)
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        if (1 / bands) ** (1 / rows) <= threshold:
+            best = (bands, rows)
+    return best
+
+def similarity(left: Sequence[int], right: Sequence[int]) -> float:
+    """Estimated Jaccard similarity: share of equal signature values."""
+    if not left or len(left) != len(right):
+        return 0.0
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+class MinHasher:
+    """Fixed random permutations; equal seeds give comparable signatures."""
+    
+    def __init__(self, num_perm: int = 128, threshold: float = 0.9, seed: int = 1):
+        self.num_perm = num_perm
+        self.threshold = threshold
+        self.bands, self.rows = lsh_parameters(num_perm, threshold)
+        
+        # Deterministic coefficients (a linear congruential generator, no global random state)
+        coefficients = []
+        state = seed
+        while len(coefficients) < 2 * num_perm:
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            coefficients.append((state >> 33) | 1)
+        self.a = coefficients[:num_perm]
+        self.b = coefficients[num_perm:]
+    
+    def signature(self, text: str) -> Optional[array]:
+        """MinHash signature of (the first SIGNATURE_SAMPLE_CHARS of) a text; None without words."""
+        hashes = shingle_hashes(text[:SIGNATURE_SAMPLE_CHARS])
+        if not hashes:
+            return None
+        
+        if np is None:
+            return array('Q', (
+                min((a * x + b) % MERSENNE_PRIME for x in hashes)
+                for a, b in zip(self.a, self.b)
+            ))
+        
+        a = np.array(self.a, dtype=np.uint64)
+        b = np.array(self.b, dtype=np.uint64)
+        values = np.array(hashes, dtype=np.uint64)
+        minimum = np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint64)
+        for start in range(0, len(values), HASH_BLOCK_SIZE):
+            block = values[start:start + HASH_BLOCK_SIZE, None]
+            np.minimum(minimum, ((block * a + b) % MERSENNE_PRIME).min(axis=0), out=minimum)
+        return array('Q', minimum.tolist())
+    
+    def band_hashes(self, signature: Sequence[int]) -> List[int]:
+        """One signed 64-bit hash per band (band number included, so bands never collide)."""
+        hashes = []
+        for band in range(self.bands):
+            values = signature[band * self.rows:(band + 1) * self.rows]
+            packed = struct.pack(f'<I{self.rows}Q', band, *values)
+            digest = zlib.crc32(packed) | (zlib.adler32(packed) << 32)
+            hashes.append(digest - (1 << 64) if digest >= 1 << 63 else digest)
+        return hashes
+    
+    @staticmethod
+    def to_bytes(signature: Sequence[int]) -> bytes:
+        return array('Q', signature).tobytes()
+    
+    @staticmethod
+    def from_bytes(data: bytes) -> array:
+        signature = array('Q')
+        signature.frombytes(data)
+        return signature
+    
+    def best_match(self, signature: Sequence[int],
+                   candidates: Iterable[Tuple[str, bytes]]) -> Optional[Tuple[str, float]]:
+        """Most similar candidate (name, stored signature) at or above the threshold."""
+        best = None
+        for name, stored in candidates:
+            score = similarity(signature, self.from_bytes(stored))
+            if score >= self.threshold and (best is None or score > best[1]):
+                best = (name, score)
+        return best
@@ -0,0 +1,77 @@
+"""
+Pagination Helpers for AITON-RAG
+
+Opaque keyset cursors, page slicing over sorted key lists and field
+projection for the list endpoints of the Actions API.
+"""
+
+import base64
+import json
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+class PaginationError(ValueError):
+    """Raised for invalid limit, cursor or fields parameters."""
+
+def encode_cursor(sort_key: Any) -> str:
+    """Encode the sort key of the last returned item as an opaque cursor."""
+    raw = json.dumps(sort_key, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> Any:
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError) as e:
+        raise PaginationError(f"Invalid cursor: {cursor}") from e
+
+def parse_limit(raw: Optional[str], default: int = DEFAULT_PAGE_SIZE,
+                maximum: int = MAX_PAGE_SIZE) -> int:
+    """Parse the limit query parameter, clamped to 1..maximum."""
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except ValueError as e:
+        raise PaginationError(f"Invalid limit: {raw}") from e
+    return max(1, min(limit, maximum))
+
+def parse_fields(raw: Optional[str], available: Iterable[str]) -> Optional[List[str]]:
+    """Parse a comma separated fields= projection, validated against the available fields."""
+    if not raw:
+        return None
+    
+    available = list(available)
+    fields = [field.strip() for field in raw.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in available]
+    if unknown:
+        raise PaginationError(
+            f"Unknown fields: {', '.join(unknown)}. Available fields: {', '.join(available)}"
+        )
+    return fields
+
+def project(record: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Reduce a record to the requested fields (all fields if none requested)."""
+    if not fields:
+        return record
+    return {field: record.get(field) for field in fields}
+
+def page_bounds(sort_keys: Sequence[Any], after: Optional[Any], limit: int) -> Tuple[int, int]:
+    """
+    Locate a page in a sorted key sequence
+    
+    Returns the [start, end) slice of the page that follows the key `after`,
+    found by binary search so the cost does not depend on the page number.
+    """
+    if after is None:
+        start = 0
+    else:
+        try:
+            start = bisect_right(sort_keys, after)
+        except TypeError as e:
+            raise PaginationError("Cursor does not belong to this listing") from e
+    return start, min(start + limit, len(sort_keys))
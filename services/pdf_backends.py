@@ -0,0 +1,194 @@
+"""
+PDF Text Extraction Backends for AITON-RAG
+
+One interface over the PDF libraries that work offline: PyPDF2 (the
+baseline), pypdf (its maintained successor), pdfminer.six (pure Python,
+layout analysis) and PyMuPDF / pypdfium2 (C libraries, much faster). Only
+installed libraries are available. select_backend routes each document by
+its page count and the text density of its first page.
+"""
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    import PyPDF2
+except ImportError:
+    PyPDF2 = None
+
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+
+try:
+    from pdfminer.high_level import extract_pages
+    from pdfminer.layout import LTTextContainer
+    from pdfminer.pdfpage import PDFPage
+except ImportError:
+    extract_pages = None
+
+# Routing: documents with many pages or little text on the first page (scans,
+# cover pages, drawings) go to the fastest backend, text-dense documents to
+# the one with the best reading order
+LARGE_DOCUMENT_PAGES = 200
+SPARSE_PAGE_CHARS = 200
+FAST_BACKENDS = ('pymupdf', 'pdfium', 'pypdf', 'pypdf2', 'pdfminer')
+QUALITY_BACKENDS = ('pymupdf', 'pdfminer', 'pypdf', 'pdfium', 'pypdf2')
+
+class PdfBackend(ABC):
+    """Page-wise text extraction with one PDF library"""
+    
+    name = ''
+    library = None  # imported module, None if not installed
+    
+    @classmethod
+    def available(cls) -> bool:
+        return cls.library is not None
+    
+    @abstractmethod
+    def page_count(self, path: Path) -> int:
+        """Number of pages of the document."""
+    
+    @abstractmethod
+    def iter_pages(self, path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        """Text of the pages [start, end) (end=None: to the last page)."""
+
+class _ReaderBackend(PdfBackend):
+    """PyPDF2 and pypdf share the PdfReader API."""
+    
+    def page_count(self, path: Path) -> int:
+        with open(path, 'rb') as f:
+            return len(self.library.PdfReader(f).pages)
+    
+    def iter_pages(self, path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        with open(path, 'rb') as f:
+            pages = self.library.PdfReader(f).pages
+            for number in range(start, len(pages) if end is None else min(end, len(pages))):
+                yield pages[number].extract_text() or ''
+
+class PyPDF2Backend(_ReaderBackend):
+    name = 'pypdf2'
+    library = PyPDF2
+
+class PypdfBackend(_ReaderBackend):
+    name = 'pypdf'
+    library = pypdf
+
+class PyMuPDFBackend(PdfBackend):
+    name = 'pymupdf'
+    library = fitz
+    
+    def page_count(self, path: Path) -> int:
+        with fitz.open(path) as document:
+            return document.page_count
+    
+    def iter_pages(self, path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        with fitz.open(path) as document:
+            for number in range(start, document.page_count if end is None else min(end, document.page_count)):
+                yield document[number].get_text()
+
+class PdfiumBackend(PdfBackend):
+    name = 'pdfium'
+    library = pypdfium2
+    
+    def page_count(self, path: Path) -> int:
+        document = pypdfium2.PdfDocument(str(path))
+        try:
+            return len(document)
+        finally:
+            document.close()
+    
+    def iter_pages(self, path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        document = pypdfium2.PdfDocument(str(path))
+        try:
+            for number in range(start, len(document) if end is None else min(end, len(document))):
+                page = document[number]
+                try:
+                    text_page = page.get_textpage()
+                    try:
+                        yield text_page.get_text_range()
+                    finally:
+                        text_page.close()
+                finally:
+                    page.close()
+        finally:
+            document.close()
+
+class PdfminerBackend(PdfBackend):
+    name = 'pdfminer'
+    library = extract_pages
+    
+    def page_count(self, path: Path) -> int:
+        with open(path, 'rb') as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+    
+    def iter_pages(self, path: Path, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+        numbers = range(start, end) if end is not None else None
+        for number, layout in enumerate(extract_pages(path, page_numbers=numbers)):
+            if numbers is None and number < start:
+                continue
+            yield ''.join(element.get_text() for element in layout if isinstance(element, LTTextContainer))
+
+BACKENDS = {backend.name: backend for backend in (
+    PyMuPDFBackend, PdfiumBackend, PypdfBackend, PdfminerBackend, PyPDF2Backend
+)}
+
+def available_backends() -> List[str]:
+    """Names of the backends whose library is installed."""
+    return [name for name, backend in BACKENDS.items() if backend.available()]
+
+def get_backend(name: str) -> PdfBackend:
+    """
+    Backend by name
+    
+    Raises:
+        ValueError: unknown name or library not installed
+    """
+    backend = BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown PDF backend: {name} (one of {', '.join(BACKENDS)})")
+    if not backend.available():
+        raise ValueError(f"PDF backend {name} is not installed")
+    return backend()
+
+def _first_available(order: Tuple[str, ...]) -> PdfBackend:
+    for name in order:
+        if BACKENDS[name].available():
+            return BACKENDS[name]()
+    raise ValueError("No PDF library installed (PyPDF2, pypdf, PyMuPDF, pypdfium2 or pdfminer.six)")
+
+def select_backend(path: Path, preferred: str = 'auto') -> Tuple[PdfBackend, int]:
+    """
+    (backend, page count) for a document
+    
+    preferred names a backend to use for every document; 'auto' probes the
+    page count and the first page's text with the fastest installed backend.
+    
+    Raises:
+        ValueError: preferred backend unknown or not installed, no PDF library installed
+    """
+    if preferred != 'auto':
+        backend = get_backend(preferred)
+        return backend, backend.page_count(path)
+    
+    probe = _first_available(FAST_BACKENDS)
+    pages = probe.page_count(path)
+    if pages >= LARGE_DOCUMENT_PAGES:
+        return probe, pages
+    
+    first_page = next(probe.iter_pages(path, 0, 1), '')
+    if len(first_page.strip()) < SPARSE_PAGE_CHARS:
+        return probe, pages
+    return _first_available(QUALITY_BACKENDS), pages
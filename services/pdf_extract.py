@@ -0,0 +1,133 @@
+"""
+Page-Parallel PDF Extraction for AITON-RAG
+
+Large PDFs are split into page ranges that worker processes extract in
+parallel; the ranges are written back in page order. Every worker appends
+each extracted page to a JSON-lines file in a per-document page cache, so
+a job that failed or was interrupted resumes with the pages still missing.
+"""
+
+import json
+import multiprocessing
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, TextIO, Tuple
+
+from .pdf_backends import get_backend
+
+# Pages per worker task (and per cache file)
+PAGE_RANGE_SIZE = 50
+
+# Caches of jobs that never finished are removed after this many seconds
+PAGE_CACHE_MAX_AGE = 7 * 86400
+
+def page_section(number: int, text: str) -> Optional[str]:
+    """Markdown of a page (number counted from 0); None for pages without text."""
+    if not text.strip():
+        return None
+    return f"## Seite {number + 1}\n\n{text}\n"
+
+def page_ranges(count: int, size: int = PAGE_RANGE_SIZE) -> List[Tuple[int, int]]:
+    """[start, end) page ranges covering count pages."""
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+def _cache_file(cache_dir: Path, start: int) -> Path:
+    return cache_dir / f"pages-{start:06d}.jsonl"
+
+def _read_cached(cache_file: Path) -> Dict[int, str]:
+    """Pages of a range cache; a record cut off by an interrupted write is ignored."""
+    pages = {}
+    if not cache_file.exists():
+        return pages
+    with open(cache_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            if not line.endswith('\n'):
+                break
+            record = json.loads(line)
+            pages[record['page']] = record['text']
+    return pages
+
+def extract_range(path: Path, cache_dir: Path, start: int, end: int, backend: str) -> int:
+    """
+    Extract the pages [start, end) missing from the range cache (runs in a worker)
+    
+    Pages are appended in order, so the cached pages are a prefix of the
+    range and extraction continues after them.
+    
+    Returns:
+        Number of pages extracted, cached pages not counted
+    """
+    cache_file = _cache_file(cache_dir, start)
+    cached = _read_cached(cache_file)
+    
+    # Drop a partial record so appended records start on a fresh line
+    if cache_file.exists():
+        with open(cache_file, 'rb+') as f:
+            content = f.read()
+            f.truncate(content.rfind(b'\n') + 1)
+    
+    resume = start
+    while resume in cached:
+        resume += 1
+    
+    extracted = 0
+    with open(cache_file, 'a', encoding='utf-8') as cache:
+        for number, text in enumerate(get_backend(backend).iter_pages(path, resume, end), resume):
+            if number in cached:
+                continue
+            cache.write(json.dumps({'page': number, 'text': text}, ensure_ascii=False) + '\n')
+            cache.flush()
+            extracted += 1
+    return extracted
+
+def extract_pdf_pages(path: Path, target: TextIO, cache_dir: Path, workers: int,
+                      backend: str = 'pypdf2', range_size: int = PAGE_RANGE_SIZE) -> int:
+    """
+    Extract a PDF with worker processes and write its Markdown into target
+    
+    The page cache in cache_dir is removed once the whole document is
+    written; after an error it is kept for the next attempt.
+    
+    Returns:
+        Number of pages
+    """
+    count = get_backend(backend).page_count(path)
+    ranges = page_ranges(count, range_size)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Spawned workers do not inherit the locks and threads of the app process
+    context = multiprocessing.get_context('spawn')
+    written = False
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(ranges))), mp_context=context) as pool:
+        futures = [pool.submit(extract_range, path, cache_dir, start, end, backend) for start, end in ranges]
+        
+        # Ranges in page order, each as soon as it is done
+        for (start, end), future in zip(ranges, futures):
+            future.result()
+            pages = _read_cached(_cache_file(cache_dir, start))
+            for number in range(start, end):
+                section = page_section(number, pages.get(number, ''))
+                if section is None:
+                    continue
+                if written:
+                    target.write('\n')
+                target.write(section)
+                written = True
+    
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    return count
+
+def remove_stale_caches(cache_root: Path, max_age: int = PAGE_CACHE_MAX_AGE) -> None:
+    """Remove page caches whose last page was written more than max_age seconds ago."""
+    if not cache_root.exists():
+        return
+    cutoff = time.time() - max_age
+    for cache_dir in cache_root.iterdir():
+        try:
+            modified = max((f.stat().st_mtime for f in cache_dir.iterdir()), default=cache_dir.stat().st_mtime)
+            if modified < cutoff:
+                shutil.rmtree(cache_dir, ignore_errors=True)
+        except OSError:
+            pass
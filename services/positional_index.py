@@ -0,0 +1,529 @@
+"""
+Positional Index for AITON-RAG
+
+Word positions of the full RAG documents, built while the knowledge base is
+aggregated and stored next to it. Quoted phrases ("antrag stellen") and
+proximity clauses (antrag NEAR/3 frist) are answered by merging position
+lists; the document text is never read at query time.
+
+The index is a binary file that is memory-mapped, not parsed: the postings
+of every term, varint-encoded as [doc, count, gap, gap, ..., doc, count,
+...], the ids of the documents containing each term as plain 64-bit
+integers (read in place, for document-level matching), the sorted term
+list, the offsets and the checkpoints, and a JSON footer describing the
+layout. Only the postings of queried terms are decoded. Building encodes
+each document as it is read;
+when the encoded postings outgrow SPILL_BYTES they are written to a sorted
+run file, and the runs are merged term by term into the index file.
+
+Every CHECKPOINT_INTERVAL-th word position also records its byte offset in
+the RAG file, so result snippets seek to the best matching window and read
+about a kilobyte instead of the whole document.
+"""
+
+import heapq
+import json
+import mmap
+import re
+import shutil
+import sys
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .rag_document import WORD_PATTERN, RagCorpus, RagDocument
+
+INDEX_VERSION = 4
+
+# Stored in the knowledge base directory
+POSITIONAL_INDEX_FILE = 'positional_index.bin'
+
+# "quoted phrase" | word NEAR/k word | word
+QUERY_PATTERN = re.compile(r'"([^"]*)"|(\w+)\s+NEAR(?:/(\d+))?\s+(?=(\w+))|(\w+)')
+
+DEFAULT_NEAR_DISTANCE = 5
+
+# Byte offset of every n-th word position
+CHECKPOINT_INTERVAL = 64
+
+# Encoded postings held in memory while building before they are spilled to a run file
+SPILL_BYTES = 32 * 1024 * 1024
+
+# Decoded postings kept per index
+DECODED_CACHE_SIZE = 10000
+
+# Words per snippet and marker around highlighted words
+SNIPPET_WORDS = 30
+HIGHLIGHT = '**'
+
+WHITESPACE = re.compile(r'\s+')
+
+# Footer length at the end of the index file, and a stored document id
+FOOTER_SIZE = DOC_ID_SIZE = array('q').itemsize
+
+class ParsedQuery(NamedTuple):
+    """A search query split into plain terms, phrases and proximity clauses."""
+    terms: List[str]
+    phrases: List[Tuple[str, ...]]
+    near: List[Tuple[str, str, int]]
+    
+    @property
+    def structured(self) -> bool:
+        """True if the query has clauses that need the positional index."""
+        return bool(self.phrases or self.near)
+    
+    @property
+    def key(self) -> Tuple[Any, ...]:
+        """Normalized form; queries with the same key have the same results."""
+        return tuple(sorted(self.terms)), tuple(sorted(set(self.phrases))), tuple(sorted(set(self.near)))
+
+def parse_query(query: str) -> ParsedQuery:
+    """
+    Split a query into terms, "quoted phrases" and `a NEAR/k b` clauses
+    
+    `terms` holds every distinct word of the query (phrase and NEAR words
+    included) for scoring. NEAR without a distance means NEAR/5.
+    """
+    words: List[str] = []
+    phrases: List[Tuple[str, ...]] = []
+    near: List[Tuple[str, str, int]] = []
+    
+    for match in QUERY_PATTERN.finditer(query):
+        phrase, left, distance, right, word = match.groups()
+        if phrase is not None:
+            phrase_words = tuple(WORD_PATTERN.findall(phrase.lower()))
+            words.extend(phrase_words)
+            if len(phrase_words) > 1:
+                phrases.append(phrase_words)
+        elif left is not None:
+            # The right-hand word is only looked ahead at; it is consumed as a plain word next
+            words.append(left.lower())
+            near.append((left.lower(), right.lower(), int(distance) if distance else DEFAULT_NEAR_DISTANCE))
+        else:
+            words.append(word.lower())
+    
+    return ParsedQuery(list(dict.fromkeys(words)), phrases, near)
+
+def _append_varint(buffer: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buffer.append(value & 0x7f | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+def _decode_varints(data: bytes) -> List[int]:
+    values = []
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            values.append(value)
+            value = shift = 0
+    return values
+
+def _encode_postings(buffer: bytearray, doc_id: int, positions: List[int]) -> None:
+    """Append the positions of a term in one document: doc, count, position gaps."""
+    _append_varint(buffer, doc_id)
+    _append_varint(buffer, len(positions))
+    previous = 0
+    for position in positions:
+        _append_varint(buffer, position - previous)
+        previous = position
+
+def _write_run(path: Path, buffers: Dict[str, bytearray], doc_lists: Dict[str, array]) -> Path:
+    """Spill encoded postings as (term, postings, document ids) records in term order."""
+    with open(path, 'wb') as f:
+        for term in sorted(buffers):
+            record = bytearray()
+            encoded_term = term.encode('utf-8')
+            _append_varint(record, len(encoded_term))
+            record += encoded_term
+            _append_varint(record, len(buffers[term]))
+            f.write(record)
+            f.write(buffers[term])
+            
+            record = bytearray()
+            _append_varint(record, len(doc_lists[term]))
+            f.write(record)
+            f.write(doc_lists[term])
+    return path
+
+def _read_varint(f: BinaryIO) -> Optional[int]:
+    value = shift = 0
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        value |= (byte[0] & 0x7f) << shift
+        if not byte[0] & 0x80:
+            return value
+        shift += 7
+
+def _read_run(path: Path, run: int) -> Iterator[Tuple[str, int, bytes, bytes]]:
+    with open(path, 'rb') as f:
+        while True:
+            length = _read_varint(f)
+            if length is None:
+                return
+            term = f.read(length).decode('utf-8')
+            postings = f.read(_read_varint(f))
+            doc_ids = f.read(_read_varint(f) * DOC_ID_SIZE)
+            yield term, run, postings, doc_ids
+
+def _merge_runs(runs: List[Path], buffers: Dict[str, bytearray],
+                doc_lists: Dict[str, array]) -> Iterator[Tuple[str, List[Tuple[bytes, bytes]]]]:
+    """(term, (postings, document ids) chunks) in term order; chunks in run order, i.e. by document id."""
+    sources = [_read_run(path, run) for run, path in enumerate(runs)]
+    sources.append(
+        (term, len(runs), bytes(buffers[term]), doc_lists[term].tobytes()) for term in sorted(buffers)
+    )
+    
+    current, chunks = None, []
+    for term, _, postings, doc_ids in heapq.merge(*sources):
+        if term != current:
+            if chunks:
+                yield current, chunks
+            current, chunks = term, []
+        chunks.append((postings, doc_ids))
+    if chunks:
+        yield current, chunks
+
+def _pad(f: BinaryIO) -> int:
+    """Align the next section to 8 bytes (arrays are read in place); returns its offset."""
+    offset = f.tell()
+    padding = -offset % FOOTER_SIZE
+    f.write(b'\0' * padding)
+    return offset + padding
+
+class PositionalIndex:
+    """Term -> document -> word positions for the whole RAG corpus."""
+    
+    def __init__(self, data, layout: Dict[str, Any]):
+        """data: contents of an index file (usually memory-mapped), layout: its footer."""
+        self._data = data
+        self.documents: List[str] = layout['documents']
+        self.document_ids = {filename: doc_id for doc_id, filename in enumerate(self.documents)}
+        
+        view = memoryview(data)
+        start, end = layout['terms']
+        terms = bytes(view[start:end]).decode('utf-8')
+        self._terms = terms.split('\n') if terms else []
+        self._offsets = self._array(view, layout['offsets'])
+        self._doc_ids = self._array(view, layout['doc_ids'])
+        self._doc_offsets = self._array(view, layout['doc_offsets'])
+        self._checkpoints = self._array(view, layout['checkpoints'])
+        self._checkpoint_starts = self._array(view, layout['checkpoint_starts'])
+        
+        # Plain dict: a term decoded by two queries at once is merely decoded twice
+        self._decoded: Dict[str, Dict[int, array]] = {}
+    
+    @classmethod
+    def build(cls, corpus: RagCorpus, path: Path, spill_bytes: int = SPILL_BYTES) -> 'PositionalIndex':
+        """
+        Index every word position of every document into path, streaming the text
+        
+        The file is replaced atomically (readers never see a partial index).
+        
+        Returns:
+            The new index, loaded from path
+        """
+        path = Path(path)
+        temp_path = path.with_name(path.name + '.tmp')
+        doc_ids_path = path.with_name(path.name + '.docs.tmp')
+        documents = []
+        checkpoints = array('q')
+        checkpoint_starts = array('q', [0])
+        buffers: Dict[str, bytearray] = {}
+        doc_lists: Dict[str, array] = {}
+        buffered = 0
+        runs: List[Path] = []
+        
+        try:
+            for doc_id, document in enumerate(corpus):
+                documents.append(document.filename)
+                positions: Dict[str, List[int]] = {}
+                for position, (word, offset) in enumerate(document.iter_word_offsets()):
+                    positions.setdefault(word, []).append(position)
+                    if position % CHECKPOINT_INTERVAL == 0:
+                        checkpoints.append(offset)
+                checkpoint_starts.append(len(checkpoints))
+                
+                # Only this document's positions are held as Python lists
+                for word, word_positions in positions.items():
+                    buffer = buffers.get(word)
+                    if buffer is None:
+                        buffer = buffers[word] = bytearray()
+                        doc_lists[word] = array('q')
+                    size = len(buffer)
+                    _encode_postings(buffer, doc_id, word_positions)
+                    doc_lists[word].append(doc_id)
+                    buffered += len(buffer) - size + DOC_ID_SIZE
+                if buffered >= spill_bytes:
+                    runs.append(_write_run(path.with_name(f"{path.name}.run{len(runs)}"), buffers, doc_lists))
+                    buffers, doc_lists, buffered = {}, {}, 0
+            
+            # Document ids go to a second file while the postings are written, then follow them
+            with open(temp_path, 'wb') as f, open(doc_ids_path, 'wb+') as doc_ids:
+                terms = []
+                offsets = array('q', [0])
+                doc_offsets = array('q', [0])
+                for term, chunks in _merge_runs(runs, buffers, doc_lists):
+                    terms.append(term)
+                    for postings, term_doc_ids in chunks:
+                        f.write(postings)
+                        doc_ids.write(term_doc_ids)
+                    offsets.append(f.tell())
+                    doc_offsets.append(doc_ids.tell() // DOC_ID_SIZE)
+                
+                layout: Dict[str, Any] = {'version': INDEX_VERSION, 'byteorder': sys.byteorder, 'documents': documents}
+                start = _pad(f)
+                doc_ids.seek(0)
+                shutil.copyfileobj(doc_ids, f)
+                layout['doc_ids'] = [start, f.tell()]
+                
+                for name, section in (('terms', '\n'.join(terms).encode('utf-8')), ('offsets', offsets), ('doc_offsets', doc_offsets),
+                                      ('checkpoints', checkpoints), ('checkpoint_starts', checkpoint_starts)):
+                    start = _pad(f)
+                    f.write(section)
+                    layout[name] = [start, f.tell()]
+                
+                footer = json.dumps(layout, ensure_ascii=False).encode('utf-8')
+                f.write(footer)
+                f.write(len(footer).to_bytes(FOOTER_SIZE, 'little'))
+            temp_path.replace(path)
+        finally:
+            for run in runs:
+                run.unlink(missing_ok=True)
+            temp_path.unlink(missing_ok=True)
+            doc_ids_path.unlink(missing_ok=True)
+        
+        index = cls.load(path)
+        if index is None:
+            raise OSError(f"Positional index {path} could not be read back")
+        return index
+    
+    @classmethod
+    def load(cls, path: Path) -> Optional['PositionalIndex']:
+        """Map a saved index; None if missing, unreadable or of another version."""
+        try:
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            footer_size = int.from_bytes(data[-FOOTER_SIZE:], 'little')
+            layout = json.loads(data[-FOOTER_SIZE - footer_size:-FOOTER_SIZE])
+        except (OSError, ValueError):
+            return None
+        if not isinstance(layout, dict) or layout.get('version') != INDEX_VERSION \
+                or layout.get('byteorder') != sys.byteorder:
+            return None
+        return cls(data, layout)
+    
+    def positions(self, term: str) -> Dict[int, array]:
+        """Sorted positions of a term per document id."""
+        decoded = self._decoded.get(term)
+        if decoded is None:
+            decoded = self._decode(self._postings(term))
+            if len(self._decoded) >= DECODED_CACHE_SIZE:
+                self._decoded.clear()
+            self._decoded[term] = decoded
+        return decoded
+    
+    def documents_with(self, term: str) -> Sequence[int]:
+        """Ids of the documents containing a term, ascending (read in place, nothing is decoded)."""
+        index = self._term_index(term)
+        if index is None:
+            return ()
+        return self._doc_ids[self._doc_offsets[index]:self._doc_offsets[index + 1]]
+    
+    def checkpoint(self, doc_id: int, position: int) -> Optional[Tuple[int, int]]:
+        """(word position, byte offset) of the last checkpoint at or before position."""
+        if doc_id + 1 >= len(self._checkpoint_starts):
+            return None
+        start, end = self._checkpoint_starts[doc_id], self._checkpoint_starts[doc_id + 1]
+        if start == end:
+            return None
+        index = min(position // CHECKPOINT_INTERVAL, end - start - 1)
+        return index * CHECKPOINT_INTERVAL, self._checkpoints[start + index]
+    
+    def best_window(self, doc_id: int, groups: Iterable[Iterable[str]], size: int = SNIPPET_WORDS) -> Optional[int]:
+        """
+        Start position of the `size` word window with the most distinct query terms
+        
+        groups holds per query term the words that count as a match for it.
+        Ties go to the window with more matches overall, then to the earlier one.
+        None if no term occurs in the document.
+        """
+        hits = []
+        for term_id, words in enumerate(groups):
+            for word in words:
+                hits.extend((position, term_id) for position in self.positions(word).get(doc_id, ()))
+        if not hits:
+            return None
+        hits.sort()
+        
+        # Sliding window over the sorted hits, counting matches per term
+        best, best_start = (0, 0), 0
+        counts: Dict[int, int] = {}
+        left = 0
+        for position, term_id in hits:
+            counts[term_id] = counts.get(term_id, 0) + 1
+            while hits[left][0] <= position - size:
+                left_term = hits[left][1]
+                counts[left_term] -= 1
+                if not counts[left_term]:
+                    del counts[left_term]
+                left += 1
+            score = (len(counts), sum(counts.values()))
+            if score > best:
+                best, best_start = score, hits[left][0]
+        
+        # Leave some context before the first match
+        return max(0, best_start - size // 4)
+    
+    def snippet(self, document: RagDocument, terms: Iterable[str], size: int = SNIPPET_WORDS,
+                matches: Optional[Dict[str, List[str]]] = None) -> Optional[str]:
+        """
+        Text around the best matching window with query words highlighted
+        
+        matches maps query terms to the indexed words they matched during the
+        search (containing words, corrections); without it only exact
+        occurrences of the terms place the window. Reads from the nearest
+        checkpoint before the window only; None if the document has no
+        matches or is not in the index.
+        """
+        terms = [term for term in dict.fromkeys(terms) if term]
+        doc_id = self.document_ids.get(document.filename)
+        if doc_id is None or not terms:
+            return None
+        matches = matches or {}
+        groups = [{term, *matches.get(term, ())} for term in terms]
+        matched_words = set().union(*groups)
+        start = self.best_window(doc_id, groups, size)
+        if start is None:
+            return None
+        checkpoint = self.checkpoint(doc_id, start)
+        if checkpoint is None:
+            return None
+        
+        position, offset = checkpoint
+        parts = []
+        for separator, word in document.read_words_from(offset, start - position + size):
+            if position >= start:
+                if parts:
+                    parts.append(WHITESPACE.sub(' ', separator))
+                lowered = word.lower()
+                highlight = lowered in matched_words or any(term in lowered for term in terms)
+                parts.append(f"{HIGHLIGHT}{word}{HIGHLIGHT}" if highlight else word)
+            position += 1
+        if not parts:
+            return None
+        
+        ellipsis_before = '… ' if start > 0 else ''
+        ellipsis_after = ' …' if position - start >= size else ''
+        return ellipsis_before + ''.join(parts) + ellipsis_after
+    
+    def phrase_documents(self, words: Iterable[str]) -> Set[str]:
+        """Documents containing the words consecutively, in this order."""
+        words = list(words)
+        lists = [self.positions(word) for word in words]
+        matches = set()
+        
+        for doc_id in set(lists[0]).intersection(*lists[1:]):
+            # Phrase starts: positions of the first word, shifted along each following word
+            starts = lists[0][doc_id]
+            for offset, word_positions in enumerate(lists[1:], 1):
+                starts = self._follow(starts, word_positions[doc_id], offset)
+                if not starts:
+                    break
+            if starts:
+                matches.add(self.documents[doc_id])
+        return matches
+    
+    def near_documents(self, left: str, right: str, distance: int) -> Set[str]:
+        """Documents where both words occur at most `distance` words apart."""
+        left_docs = self.positions(left)
+        right_docs = self.positions(right)
+        return {
+            self.documents[doc_id]
+            for doc_id in set(left_docs).intersection(right_docs)
+            if self._within(left_docs[doc_id], right_docs[doc_id], distance)
+        }
+    
+    def match(self, query: ParsedQuery) -> Set[str]:
+        """Documents satisfying every phrase and NEAR clause of the query."""
+        matches: Optional[Set[str]] = None
+        for documents in self._clause_matches(query):
+            matches = documents if matches is None else matches & documents
+            if not matches:
+                return set()
+        return matches or set()
+    
+    def _clause_matches(self, query: ParsedQuery) -> Iterator[Set[str]]:
+        for phrase in query.phrases:
+            yield self.phrase_documents(phrase)
+        for left, right, distance in query.near:
+            yield self.near_documents(left, right, distance)
+    
+    def _term_index(self, term: str) -> Optional[int]:
+        """Position of a term in the sorted term list, None if it is not indexed."""
+        index = bisect_left(self._terms, term)
+        if index == len(self._terms) or self._terms[index] != term:
+            return None
+        return index
+    
+    def _postings(self, term: str) -> bytes:
+        """Encoded postings of a term."""
+        index = self._term_index(term)
+        if index is None:
+            return b''
+        return self._data[self._offsets[index]:self._offsets[index + 1]]
+    
+    @staticmethod
+    def _array(view: memoryview, section: List[int]) -> memoryview:
+        start, end = section
+        return view[start:end].cast('q')
+    
+    @staticmethod
+    def _decode(encoded: bytes) -> Dict[int, array]:
+        values = _decode_varints(encoded)
+        decoded = {}
+        i = 0
+        while i < len(values):
+            doc_id, count = values[i], values[i + 1]
+            positions = array('l')
+            position = 0
+            for gap in values[i + 2:i + 2 + count]:
+                position += gap
+                positions.append(position)
+            decoded[doc_id] = positions
+            i += 2 + count
+        return decoded
+    
+    @staticmethod
+    def _follow(starts: List[int], positions: array, offset: int) -> List[int]:
+        """Starts s for which s + offset is in positions (merge of two sorted lists)."""
+        result = []
+        j = 0
+        for start in starts:
+            target = start + offset
+            while j < len(positions) and positions[j] < target:
+                j += 1
+            if j == len(positions):
+                break
+            if positions[j] == target:
+                result.append(start)
+        return result
+    
+    @staticmethod
+    def _within(left: array, right: array, distance: int) -> bool:
+        """True if some pair of positions is at most distance apart (merge of two sorted lists)."""
+        i = j = 0
+        while i < len(left) and j < len(right):
+            if abs(left[i] - right[j]) <= distance:
+                return True
+            if left[i] < right[j]:
+                i += 1
+            else:
+                j += 1
+        return False
@@ -0,0 +1,104 @@
+"""
+Query Result Cache for AITON-RAG
+
+LRU/TTL cache for search results. Keys include the knowledge base
+generation, so a rebuilt knowledge base never serves stale results.
+Concurrent misses for the same key are coalesced: one caller computes,
+the others wait for its result (single-flight).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+class _Flight:
+    """A computation in progress that other callers can wait for."""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+class QueryCache:
+    """Thread-safe LRU cache with expiry and single-flight misses."""
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._generation: Any = None
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    def get_or_compute(self, key: Hashable, generation: Any, compute: Callable[[], Any]) -> Any:
+        """
+        Cached value for key at the given generation, computing it on a miss
+        
+        A different generation than the cached one drops all entries first.
+        """
+        key = (generation, key)
+        
+        with self._lock:
+            if generation != self._generation:
+                self._entries.clear()
+                self._generation = generation
+            
+            cached = self._entries.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return cached[1]
+            
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self.misses += 1
+                leader = True
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        try:
+            flight.value = compute()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+                if flight.error is None and self.max_entries > 0 and key[0] == self._generation:
+                    self._entries[key] = (time.monotonic() + self.ttl, flight.value)
+                    self._entries.move_to_end(key)
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+            flight.done.set()
+        
+        return flight.value
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'hit_rate': round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl
+            }
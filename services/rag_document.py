@@ -0,0 +1,229 @@
+"""
+AITON-RAG Document Handles
+Lazy Zugriff auf RAG-Markdown-Dateien mit begrenztem Speicherbedarf
+"""
+
+import codecs
+import logging
+import re
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Upper bound for the frontmatter header read
+HEADER_READ_LIMIT = 64 * 1024
+
+# Chunk size for streamed body reads
+BODY_CHUNK_SIZE = 64 * 1024
+
+# Block size for reads around a known offset (snippets)
+SNIPPET_READ_SIZE = 4 * 1024
+
+WORD_PATTERN = re.compile(r'\w+')
+
+logger = logging.getLogger(__name__)
+
+class RagDocument:
+    """Lazy Handle auf eine RAG-Datei: Frontmatter sofort verfügbar, Inhalt nur bei Bedarf"""
+    
+    def __init__(self, file_path: Path):
+        self.file_path = Path(file_path)
+        self.filename = self.file_path.name
+        self._metadata: Optional[Dict[str, str]] = None
+        self._body_offset = 0
+    
+    @property
+    def metadata(self) -> Dict[str, str]:
+        """Frontmatter-Metadaten, gelesen aus einem begrenzten Dateikopf"""
+        if self._metadata is None:
+            self._read_header()
+        return self._metadata
+    
+    @property
+    def body_offset(self) -> int:
+        """Byte-Offset des Markdown-Inhalts hinter dem Frontmatter"""
+        if self._metadata is None:
+            self._read_header()
+        return self._body_offset
+    
+    @property
+    def content(self) -> str:
+        """Vollständiger Inhalt (nur für Einzeldokumente gedacht)"""
+        return ''.join(self.iter_chunks()).strip()
+    
+    def _read_header(self) -> None:
+        """Parst das Frontmatter ohne mehr als HEADER_READ_LIMIT Bytes zu lesen"""
+        metadata = {}
+        body_offset = 0
+        
+        try:
+            with open(self.file_path, 'rb') as f:
+                first_line = f.readline(HEADER_READ_LIMIT)
+                if first_line.strip() == b'---':
+                    consumed = len(first_line)
+                    while consumed < HEADER_READ_LIMIT:
+                        line = f.readline(HEADER_READ_LIMIT - consumed)
+                        if not line:
+                            break
+                        consumed += len(line)
+                        if line.strip() == b'---':
+                            body_offset = consumed
+                            break
+                        text = line.decode('utf-8', errors='replace')
+                        if ':' in text:
+                            key, value = text.split(':', 1)
+                            metadata[key.strip()] = value.strip()
+        except OSError as e:
+            logger.warning(f"Could not read header of {self.file_path}: {e}")
+        
+        # Without a terminated header the whole file is treated as markdown
+        self._metadata = metadata if body_offset else {}
+        self._body_offset = body_offset
+    
+    def iter_chunks(self, chunk_size: int = BODY_CHUNK_SIZE) -> Iterator[str]:
+        """Streamt den Markdown-Inhalt in dekodierten Blöcken"""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        
+        try:
+            with open(self.file_path, 'rb') as f:
+                f.seek(self.body_offset)
+                for block in iter(lambda: f.read(chunk_size), b''):
+                    text = decoder.decode(block)
+                    if text:
+                        yield text
+                tail = decoder.decode(b'', final=True)
+                if tail:
+                    yield tail
+        except OSError as e:
+            logger.warning(f"Could not read {self.file_path}: {e}")
+    
+    def read_prefix(self, max_chars: int) -> str:
+        """Liest höchstens max_chars Zeichen vom Anfang des Inhalts"""
+        parts = []
+        collected = 0
+        
+        for chunk in self.iter_chunks(chunk_size=max(4 * max_chars, 1024)):
+            if not parts:
+                chunk = chunk.lstrip()
+            parts.append(chunk)
+            collected += len(chunk)
+            if collected >= max_chars:
+                break
+        
+        return ''.join(parts)[:max_chars].rstrip()
+    
+    def iter_words(self) -> Iterator[str]:
+        """Streamt die Wörter des Inhalts (kleingeschrieben), auch über Blockgrenzen hinweg"""
+        carry = ''
+        
+        for chunk in self.iter_chunks():
+            text = carry + chunk.lower()
+            matches = list(WORD_PATTERN.finditer(text))
+            carry = ''
+            # A word touching the end of the block may continue in the next one
+            if matches and matches[-1].end() == len(text):
+                carry = matches.pop().group()
+            for match in matches:
+                yield match.group()
+        
+        if carry:
+            yield carry
+    
+    def iter_word_offsets(self) -> Iterator[Tuple[str, int]]:
+        """Streamt die Wörter (kleingeschrieben) mit ihrem Byte-Offset in der Datei"""
+        carry = ''
+        carry_offset = self.body_offset
+        
+        for chunk in self.iter_chunks():
+            text = carry + chunk
+            matches = list(WORD_PATTERN.finditer(text))
+            end = len(text)
+            # A word touching the end of the block may continue in the next one
+            if matches and matches[-1].end() == end:
+                end = matches.pop().start()
+            
+            # Offsets advance by the encoded length of the text between word starts
+            position, offset = 0, carry_offset
+            for match in matches:
+                offset += len(text[position:match.start()].encode('utf-8'))
+                position = match.start()
+                yield match.group().lower(), offset
+            
+            carry = text[end:]
+            carry_offset = offset + len(text[position:end].encode('utf-8'))
+        
+        if carry:
+            match = WORD_PATTERN.match(carry)
+            if match:
+                yield match.group().lower(), carry_offset
+    
+    def read_words_from(self, offset: int, max_words: int) -> Iterator[Tuple[str, str]]:
+        """
+        Liest ab einem Byte-Offset (Wortanfang) höchstens max_words Wörter
+        
+        Liefert (Zwischentext, Wort) Paare im Originaltext, damit Ausschnitte
+        ohne Lesen des ganzen Dokuments zusammengesetzt werden können.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        carry = ''
+        count = 0
+        
+        try:
+            with open(self.file_path, 'rb') as f:
+                f.seek(offset)
+                for block in iter(lambda: f.read(SNIPPET_READ_SIZE), b''):
+                    text = carry + decoder.decode(block)
+                    position = 0
+                    for match in WORD_PATTERN.finditer(text):
+                        if match.end() == len(text):
+                            break
+                        yield text[position:match.start()], match.group()
+                        position = match.end()
+                        count += 1
+                        if count >= max_words:
+                            return
+                    carry = text[position:]
+                
+                match = WORD_PATTERN.search(carry)
+                if match:
+                    yield carry[:match.start()], match.group()
+        except OSError as e:
+            logger.warning(f"Could not read {self.file_path}: {e}")
+    
+    def contains_any(self, words: Iterable[str]) -> bool:
+        """Prüft per Streaming, ob eines der Wörter (Teilstring, kleingeschrieben) vorkommt"""
+        words = [word.lower() for word in words]
+        overlap = max((len(word) for word in words), default=1) - 1
+        tail = ''
+        
+        for chunk in self.iter_chunks():
+            text = tail + chunk.lower()
+            if any(word in text for word in words):
+                return True
+            tail = text[-overlap:] if overlap else ''
+        
+        return False
+    
+    def __repr__(self) -> str:
+        return f"RagDocument({self.filename!r})"
+
+class RagCorpus:
+    """Re-iterierbare Sicht auf die RAG-Dateien; jede Iteration liefert frische Lazy Handles"""
+    
+    def __init__(self, paths: Iterable[Path]):
+        self.paths: List[Path] = sorted(Path(path) for path in paths)
+    
+    @classmethod
+    def from_directory(cls, rag_dir: Path) -> 'RagCorpus':
+        """Momentaufnahme aller Markdown-Dateien eines Verzeichnisses"""
+        return cls(path for path in Path(rag_dir).glob('*.md') if path.is_file())
+    
+    def __iter__(self) -> Iterator[RagDocument]:
+        for path in self.paths:
+            yield RagDocument(path)
+    
+    def __len__(self) -> int:
+        return len(self.paths)
+    
+    def filenames(self) -> List[str]:
+        """Dateinamen aller Dokumente"""
+        return [path.name for path in self.paths]
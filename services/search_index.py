@@ -0,0 +1,517 @@
+"""
+Search Index for AITON-RAG
+
+Inverted index over the knowledge base entries, built once per knowledge
+base generation. Single queries and batches are answered from the postings
+lists instead of scanning every entry's text. A sorted term dictionary
+with the document frequencies of the full RAG documents backs prefix
+autocompletion; it is built while the knowledge base is aggregated and
+saved next to it.
+
+A query term matches every indexed word containing it (as the previous
+substring search did); since terms and words are both runs of word
+characters, matching against the vocabulary gives the same hits as scanning
+the text. The vocabulary holds the words of the full documents (from the
+term dictionary), and contents match through the document lists of the
+positional index, so words past the entry previews are found too. An
+n-gram index over the vocabulary finds matching words without scanning
+it. Terms matching no word at all are treated as typos and replaced by the
+closest words within a small edit distance. Quoted phrases and NEAR
+clauses are checked against the positional index of the full documents.
+Category and metadata filters and facet counts use the bitmaps of a
+FacetIndex (see services/facets.py); date and size ranges are masks over
+the MetadataColumns (see services/metadata_columns.py).
+"""
+
+import heapq
+import json
+import threading
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .facets import BitmapSet, FacetIndex, facet_values, normalize_filters, to_bitmap
+from .metadata_columns import MetadataColumns
+from .positional_index import ParsedQuery, PositionalIndex, parse_query
+from .rag_document import WORD_PATTERN
+
+TERM_DICTIONARY_VERSION = 1
+
+# Stored in the knowledge base directory
+TERM_DICTIONARY_FILE = 'term_dictionary.bin'
+
+# Title matches weigh twice as much as content matches
+TITLE_WEIGHT = 2
+CONTENT_WEIGHT = 1
+
+# Each satisfied phrase or NEAR clause weighs as much as a term found in title and content
+CLAUSE_WEIGHT = TITLE_WEIGHT + CONTENT_WEIGHT
+
+# Words are indexed under their substrings of up to this many characters
+NGRAM_LENGTH = 3
+
+# Typo tolerance: deletes are indexed for this many leading characters only
+FUZZY_PREFIX_LENGTH = 7
+MAX_CORRECTIONS = 5
+
+# Resolved query terms kept per index (see SearchIndex.resolve)
+RESOLVED_TERMS_CACHE_SIZE = 10000
+
+def tokenize(text: str) -> List[str]:
+    """Distinct lowercase terms of a text, in order of first occurrence."""
+    return list(dict.fromkeys(WORD_PATTERN.findall(text.lower())))
+
+def query_key(query: str) -> Tuple[Any, ...]:
+    """Normalized form of a query; queries with the same key have the same results."""
+    return parse_query(query).key
+
+class TermDictionary:
+    """
+    Sorted terms with document frequencies for prefix completion
+    
+    Terms sharing a prefix form one contiguous range, found by binary search.
+    A max segment tree over the frequencies yields the k most frequent terms
+    of that range in O(log V + k log V), without scanning the range.
+    """
+    
+    def __init__(self, frequencies: Dict[str, int]):
+        self.terms = sorted(frequencies)
+        self.frequencies = array('l', (frequencies[term] for term in self.terms))
+        
+        # Leaves hold term positions; inner nodes the position of the larger frequency
+        size = 1
+        while size < max(len(self.terms), 1):
+            size *= 2
+        self._size = size
+        self._tree = array('l', [-1]) * (2 * size)
+        for position in range(len(self.terms)):
+            self._tree[size + position] = position
+        for node in range(size - 1, 0, -1):
+            self._tree[node] = self._better(self._tree[2 * node], self._tree[2 * node + 1])
+    
+    @classmethod
+    def load(cls, path: Path) -> Optional['TermDictionary']:
+        """Read a saved dictionary; None if missing, unreadable or of another version."""
+        try:
+            data = Path(path).read_bytes()
+            header_end = data.index(b'\n') + 1
+            header = json.loads(data[:header_end])
+        except (OSError, ValueError):
+            return None
+        if header.get('version') != TERM_DICTIONARY_VERSION or header.get('itemsize') != array('l').itemsize:
+            return None
+        
+        dictionary = cls.__new__(cls)
+        terms_end = header_end + header['terms_bytes']
+        terms = data[header_end:terms_end].decode('utf-8')
+        dictionary.terms = terms.split('\n') if terms else []
+        dictionary.frequencies = array('l')
+        dictionary.frequencies.frombytes(data[terms_end:terms_end + len(dictionary.terms) * header['itemsize']])
+        dictionary._size = header['size']
+        dictionary._tree = array('l')
+        dictionary._tree.frombytes(data[terms_end + len(dictionary.terms) * header['itemsize']:])
+        return dictionary
+    
+    def save(self, path: Path) -> None:
+        """Write terms, frequencies and segment tree atomically, so loading builds nothing."""
+        path = Path(path)
+        temp_path = path.with_name(path.name + '.tmp')
+        terms = '\n'.join(self.terms).encode('utf-8')
+        header = {
+            'version': TERM_DICTIONARY_VERSION, 'itemsize': self.frequencies.itemsize,
+            'size': self._size, 'terms_bytes': len(terms)
+        }
+        with open(temp_path, 'wb') as f:
+            f.write(json.dumps(header).encode('utf-8') + b'\n')
+            f.write(terms)
+            self.frequencies.tofile(f)
+            self._tree.tofile(f)
+        temp_path.replace(path)
+    
+    def __len__(self) -> int:
+        return len(self.terms)
+    
+    def frequency(self, term: str) -> int:
+        """Document frequency of a term, 0 if unknown."""
+        position = bisect_left(self.terms, term)
+        if position < len(self.terms) and self.terms[position] == term:
+            return self.frequencies[position]
+        return 0
+    
+    def complete(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """Up to `limit` (term, document frequency) pairs starting with prefix, most frequent first."""
+        prefix = prefix.lower()
+        start = bisect_left(self.terms, prefix)
+        end = bisect_left(self.terms, prefix + '\U0010ffff', start)
+        
+        completions = []
+        heap = []
+        self._push(heap, start, end)
+        while heap and len(completions) < limit:
+            _, position, low, high = heapq.heappop(heap)
+            completions.append((self.terms[position], self.frequencies[position]))
+            self._push(heap, low, position)
+            self._push(heap, position + 1, high)
+        return completions
+    
+    def _push(self, heap: List[Tuple[int, int, int, int]], low: int, high: int) -> None:
+        if low < high:
+            position = self._range_max(low, high)
+            heapq.heappush(heap, (-self.frequencies[position], position, low, high))
+    
+    def _range_max(self, low: int, high: int) -> int:
+        """Position of the most frequent term in [low, high); ties go to the first term."""
+        best = -1
+        low += self._size
+        high += self._size
+        while low < high:
+            if low & 1:
+                best = self._better(best, self._tree[low])
+                low += 1
+            if high & 1:
+                high -= 1
+                best = self._better(best, self._tree[high])
+            low //= 2
+            high //= 2
+        return best
+    
+    def _better(self, a: int, b: int) -> int:
+        if a < 0:
+            return b
+        if b < 0:
+            return a
+        if self.frequencies[a] != self.frequencies[b]:
+            return a if self.frequencies[a] > self.frequencies[b] else b
+        return min(a, b)
+
+class SubstringIndex:
+    """
+    Words of a vocabulary containing a given substring
+    
+    Every word is listed under each of its distinct substrings of up to
+    NGRAM_LENGTH characters. Shorter terms are a single lookup; a longer term
+    intersects the lists of its n-grams, shortest first, and only the
+    remaining candidates are checked with `in`.
+    """
+    
+    def __init__(self, words: Iterable[str], ngram_length: int = NGRAM_LENGTH):
+        self.words = list(words)
+        self.ngram_length = ngram_length
+        self._ngrams: Dict[str, array] = {}
+        
+        for word_id, word in enumerate(self.words):
+            for ngram in self._ngrams_of(word):
+                word_ids = self._ngrams.get(ngram)
+                if word_ids is None:
+                    word_ids = self._ngrams[ngram] = array('l')
+                word_ids.append(word_id)
+    
+    def lookup(self, term: str) -> List[str]:
+        """Words containing term, in vocabulary order."""
+        if not term:
+            return []
+        if len(term) <= self.ngram_length:
+            return [self.words[word_id] for word_id in self._ngrams.get(term, ())]
+        
+        n = self.ngram_length
+        lists = sorted((self._ngrams.get(term[i:i + n], ()) for i in range(len(term) - n + 1)), key=len)
+        candidates = set(lists[0])
+        for word_ids in lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(word_ids)
+        return [self.words[word_id] for word_id in sorted(candidates) if term in self.words[word_id]]
+    
+    def _ngrams_of(self, word: str) -> Set[str]:
+        return {
+            word[i:i + length]
+            for length in range(1, self.ngram_length + 1)
+            for i in range(len(word) - length + 1)
+        }
+
+def allowed_edit_distance(term: str, max_distance: int) -> int:
+    """Short terms must match exactly, longer ones may have one or two typos."""
+    if len(term) < 4:
+        return 0
+    return min(max_distance, 1 if len(term) < 8 else 2)
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Damerau-Levenshtein distance (adjacent transpositions), max_distance + 1 if larger."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+class FuzzyMatcher:
+    """
+    Symmetric-delete dictionary (SymSpell) over the vocabulary
+    
+    Every word is stored under all variants of its prefix with up to
+    max_distance characters deleted. A misspelled term generates its own
+    delete variants; words sharing a variant are the only candidates, and
+    only those are checked with a real edit distance.
+    """
+    
+    def __init__(self, words: Iterable[str], max_distance: int = 2,
+                 prefix_length: int = FUZZY_PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self._deletes: Dict[str, List[str]] = {}
+        
+        for word in words:
+            for variant in self._variants(word[:prefix_length], max_distance):
+                self._deletes.setdefault(variant, []).append(word)
+    
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Words within max_distance edits of term as (word, distance), closest first."""
+        max_distance = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        
+        candidates: Set[str] = set()
+        for variant in self._variants(term[:self.prefix_length], max_distance):
+            candidates.update(self._deletes.get(variant, ()))
+        
+        matches = []
+        for word in candidates:
+            distance = edit_distance(term, word, max_distance)
+            if distance <= max_distance:
+                matches.append((word, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+    
+    @staticmethod
+    def _variants(text: str, max_distance: int) -> Set[str]:
+        variants = {text}
+        level = {text}
+        for _ in range(max_distance):
+            level = {variant[:i] + variant[i + 1:] for variant in level for i in range(len(variant))}
+            variants |= level
+        return variants
+
+class SearchIndex:
+    """Term -> entry postings for titles and contents of knowledge base entries."""
+    
+    def __init__(self, entries: Sequence[Dict[str, Any]], max_edit_distance: int = 2,
+                 positions: Optional[Callable[[], Optional[PositionalIndex]]] = None,
+                 metadata: Optional[Sequence[Dict[str, Any]]] = None,
+                 terms: Optional[TermDictionary] = None):
+        self.entries = entries
+        metadata = metadata or [{}] * len(entries)
+        self.facets = FacetIndex([facet_values(entry, metadata[doc_id]) for doc_id, entry in enumerate(entries)])
+        self.columns = MetadataColumns(metadata)
+        self.max_edit_distance = max_edit_distance
+        # Loaded on the first query that matches a word
+        self._load_positions = positions
+        self._positions: Optional[PositionalIndex] = None
+        self._positions_lock = threading.Lock()
+        self.title_postings: Dict[str, List[int]] = {}
+        self.content_postings: Dict[str, List[int]] = {}
+        
+        for doc_id, entry in enumerate(entries):
+            for term in tokenize(entry['title']):
+                self.title_postings.setdefault(term, []).append(doc_id)
+            for term in tokenize(entry['content']):
+                self.content_postings.setdefault(term, []).append(doc_id)
+        
+        # The term dictionary of the full documents, or of the entries if none was saved
+        if terms is None:
+            frequencies = {term: len(doc_ids) for term, doc_ids in self.content_postings.items()}
+            for term, doc_ids in self.title_postings.items():
+                frequencies[term] = len(set(doc_ids).union(self.content_postings.get(term, ())))
+            terms = TermDictionary(frequencies)
+        self.terms = terms
+        
+        # Queryable words: those of titles and contents plus every word of the full
+        # documents, so no term offered by suggest is taken for a typo
+        self.vocabulary = SubstringIndex(sorted(set(self.title_postings).union(self.content_postings, terms.terms)))
+        
+        # Built with the index, so no query waits for it; over the full-document
+        # words, so words of a document body are no misspellings
+        self._fuzzy = FuzzyMatcher(self.vocabulary.words, max_edit_distance) if max_edit_distance > 0 else None
+        self._resolved: Dict[str, Tuple[List[str], bool]] = {}
+        
+        self.titles: Dict[str, List[int]] = {}
+        for doc_id, entry in enumerate(entries):
+            self.titles.setdefault(entry['title'], []).append(doc_id)
+    
+    def resolve(self, term: str) -> Tuple[List[str], bool]:
+        """
+        Indexed words a query term stands for
+        
+        The words containing the term, or if there are none its corrections
+        (second value True). Cached per index; the cache is a plain dict, a
+        term resolved twice by concurrent queries is merely computed twice.
+        """
+        resolved = self._resolved.get(term)
+        if resolved is None:
+            words = self.vocabulary.lookup(term)
+            resolved = (words, False) if words else (self.corrections(term), True)
+            if len(self._resolved) >= RESOLVED_TERMS_CACHE_SIZE:
+                self._resolved.clear()
+            self._resolved[term] = resolved
+        return resolved
+    
+    def postings(self, term: str) -> Tuple[Set[int], Set[int]]:
+        """Entry ids containing the term (or its corrections) in their title and in their content."""
+        words, _ = self.resolve(term)
+        
+        title_ids: Set[int] = set()
+        content_ids: Set[int] = set()
+        for word in words:
+            title_ids.update(self.title_postings.get(word, ()))
+            content_ids.update(self.content_postings.get(word, ()))
+        
+        # Contents match on the full documents, not only on the entry previews
+        positions = self.positional_index() if words else None
+        if positions is not None:
+            for word in words:
+                for doc_id in positions.documents_with(word):
+                    content_ids.update(self.titles.get(positions.documents[doc_id], ()))
+        return title_ids, content_ids
+    
+    def corrections(self, term: str) -> List[str]:
+        """
+        Closest indexed words for a term that is not part of any indexed word
+        
+        Only words at the smallest edit distance found are returned, the most
+        frequent first. Terms of the term dictionary are never corrected.
+        """
+        max_distance = allowed_edit_distance(term, self.max_edit_distance)
+        if not max_distance or self._fuzzy is None or self.terms.frequency(term):
+            return []
+        
+        matches = self._fuzzy.lookup(term, max_distance)
+        if not matches:
+            return []
+        
+        best = [word for word, distance in matches if distance == matches[0][1]]
+        best.sort(key=lambda word: -self.terms.frequency(word))
+        return best[:MAX_CORRECTIONS]
+    
+    def query_corrections(self, query: str) -> Dict[str, List[str]]:
+        """Corrections for the query terms that match no indexed word."""
+        corrections = {}
+        for term in parse_query(query).terms:
+            words, corrected = self.resolve(term)
+            if corrected and words:
+                corrections[term] = words
+        return corrections
+    
+    def search(self, query: str, category: Optional[str] = None, limit: int = 10,
+               filters: Optional[Dict[str, Any]] = None,
+               ranges: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Results for a single query, best match first."""
+        return self.search_batch([{
+            'query': query, 'category': category, 'limit': limit, 'filters': filters, 'ranges': ranges
+        }])[0]
+    
+    def facet_search(self, query: str, category: Optional[str] = None, limit: int = 10,
+                     filters: Optional[Dict[str, Any]] = None,
+                     ranges: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Results of a query with the number of all matches and their facet counts."""
+        ranked = self._evaluate([{'query': query, 'category': category, 'filters': filters, 'ranges': ranges}])[0]
+        return {
+            'results': self._results(ranked, limit),
+            'total_matches': len(ranked),
+            'facets': self.facets.counts(to_bitmap((doc_id for _, doc_id in ranked), len(self.entries)))
+        }
+    
+    def search_batch(self, queries: Iterable[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """
+        Evaluate several queries in one pass
+        
+        Queries are parsed once, the postings of every distinct term are
+        fetched once for the whole batch, and repeated (query, filters)
+        combinations are scored only once.
+        """
+        queries = list(queries)
+        return [
+            self._results(ranked, query.get('limit') or 10)
+            for query, ranked in zip(queries, self._evaluate(queries))
+        ]
+    
+    def _evaluate(self, queries: List[Dict[str, Any]]) -> List[List[Tuple[float, int]]]:
+        """All matches of each query as (score, entry id), best first."""
+        parsed = [parse_query(query.get('query') or '') for query in queries]
+        
+        unique_terms = dict.fromkeys(term for query in parsed for term in query.terms)
+        postings = {term: self.postings(term) for term in unique_terms}
+        
+        scored: Dict[Tuple[Any, ...], List[Tuple[float, int]]] = {}
+        ranked = []
+        
+        for query, parsed_query in zip(queries, parsed):
+            # The category parameter is one more facet filter
+            filters = normalize_filters({**(query.get('filters') or {}), 'category': query.get('category')})
+            ranges = query.get('ranges') or {}
+            key = (parsed_query.key, tuple(sorted(filters.items())), tuple(sorted(ranges.items())))
+            if key not in scored:
+                scored[key] = self._score(parsed_query, filters, ranges, postings)
+            ranked.append(scored[key])
+        
+        return ranked
+    
+    def _results(self, ranked: List[Tuple[float, int]], limit: int) -> List[Dict[str, Any]]:
+        return [{**self.entries[doc_id], 'relevance_score': score} for score, doc_id in ranked[:limit]]
+    
+    def positional_index(self) -> Optional[PositionalIndex]:
+        """Positions of the full documents, None if no positional index was built yet."""
+        # The lock is only taken until the first load
+        if self._load_positions is None:
+            return self._positions
+        with self._positions_lock:
+            if self._load_positions is not None:
+                self._positions = self._load_positions()
+                self._load_positions = None
+            return self._positions
+    
+    def _score(self, query: ParsedQuery, filters: Dict[str, Tuple[str, ...]], ranges: Dict[str, Any],
+               postings: Dict[str, Tuple[Set[int], Set[int]]]) -> List[Tuple[float, int]]:
+        terms = query.terms
+        if not terms:
+            return []
+        
+        weights: Dict[int, int] = {}
+        for term in terms:
+            title_ids, content_ids = postings[term]
+            for doc_id in title_ids:
+                weights[doc_id] = weights.get(doc_id, 0) + TITLE_WEIGHT
+            for doc_id in content_ids:
+                weights[doc_id] = weights.get(doc_id, 0) + CONTENT_WEIGHT
+        
+        max_weight = (TITLE_WEIGHT + CONTENT_WEIGHT) * len(terms)
+        
+        # Phrase and NEAR clauses restrict the results to documents satisfying all of them
+        positions = self.positional_index() if query.structured else None
+        if positions is not None:
+            clause_weight = CLAUSE_WEIGHT * (len(query.phrases) + len(query.near))
+            matched = [doc_id for title in positions.match(query) for doc_id in self.titles.get(title, ())]
+            weights = {doc_id: weights.get(doc_id, 0) + clause_weight for doc_id in matched}
+            max_weight += clause_weight
+        
+        allowed = self.facets.filter_bitmap(filters)
+        in_range = self.columns.filter_bitmap(ranges)
+        if in_range is not None:
+            allowed = in_range if allowed is None else allowed & in_range
+        if allowed is not None:
+            allowed = BitmapSet(allowed, len(self.entries))
+        
+        ranked = [
+            (round(weight / max_weight, 3), doc_id)
+            for doc_id, weight in weights.items()
+            if allowed is None or doc_id in allowed
+        ]
+        ranked.sort(key=lambda item: (-item[0], self.entries[item[1]]['title']))
+        return ranked
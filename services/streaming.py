@@ -0,0 +1,101 @@
+"""
+Streaming Response Helpers for AITON-RAG
+
+Serializes large API payloads incrementally and negotiates gzip/deflate
+compression, so big knowledge base responses are never materialized as a
+single JSON string in memory.
+"""
+
+import json
+import zlib
+from typing import Any, Iterable, Iterator, Optional
+
+from flask import Response, request, stream_with_context
+
+# Size of the uncompressed JSON pieces handed to the WSGI server
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Content codings we can produce, in order of preference on equal q-values
+SUPPORTED_ENCODINGS = ('gzip', 'deflate')
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick the preferred supported content coding from an Accept-Encoding header."""
+    best_encoding = None
+    best_quality = 0.0
+
+    for part in (accept_encoding or '').split(','):
+        token, _, params = part.strip().partition(';')
+        token = token.strip().lower()
+        if token == '*':
+            token = SUPPORTED_ENCODINGS[0]
+        if token not in SUPPORTED_ENCODINGS:
+            continue
+
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+
+        if quality <= 0:
+            continue
+        if quality > best_quality or (
+            quality == best_quality
+            and SUPPORTED_ENCODINGS.index(token) < SUPPORTED_ENCODINGS.index(best_encoding)
+        ):
+            best_encoding = token
+            best_quality = quality
+
+    return best_encoding
+
+def iter_json(payload: Any, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """Encode a payload as UTF-8 JSON, yielding it in chunks of roughly chunk_size bytes."""
+    encoder = json.JSONEncoder(ensure_ascii=False, default=str)
+    buffer = []
+    buffered = 0
+
+    for piece in encoder.iterencode(payload):
+        buffer.append(piece)
+        buffered += len(piece)
+        if buffered >= chunk_size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            buffered = 0
+
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+def compress_chunks(chunks: Iterable[bytes], encoding: str) -> Iterator[bytes]:
+    """Compress a byte stream incrementally with gzip or deflate (zlib) framing."""
+    if encoding == 'gzip':
+        wbits = 16 + zlib.MAX_WBITS
+    elif encoding == 'deflate':
+        wbits = zlib.MAX_WBITS
+    else:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, wbits)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+def streaming_json_response(payload: Any, status: int = 200) -> Response:
+    """Build a chunked JSON response, compressed if the client accepts it."""
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding', ''))
+    body = iter_json(payload)
+    headers = {'Vary': 'Accept-Encoding'}
+
+    if encoding:
+        body = compress_chunks(body, encoding)
+        headers['Content-Encoding'] = encoding
+
+    return Response(
+        stream_with_context(body),
+        status=status,
+        mimetype='application/json',
+        headers=headers
+    )
@@ -0,0 +1,190 @@
+"""
+Out-of-Core Text Conversion for AITON-RAG
+
+Plain text and Markdown files are converted line by line from disk to a
+spool file, so memory use does not grow with the file size. The encoding
+is detected on a bounded sample: byte order mark, then UTF-8 validation,
+then chardet on growing samples until it is confident. A sample that is
+valid UTF-8 (plain ASCII in particular) proves nothing about the rest of
+the file, so UTF-8 is decoded strictly; at the first invalid byte the
+encoding is detected again on the failing region.
+"""
+
+import codecs
+import io
+from pathlib import Path
+from typing import Iterator, Optional, TextIO
+
+try:
+    import chardet
+except ImportError:
+    chardet = None
+
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16')
+)
+
+# Bytes inspected first; chardet escalates up to MAX_SAMPLE_SIZE while unsure
+SAMPLE_SIZE = 64 * 1024
+MAX_SAMPLE_SIZE = 4 * 1024 * 1024
+MIN_CONFIDENCE = 0.8
+
+# Encoding when nothing else fits (decodes every byte)
+FALLBACK_ENCODING = 'windows-1252'
+
+# Characters read per batch of lines
+LINE_BATCH_SIZE = 1024 * 1024
+
+# Bytes decoded per read of the source file
+READ_SIZE = 64 * 1024
+
+def _is_utf8(sample: bytes, complete: bool) -> bool:
+    """Valid UTF-8; a sample cut inside a multi-byte character still counts."""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=complete)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def detect_encoding(path: Path) -> str:
+    """Encoding of a text file, reading at most MAX_SAMPLE_SIZE bytes."""
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+        for bom, encoding in BOMS:
+            if sample.startswith(bom):
+                return encoding
+        
+        if _is_utf8(sample, complete=len(sample) < SAMPLE_SIZE):
+            return 'utf-8'
+        if chardet is None:
+            return FALLBACK_ENCODING
+        
+        # Escalate: a larger sample for chardet whenever it is unsure
+        best: Optional[dict] = None
+        while True:
+            detected = chardet.detect(sample)
+            if detected.get('encoding') and (best is None or detected['confidence'] > best['confidence']):
+                best = detected
+            if (best and best['confidence'] >= MIN_CONFIDENCE) or len(sample) >= MAX_SAMPLE_SIZE:
+                break
+            more = f.read(len(sample) * 3)
+            if not more:
+                break
+            sample += more
+    
+    if best is None:
+        return FALLBACK_ENCODING
+    try:
+        return codecs.lookup(best['encoding']).name
+    except LookupError:
+        return FALLBACK_ENCODING
+
+def _redetect(region: bytes) -> str:
+    """Encoding of a region that is not UTF-8: chardet if confident, else FALLBACK_ENCODING."""
+    if chardet is None:
+        return FALLBACK_ENCODING
+    detected = chardet.detect(region)
+    if not detected.get('encoding') or detected['confidence'] < MIN_CONFIDENCE:
+        return FALLBACK_ENCODING
+    try:
+        encoding = codecs.lookup(detected['encoding']).name
+    except LookupError:
+        return FALLBACK_ENCODING
+    return FALLBACK_ENCODING if encoding in ('ascii', 'utf-8') else encoding
+
+class TextSource(io.RawIOBase):
+    """
+    A text file decoded with its detected encoding, read as UTF-8 bytes
+    
+    UTF-8 is only a guess from the sample and is decoded strictly: at the
+    first invalid byte the rest of the file is decoded with the encoding
+    detected on the failing region. Only bytes that do not fit that final
+    encoding are replaced. `encoding` is the encoding in use.
+    """
+    
+    def __init__(self, path: Path, encoding: Optional[str] = None):
+        self.encoding = encoding or detect_encoding(path)
+        self._file = open(path, 'rb')
+        self._strict = self.encoding == 'utf-8'
+        self._decoder = codecs.getincrementaldecoder(self.encoding)('strict' if self._strict else 'replace')
+        self._pending = b''
+        self._eof = False
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        while not self._pending and not self._eof:
+            block = self._file.read(READ_SIZE)
+            self._pending = self._decode(block).encode('utf-8')
+            self._eof = not block
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+    
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+    
+    def text(self, newline: Optional[str] = None) -> TextIO:
+        """The decoded text as a stream (closing it closes the file)."""
+        return io.TextIOWrapper(io.BufferedReader(self), encoding='utf-8', newline=newline)
+    
+    def _decode(self, block: bytes) -> str:
+        try:
+            return self._decoder.decode(block, final=not block)
+        except UnicodeDecodeError as e:
+            if not self._strict:
+                raise
+            # e.object holds the bytes the decoder kept back plus this block
+            valid = e.object[:e.start].decode(self.encoding)
+            region = e.object[e.start:] + self._file.read(SAMPLE_SIZE)
+            self.encoding = _redetect(region)
+            self._strict = False
+            self._decoder = codecs.getincrementaldecoder(self.encoding)('replace')
+            return valid + self._decoder.decode(region, final=not block)
+
+def iter_text_markdown(source: TextIO, markdown: bool = False) -> Iterator[str]:
+    """
+    Markdown of a text stream in batches of lines
+    
+    Short all-caps lines become headings; Markdown sources are passed
+    through unchanged.
+    """
+    if markdown:
+        yield from iter(lambda: source.read(LINE_BATCH_SIZE), '')
+        return
+    
+    for lines in iter(lambda: source.readlines(LINE_BATCH_SIZE), []):
+        parts = []
+        for line in lines:
+            line = line.strip()
+            if not line:
+                parts.append('\n')
+            elif len(line) < 100 and line.isupper():
+                parts.append(f"## {line}\n")
+            else:
+                parts.append(line)
+                parts.append('\n')
+        yield ''.join(parts)
+
+def convert_text_file(path: Path, target: TextIO) -> str:
+    """
+    Stream a text or Markdown file as Markdown into target
+    
+    Bytes that do not fit the detected encoding are replaced instead of
+    aborting the conversion (see TextSource).
+    
+    Returns:
+        The detected encoding
+    """
+    source = TextSource(path)
+    with source.text() as text:
+        for chunk in iter_text_markdown(text, markdown=Path(path).suffix.lower() == '.md'):
+            target.write(chunk)
+    return source.encoding
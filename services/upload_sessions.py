@@ -0,0 +1,194 @@
+"""
+Resumable Chunked Uploads for AITON-RAG
+
+An upload session reserves a file of the announced size on disk; numbered
+chunks are written at their offsets (in any order, also in parallel) and the
+session is finalized once every chunk arrived and the SHA-256 matches.
+Nothing is buffered in memory beyond one copy block.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from config import Config
+from .upload_store import STREAM_READ_SIZE
+
+SESSION_FILE = 'session.json'
+DATA_FILE = 'data.part'
+CHUNKS_DIR = 'chunks'
+
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+class UploadSessionError(ValueError):
+    """Raised for invalid session parameters, chunks or checksums."""
+
+class UploadSessionStore:
+    """File-system backed upload sessions; survives restarts of the app."""
+    
+    def __init__(self, directory: Optional[Path] = None, chunk_size: Optional[int] = None,
+                 max_size: Optional[int] = None):
+        self.directory = Path(directory or Config.UPLOAD_SESSION_DIR)
+        self.chunk_size = chunk_size or Config.UPLOAD_CHUNK_SIZE
+        self.max_size = max_size or Config.MAX_CHUNKED_UPLOAD_SIZE
+        self.logger = logging.getLogger(__name__)
+        
+        # Each chunk is one request, rejected above MAX_CONTENT_LENGTH (= MAX_FILE_SIZE)
+        if self.chunk_size > Config.MAX_FILE_SIZE:
+            self.logger.warning(f"UPLOAD_CHUNK_SIZE {self.chunk_size} exceeds MAX_FILE_SIZE, "
+                                f"using {Config.MAX_FILE_SIZE}")
+            self.chunk_size = Config.MAX_FILE_SIZE
+        self.directory.mkdir(parents=True, exist_ok=True)
+    
+    def create(self, filename: str, total_size: int) -> Dict[str, Any]:
+        """Open a session for a file of total_size bytes."""
+        if total_size <= 0:
+            raise UploadSessionError("File size must be positive")
+        if total_size > self.max_size:
+            raise UploadSessionError(f"File too large. Maximum size is {self.max_size} bytes")
+        
+        upload_id = uuid.uuid4().hex
+        session_dir = self.directory / upload_id
+        (session_dir / CHUNKS_DIR).mkdir(parents=True)
+        
+        # Reserve the full size up front so chunks can be written at their offsets
+        with open(session_dir / DATA_FILE, 'wb') as f:
+            f.truncate(total_size)
+        
+        session = {
+            'upload_id': upload_id,
+            'filename': filename,
+            'total_size': total_size,
+            'chunk_size': self.chunk_size,
+            'chunk_count': -(-total_size // self.chunk_size),
+            'created_at': datetime.now().isoformat()
+        }
+        (session_dir / SESSION_FILE).write_text(json.dumps(session), encoding='utf-8')
+        return self._with_progress(session)
+    
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Session metadata with received and missing chunks, None if unknown."""
+        session = self._load(upload_id)
+        return self._with_progress(session) if session else None
+    
+    def write_chunk(self, upload_id: str, index: int, stream: BinaryIO,
+                    checksum: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Write chunk number `index` from a readable stream
+        
+        Re-sending a chunk overwrites it, so interrupted chunks can simply be retried.
+        An optional SHA-256 of the chunk is verified before it counts as received.
+        """
+        session = self._require(upload_id)
+        if not 0 <= index < session['chunk_count']:
+            raise UploadSessionError(f"Chunk index out of range: {index}")
+        
+        offset = index * session['chunk_size']
+        expected = min(session['chunk_size'], session['total_size'] - offset)
+        session_dir = self.directory / upload_id
+        marker = session_dir / CHUNKS_DIR / str(index)
+        marker.unlink(missing_ok=True)
+        
+        sha256 = hashlib.sha256()
+        written = 0
+        with open(session_dir / DATA_FILE, 'r+b') as f:
+            f.seek(offset)
+            for block in iter(lambda: stream.read(STREAM_READ_SIZE), b''):
+                written += len(block)
+                if written > expected:
+                    raise UploadSessionError(f"Chunk {index} exceeds its expected size of {expected} bytes")
+                sha256.update(block)
+                f.write(block)
+        
+        if written != expected:
+            raise UploadSessionError(f"Chunk {index} is incomplete: {written} of {expected} bytes")
+        if checksum and sha256.hexdigest() != checksum.strip().lower():
+            raise UploadSessionError(f"Checksum mismatch for chunk {index}")
+        
+        marker.touch()
+        return self._with_progress(session)
+    
+    def verify(self, upload_id: str, checksum: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """
+        Check that all chunks arrived and compute the SHA-256 of the assembled file
+        
+        A whole-file checksum, if given, must match; clients that cannot hash
+        the complete file rely on the per-chunk checksums instead.
+        
+        Returns:
+            (session, file_hash)
+        """
+        session = self._with_progress(self._require(upload_id))
+        if session['missing_chunks']:
+            raise UploadSessionError(f"Missing chunks: {session['missing_chunks'][:20]}")
+        
+        sha256 = hashlib.sha256()
+        with open(self.directory / upload_id / DATA_FILE, 'rb') as f:
+            for block in iter(lambda: f.read(STREAM_READ_SIZE), b''):
+                sha256.update(block)
+        
+        file_hash = sha256.hexdigest()
+        if checksum and file_hash != checksum.strip().lower():
+            raise UploadSessionError("Checksum mismatch")
+        return session, file_hash
+    
+    def move_to(self, upload_id: str, target: Path) -> Path:
+        """Atomically move the assembled file into place and close the session."""
+        os.replace(self.directory / upload_id / DATA_FILE, target)
+        self.discard(upload_id)
+        return target
+    
+    def discard(self, upload_id: str) -> None:
+        """Delete a session and its data."""
+        if UPLOAD_ID_PATTERN.match(upload_id):
+            shutil.rmtree(self.directory / upload_id, ignore_errors=True)
+    
+    def expire_stale(self, max_age: Optional[int] = None) -> int:
+        """Remove sessions not touched for max_age seconds; returns the number removed."""
+        max_age = max_age if max_age is not None else Config.UPLOAD_SESSION_TTL
+        cutoff = time.time() - max_age
+        removed = 0
+        
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and UPLOAD_ID_PATTERN.match(entry.name):
+                data_file = Path(entry.path) / DATA_FILE
+                last_activity = data_file.stat().st_mtime if data_file.exists() else entry.stat().st_mtime
+                if last_activity < cutoff:
+                    self.discard(entry.name)
+                    removed += 1
+        
+        if removed:
+            self.logger.info(f"Expired {removed} stale upload sessions")
+        return removed
+    
+    def _load(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        if not UPLOAD_ID_PATTERN.match(upload_id):
+            return None
+        try:
+            return json.loads((self.directory / upload_id / SESSION_FILE).read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return None
+    
+    def _require(self, upload_id: str) -> Dict[str, Any]:
+        session = self._load(upload_id)
+        if session is None:
+            raise KeyError(upload_id)
+        return session
+    
+    def _with_progress(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        chunks_dir = self.directory / session['upload_id'] / CHUNKS_DIR
+        received = sorted(int(name) for name in os.listdir(chunks_dir) if name.isdigit())
+        received_set = set(received)
+        return {
+            **session,
+            'received_chunks': received,
+            'missing_chunks': [i for i in range(session['chunk_count']) if i not in received_set]
+        }
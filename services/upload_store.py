@@ -0,0 +1,100 @@
+"""
+Upload Storage Helpers for AITON-RAG
+
+Spools uploaded bytes to a hidden temp file in the upload directory while
+computing their SHA-256, so duplicates can be rejected before the file is
+renamed into place and the watcher never has to hash it again.
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+from typing import BinaryIO
+
+# Bytes read from an upload stream at a time
+STREAM_READ_SIZE = 64 * 1024
+
+# Document types accepted by the upload endpoints
+ALLOWED_EXTENSIONS = ('.pdf', '.docx', '.txt', '.html', '.md', '.htm', '.csv')
+
+# Temp files use a suffix the watcher ignores
+TEMP_PREFIX = '.upload-'
+TEMP_SUFFIX = '.part'
+
+class HashingSpoolFile:
+    """Writable temp file that hashes everything written to it."""
+    
+    def __init__(self, directory: Path):
+        self._file = tempfile.NamedTemporaryFile(
+            mode='w+b', dir=str(directory), prefix=TEMP_PREFIX, suffix=TEMP_SUFFIX, delete=False
+        )
+        self._sha256 = hashlib.sha256()
+        self.path = Path(self._file.name)
+        self.size = 0
+    
+    @classmethod
+    def from_stream(cls, stream: BinaryIO, directory: Path) -> 'HashingSpoolFile':
+        """Spool an arbitrary readable stream."""
+        spool = cls(directory)
+        try:
+            for chunk in iter(lambda: stream.read(STREAM_READ_SIZE), b''):
+                spool.write(chunk)
+        except BaseException:
+            spool.discard()
+            raise
+        return spool
+    
+    def write(self, data: bytes) -> int:
+        self._sha256.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+    
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+    
+    def tell(self) -> int:
+        return self._file.tell()
+    
+    def flush(self) -> None:
+        self._file.flush()
+    
+    def close(self) -> None:
+        self._file.close()
+    
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+    
+    def hexdigest(self) -> str:
+        """SHA-256 of all bytes written so far."""
+        return self._sha256.hexdigest()
+    
+    def move_to(self, target: Path) -> Path:
+        """Atomically rename the spooled file to its final path."""
+        self.close()
+        os.replace(self.path, target)
+        return target
+    
+    def discard(self) -> None:
+        """Close and delete the temp file."""
+        self.close()
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+def unique_upload_path(directory: Path, filename: str) -> Path:
+    """Return directory/filename, or a _1, _2, ... variant if the name is taken."""
+    file_path = Path(directory) / filename
+    
+    counter = 1
+    original_path = file_path
+    while file_path.exists():
+        file_path = Path(directory) / f"{original_path.stem}_{counter}{original_path.suffix}"
+        counter += 1
+    
+    return file_path
@@ -248,6 +248,7 @@ DEBUG=true
                 f.write("Test content for processing validation")
                 temp_file = f.name
             
+            result = None
             try:
                 result = processor.process_file(temp_file)
                 if result and 'content' in result and 'metadata' in result:
@@ -258,6 +259,8 @@ DEBUG=true
                     self.log("File processing returned invalid result", "error")
                     return False
             finally:
+                if result and result.get('markdown_file') is not None:
+                    result['markdown_file'].close()
                 os.unlink(temp_file)
                 
         except Exception as e:
@@ -6,8 +6,33 @@ document.addEventListener('DOMContentLoaded', function() {
     initializeFileUpload();
     initializeDragAndDrop();
     initializeFormValidation();
+    initializeEventStream();
 });
 
+// Live updates pushed by the server; polling is only the fallback
+let eventSource = null;
+
+function initializeEventStream() {
+    if (!window.EventSource) return;
+    
+    eventSource = new EventSource('/api/v1/events');
+    
+    eventSource.addEventListener('status', event => {
+        applyStats(JSON.parse(event.data));
+    });
+    
+    eventSource.addEventListener('ingest', event => {
+        const data = JSON.parse(event.data);
+        if (data.source === 'bulk') return;
+        
+        if (data.stage === 'completed') {
+            showAlert(`Processed: ${data.file}`, 'success');
+        } else if (data.stage === 'failed') {
+            showAlert(`Processing failed: ${data.file}`, 'danger');
+        }
+    });
+}
+
 function initializeFileUpload() {
     const uploadForm = document.getElementById('uploadForm');
     const uploadBtn = document.getElementById('uploadBtn');
@@ -33,24 +58,17 @@ function initializeFileUpload() {
         // Show loading state
         setUploadState(true);
         
-        // Create FormData and submit
-        const formData = new FormData();
-        formData.append('file', file);
-        
-        fetch('/api/upload', {
-            method: 'POST',
-            body: formData
-        })
-        .then(response => response.json())
+        sendFile(file)
         .then(data => {
-            if (data.success) {
+            if (data.success && data.duplicate) {
+                showAlert(`File already indexed: ${data.filename}`, 'info');
+                uploadForm.reset();
+            } else if (data.success) {
                 showAlert(`File uploaded successfully: ${data.filename}`, 'success');
                 uploadForm.reset();
                 
-                // Update stats if available
-                setTimeout(() => {
-                    updateStats();
-                }, 2000);
+                // Stats arrive via the event stream once the file is processed
+                refreshStatsLater();
             } else {
                 showAlert(`Upload failed: ${data.error}`, 'danger');
             }
@@ -130,23 +148,16 @@ function handleFiles(files) {
 }
 
 function uploadFile(file) {
-    const formData = new FormData();
-    formData.append('file', file);
-    
     // Create progress indicator
     const progressContainer = createProgressIndicator(file.name);
     
-    fetch('/api/upload', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
+    sendFile(file)
     .then(data => {
-        if (data.success) {
+        if (data.success && data.duplicate) {
+            updateProgressIndicator(progressContainer, 'success', `Already indexed: ${data.filename}`);
+        } else if (data.success) {
             updateProgressIndicator(progressContainer, 'success', `Uploaded: ${data.filename}`);
-            setTimeout(() => {
-                updateStats();
-            }, 2000);
+            refreshStatsLater();
         } else {
             updateProgressIndicator(progressContainer, 'error', `Error: ${data.error}`);
         }
@@ -157,8 +168,86 @@ function uploadFile(file) {
     });
 }
 
+// Files above this size use the resumable chunked upload protocol
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024; // 8MB
+const PARALLEL_CHUNKS = 3;
+const CHUNK_RETRIES = 3;
+
+function sendFile(file) {
+    if (file.size > CHUNKED_UPLOAD_THRESHOLD) {
+        return uploadInChunks(file);
+    }
+    
+    const formData = new FormData();
+    formData.append('file', file);
+    
+    return fetch('/api/upload', {
+        method: 'POST',
+        body: formData
+    })
+    .then(response => response.json());
+}
+
+async function uploadInChunks(file) {
+    const session = await fetch('/api/upload/sessions', {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({filename: file.name, size: file.size})
+    }).then(response => response.json());
+    
+    if (!session.success) {
+        return session;
+    }
+    
+    const pending = [...session.missing_chunks];
+    
+    async function sendChunk(index) {
+        const chunk = file.slice(index * session.chunk_size, (index + 1) * session.chunk_size);
+        const headers = {'Content-Type': 'application/octet-stream'};
+        
+        // crypto.subtle is only available in secure contexts (https, localhost)
+        if (window.crypto && crypto.subtle) {
+            const digest = await crypto.subtle.digest('SHA-256', await chunk.arrayBuffer());
+            headers['X-Chunk-SHA256'] = Array.from(new Uint8Array(digest))
+                .map(b => b.toString(16).padStart(2, '0')).join('');
+        }
+        
+        for (let attempt = 1; ; attempt++) {
+            try {
+                const response = await fetch(`/api/upload/sessions/${session.upload_id}/chunks/${index}`, {
+                    method: 'PUT',
+                    headers: headers,
+                    body: chunk
+                });
+                if (response.ok) return;
+                if (attempt >= CHUNK_RETRIES) throw new Error((await response.json()).error);
+            } catch (error) {
+                if (attempt >= CHUNK_RETRIES) throw error;
+            }
+        }
+    }
+    
+    async function worker() {
+        while (pending.length > 0) {
+            await sendChunk(pending.shift());
+        }
+    }
+    
+    try {
+        await Promise.all(Array.from({length: PARALLEL_CHUNKS}, worker));
+    } catch (error) {
+        return {success: false, error: `Chunk upload failed: ${error.message}`};
+    }
+    
+    return fetch(`/api/upload/sessions/${session.upload_id}/complete`, {
+        method: 'POST',
+        headers: {'Content-Type': 'application/json'},
+        body: JSON.stringify({})
+    }).then(response => response.json());
+}
+
 function validateFile(file) {
-    const maxSize = 10 * 1024 * 1024; // 10MB
+    const maxSize = 2 * 1024 * 1024 * 1024; // 2GB via chunked upload
     const allowedTypes = [
         'application/pdf',
         'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
@@ -167,11 +256,11 @@ function validateFile(file) {
         'text/markdown'
     ];
     
-    const allowedExtensions = ['.pdf', '.docx', '.txt', '.html', '.md', '.htm'];
+    const allowedExtensions = ['.pdf', '.docx', '.txt', '.html', '.md', '.htm', '.csv'];
     
     // Check file size
     if (file.size > maxSize) {
-        showAlert(`File too large: ${file.name}. Maximum size is 10MB.`, 'warning');
+        showAlert(`File too large: ${file.name}. Maximum size is 2GB.`, 'warning');
         return false;
     }
     
@@ -287,23 +376,35 @@ function showAlert(message, type = 'info') {
     }, 5000);
 }
 
+function refreshStatsLater() {
+    if (!eventSource) {
+        setTimeout(() => {
+            updateStats();
+        }, 2000);
+    }
+}
+
+function applyStats(stats) {
+    // Update file count
+    const fileCountElements = document.querySelectorAll('[data-stat="total_files"]');
+    fileCountElements.forEach(el => {
+        el.textContent = stats.total_processed_files || 0;
+    });
+    
+    // Update category count
+    const categoryCountElements = document.querySelectorAll('[data-stat="total_categories"]');
+    categoryCountElements.forEach(el => {
+        el.textContent = stats.knowledge_base_categories || 0;
+    });
+}
+
 function updateStats() {
     // Fetch updated stats and update the UI
     fetch('/api/v1/health')
         .then(response => response.json())
         .then(data => {
             if (data.success && data.stats) {
-                // Update file count
-                const fileCountElements = document.querySelectorAll('[data-stat="total_files"]');
-                fileCountElements.forEach(el => {
-                    el.textContent = data.stats.total_processed_files || 0;
-                });
-                
-                // Update category count
-                const categoryCountElements = document.querySelectorAll('[data-stat="total_categories"]');
-                categoryCountElements.forEach(el => {
-                    el.textContent = data.stats.knowledge_base_categories || 0;
-                });
+                applyStats(data.stats);
             }
         })
         .catch(error => {
@@ -330,6 +431,7 @@ function formatDate(dateString) {
 // Export functions for global use
 window.AITONRAG = {
     uploadFile,
+    sendFile,
     validateFile,
     showAlert,
     updateStats,
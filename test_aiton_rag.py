@@ -6,8 +6,10 @@ Complete end-to-end testing for all system components
 
 import os
 import sys
+import io
 import json
 import time
+import shutil
 import tempfile
 import unittest
 import requests
@@ -22,13 +24,85 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 # Import project modules
 from config import Config
-from services.file_processor import FileProcessor
+from services.file_processor import SANDBOX_SETTINGS, FileProcessor, _convert_in_worker
 from services.aggregator import Aggregator
 from services.file_watcher import FileWatcher
 from services.actions_api import ActionsAPI
+from services.catalog import DocumentCatalog
+from services.upload_store import HashingSpoolFile
+from services.upload_sessions import UploadSessionStore, UploadSessionError
+from services.bulk_import import BulkImporter
+from services.near_duplicates import MinHasher
+from services.rag_document import RagDocument, RagCorpus
+from services.streaming import negotiate_encoding, iter_json, compress_chunks
+from services.events import EventBroker
+from services.async_api import AsyncActionsApp
+from services.search_index import SearchIndex, SubstringIndex, TermDictionary, edit_distance
+from services.query_cache import QueryCache
+from services.positional_index import PositionalIndex, parse_query
+from services.metadata_columns import parse_range_filters
+from services.text_convert import FALLBACK_ENCODING, convert_text_file, detect_encoding
+from services.pdf_extract import extract_pdf_pages
+from services.pdf_backends import PdfminerBackend, get_backend, select_backend
+from services.converter_sandbox import ConverterSandbox, SandboxError
+from services.pagination import (
+    PaginationError, encode_cursor, decode_cursor, page_bounds, parse_fields, project
+)
 import app
 
 
+def write_text_pdf(path, texts):
+    """Minimal PDF with one line of Helvetica text per page"""
+    count = len(texts)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>",
+               ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+                   ' '.join(f"{4 + 2 * i} 0 R" for i in range(count)), count)).encode(),
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    for i, text in enumerate(texts):
+        stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode('latin-1')
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {5 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 3 0 R >> >> >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+    data = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b''.join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    path.write_bytes(bytes(data))
+
+
+class TempDataDirs:
+    """Catalog, knowledge base, RAG files and PDF page cache of every Config() in a temp directory"""
+    
+    PATHS = {
+        'CATALOG_DB': 'catalog.db',
+        'KNOWLEDGE_BASE_DIR': 'knowledge_base',
+        'PDF_PAGE_CACHE_DIR': 'pdf_pages',
+        'RAG_DATA_DIR': 'rag',
+        'RAG_DIR': 'rag'
+    }
+    
+    def __init__(self):
+        self.root = Path(tempfile.mkdtemp())
+        self._patches = [mock.patch.object(Config, name, self.root / path) for name, path in self.PATHS.items()]
+    
+    def start(self):
+        (self.root / 'knowledge_base').mkdir()
+        (self.root / 'rag').mkdir()
+        for patch in self._patches:
+            patch.start()
+        return self
+    
+    def stop(self):
+        for patch in self._patches:
+            patch.stop()
+        shutil.rmtree(self.root, ignore_errors=True)
+
+
 class TestConfig(unittest.TestCase):
     """Test configuration management"""
     
@@ -51,8 +125,15 @@ class TestFileProcessor(unittest.TestCase):
     """Test file processing functionality"""
     
     def setUp(self):
+        self.data_dirs = TempDataDirs().start()
         self.processor = FileProcessor()
         self.test_dir = tempfile.mkdtemp()
+        # Spooled conversions stay out of the real RAG directory
+        self.processor.config.RAG_DIR = Path(self.test_dir)
+    
+    def tearDown(self):
+        self.data_dirs.stop()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
     
     def test_supported_formats(self):
         """Test supported file format detection"""
@@ -95,14 +176,402 @@ class TestFileProcessor(unittest.TestCase):
         # Second file should be detected as duplicate
         self.assertIsNotNone(result1)
         self.assertIsNone(result2)  # Should be None for duplicate
+    
+    def test_upload_hash_claim(self):
+        """Test streamed upload hashing and early duplicate rejection"""
+        import hashlib, io
+        payload = b"Uploaded content " * 10000
+        spool = HashingSpoolFile.from_stream(io.BytesIO(payload), Path(self.test_dir))
+        spool.close()
+        self.assertEqual(spool.hexdigest(), hashlib.sha256(payload).hexdigest())
+        self.assertEqual(spool.size, len(payload))
+        
+        target = Path(self.test_dir) / 'upload.txt'
+        self.assertTrue(self.processor.claim_upload_hash(target, spool.hexdigest(), spool.size))
+        # Same content again while the first upload is pending
+        self.assertFalse(self.processor.claim_upload_hash(Path(self.test_dir) / 'again.txt', spool.hexdigest(), spool.size))
+        
+        spool.move_to(target)
+        self.assertTrue(target.exists())
+        self.assertFalse(spool.path.exists())
+        
+        # The watcher reuses the upload hash instead of re-reading the file
+        with mock.patch.object(self.processor, '_generate_file_hash') as generate:
+            result = self.processor.process_file(target)
+        generate.assert_not_called()
+        self.assertEqual(result['file_hash'], spool.hexdigest())
+        
+        # Claims of uploads that never reach processing are released
+        missing = Path(self.test_dir) / 'missing.txt'
+        self.assertTrue(self.processor.claim_upload_hash(missing, 'f' * 64, 1))
+        self.assertIsNone(self.processor.process_file(missing))
+        self.assertTrue(self.processor.claim_upload_hash(missing, 'f' * 64, 1))
+        self.assertEqual(self.processor.release_upload_hash(missing), ('f' * 64, 1))
+        self.assertFalse(self.processor.is_known_hash('f' * 64))
+    
+    def test_streamed_text_conversion(self):
+        """Test sampled encoding detection and spooled text conversion"""
+        path = Path(self.test_dir) / 'export.txt'
+        path.write_bytes(('ÜBERSICHT\r\n\r\nGröße ' + 'x' * 70000 + ' Maß\n').encode('cp1252'))
+        self.assertNotEqual(detect_encoding(path), 'utf-8')
+        
+        result = self.processor.process_file(path)
+        spool = result['markdown_file'].path
+        self.assertTrue(spool.name.endswith('.md.part'))
+        with open(spool, encoding='utf-8') as f:
+            self.assertEqual(f.read(30), '## ÜBERSICHT\n\nGröße xxxxxxxxxx')
+        
+        with mock.patch.object(self.processor.catalog, 'add_document'), \
+                mock.patch.object(self.processor.catalog, 'add_signature'):
+            rag_path = self.processor.save_to_rag(result)
+        self.assertTrue(rag_path.read_text(encoding='utf-8').endswith(' Maß\n\n'))
+        self.assertFalse(spool.exists())
+        
+        # An ASCII sample only guesses UTF-8; the rest is re-detected at the first invalid byte
+        path.write_bytes(b'a' * 70000 + '\nGröße Übersicht\n'.encode('cp1252'))
+        self.assertEqual(detect_encoding(path), 'utf-8')
+        target = io.StringIO()
+        self.assertEqual(convert_text_file(path, target), FALLBACK_ENCODING)
+        self.assertTrue(target.getvalue().endswith('\nGröße Übersicht\n'))
+        
+        # Results that are never saved do not leave their spool file behind
+        path.write_bytes(b'Anderer Inhalt ' * 10000)
+        spool = self.processor.process_file(path)['markdown_file'].path
+        self.assertFalse(spool.exists())
+        
+        # A batch saves what it processed
+        batch_dir = Path(self.test_dir) / 'batch'
+        batch_dir.mkdir()
+        (batch_dir / 'notiz.txt').write_text('Notiz ' * 20000, encoding='utf-8')
+        with mock.patch.object(self.processor.catalog, 'add_document'), \
+                mock.patch.object(self.processor.catalog, 'add_signature'):
+            batch = self.processor.process_batch(batch_dir)
+        self.assertEqual([Path(item['file_path']).name for item in batch], ['notiz.txt'])
+        self.assertTrue(batch[0]['rag_path'].exists())
+        self.assertEqual(list(Path(self.test_dir).glob('.*.md.part')), [])
+    
+    def test_csv_conversion(self):
+        """Test delimiter detection and chunked Markdown tables of CSV files"""
+        path = Path(self.test_dir) / 'buchungen.csv'
+        path.write_text('Name;Betrag;Notiz\r\nMüller;12,50;"zwei\nZeilen | Pipe"\r\n\r\nSchmidt;7;\r\nKurz\r\n',
+                        encoding='utf-8')
+        with mock.patch.object(self.processor.config, 'CSV_CHUNK_ROWS', 2):
+            spool = self.processor._convert_to_markdown(path)
+        self.assertTrue(spool.name.endswith('.md.part'))
+        header = '| Name | Betrag | Notiz |\n| --- | --- | --- |\n'
+        self.assertEqual(spool.read_text(encoding='utf-8'),
+                         '## Zeilen 1–2\n\n' + header + '| Müller | 12,50 | zwei Zeilen \\| Pipe |\n| Schmidt | 7 |  |\n\n'
+                         '## Zeilen 3–3\n\n' + header + '| Kurz |  |  |\n\n')
+        self.processor._discard_spool(spool)
+    
+    def test_parallel_pdf_extraction(self):
+        """Test page-parallel PDF extraction resuming from the page cache"""
+        import io
+        path = Path(self.test_dir) / 'handbuch.pdf'
+        write_text_pdf(path, ['Abschnitt 0', 'Abschnitt 1', '', 'Abschnitt 3', 'Abschnitt 4'])
+        sequential = self.processor._convert_pdf_to_markdown(path)
+        self.assertTrue(sequential.startswith('## Seite 1\n\nAbschnitt 0\n\n## Seite 2'))
+        
+        # An interrupted run left page 1 and a record cut off mid-write
+        cache_dir = Path(self.test_dir) / 'pages' / 'abc'
+        cache_dir.mkdir(parents=True)
+        (cache_dir / 'pages-000000.jsonl').write_text(
+            '{"page": 1, "text": "Abschnitt 1 (Cache)"}\n{"page": 0, "te', encoding='utf-8'
+        )
+        output = io.StringIO()
+        self.assertEqual(extract_pdf_pages(path, output, cache_dir, workers=2, range_size=2), 5)
+        self.assertEqual(output.getvalue(), sequential.replace('Abschnitt 1\n', 'Abschnitt 1 (Cache)\n'))
+        self.assertFalse(cache_dir.exists())
+        
+        with mock.patch.object(self.processor.config, 'PDF_PARALLEL_MIN_PAGES', 5), \
+                mock.patch.object(self.processor.config, 'PDF_WORKERS', 2), \
+                mock.patch.object(self.processor, '_convert_pdf_parallel') as parallel:
+            self.processor._convert_to_markdown(path, 'abc')
+        parallel.assert_called_once_with(path, 'abc', mock.ANY)
+    
+    def test_pdf_backend_selection(self):
+        """Test per-document PDF backend routing by page count and text density"""
+        dense = Path(self.test_dir) / 'bericht.pdf'
+        write_text_pdf(dense, ['Fliesstext ' * 30, 'Seite zwei'])
+        sparse = Path(self.test_dir) / 'scan.pdf'
+        write_text_pdf(sparse, ['Deckblatt', 'Fliesstext ' * 30])
+        
+        backend, pages = select_backend(dense)
+        self.assertEqual((backend.name, pages), ('pypdf2', 2))
+        self.assertEqual(list(backend.iter_pages(dense, 1)), ['Seite zwei'])
+        
+        # A layout-aware backend gets text-dense documents, the fastest one the rest
+        with mock.patch.object(PdfminerBackend, 'available', return_value=True):
+            self.assertEqual(select_backend(dense)[0].name, 'pdfminer')
+            self.assertEqual(select_backend(sparse)[0].name, 'pypdf2')
+            with mock.patch('services.pdf_backends.LARGE_DOCUMENT_PAGES', 2):
+                self.assertEqual(select_backend(dense)[0].name, 'pypdf2')
+        
+        self.assertRaises(ValueError, get_backend, 'unbekannt')
+        with mock.patch.object(self.processor.config, 'PDF_BACKEND', 'pypdf2'):
+            self.assertTrue(self.processor._convert_pdf_to_markdown(dense).endswith('## Seite 2\n\nSeite zwei\n'))
+    
+    def test_docx_conversion(self):
+        """Test streamed DOCX conversion of headings, lists and tables"""
+        from docx import Document as DocxDocument
+        document = DocxDocument()
+        document.add_heading('Kapitel', 2)
+        document.add_paragraph('Punkt', style='List Bullet')
+        document.add_paragraph('Schritt', style='List Number')
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text = 'Name'
+        table.cell(0, 1).text = 'Wert'
+        table.cell(1, 0).text = 'a|b'
+        table.cell(1, 1).text = '1'
+        document.add_paragraph('Ende')
+        path = Path(self.test_dir) / 'test.docx'
+        document.save(path)
+        
+        markdown = self.processor._convert_docx_to_markdown(path)
+        self.assertEqual(markdown, '## Kapitel\n\n- Punkt\n1. Schritt\n\n'
+                                   '| Name | Wert |\n| --- | --- |\n| a\\|b | 1 |\n\nEnde\n')
+    
+    def test_html_conversion(self):
+        """Test charset sniffing and boilerplate stripping of saved web pages"""
+        page = ('<html><head><meta charset="windows-1252"><title>Größen</title><script>var x;</script></head>'
+                '<body><nav><a href="/">Start</a></nav><main><p>Maße &amp; <b>Gewichte</b><br>'
+                '<a href="/liste">Liste</a></p><ul><li>Eins<ol><li>Zwei</li></ol></li></ul>'
+                '<div hidden>versteckt</div></main><footer>Impressum</footer></body></html>')
+        path = Path(self.test_dir) / 'page.html'
+        path.write_bytes(page.encode('cp1252'))
+        
+        markdown = self.processor._convert_html_to_markdown(path)
+        self.assertEqual(markdown, '# Größen\n\nMaße & **Gewichte**\n[Liste](/liste)\n\n- Eins\n  1. Zwei\n')
+        
+        # Pages wrapped in a <form> keep their content, only the controls are dropped
+        path.write_text('<body><form><div><h2>Reisekosten</h2><p>Antrag…</p></div>'
+                        '<input name="betrag"><button>Senden</button></form></body>', encoding='utf-8')
+        self.assertEqual(self.processor._convert_html_to_markdown(path), '## Reisekosten\n\nAntrag…\n')
+    
+    def test_near_duplicate_detection(self):
+        """Test MinHash/LSH near-duplicate detection against the catalog"""
+        self.processor.catalog = DocumentCatalog(Path(self.test_dir) / 'catalog.db')
+        words = [f"wort{i % 97} begriff{i % 13}" for i in range(150)]
+        variants = {
+            'original.txt': ' '.join(words),
+            'revision.txt': ' '.join(words[:70] + ['geändert'] + words[71:]),
+            'other.txt': ' '.join(f"anderes{i}" for i in range(300))
+        }
+        for name, text in variants.items():
+            Path(self.test_dir, name).write_text(text, encoding='utf-8')
+        
+        original = self.processor.process_file(Path(self.test_dir, 'original.txt'))
+        self.assertNotIn('duplicate_of', original)
+        signature = original['minhash']
+        self.processor.catalog.add_signature('original.md', MinHasher.to_bytes(signature),
+                                             self.processor.minhasher.band_hashes(signature))
+        
+        revision = self.processor.process_file(Path(self.test_dir, 'revision.txt'))
+        self.assertEqual(revision['duplicate_of'], 'original.md')
+        self.assertGreaterEqual(revision['duplicate_similarity'], 0.9)
+        self.assertNotIn('duplicate_of', self.processor.process_file(Path(self.test_dir, 'other.txt')))
+        
+        Path(self.test_dir, 'revision.txt').write_text(variants['revision.txt'] + ' ende', encoding='utf-8')
+        with mock.patch.object(self.processor.config, 'NEAR_DUPLICATE_ACTION', 'skip'):
+            self.assertIsNone(self.processor.process_file(Path(self.test_dir, 'revision.txt')))
+
+
+class TestUploadSessions(unittest.TestCase):
+    """Test resumable chunked uploads"""
+    
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.store = UploadSessionStore(self.test_dir / 'sessions', chunk_size=1000, max_size=10 ** 6)
+    
+    def test_chunk_size_limit(self):
+        """Test the advertised chunk size fits into one request"""
+        store = UploadSessionStore(self.test_dir / 'large', chunk_size=Config.MAX_FILE_SIZE + 1)
+        self.assertEqual(store.create('manual.pdf', 100)['chunk_size'], Config.MAX_FILE_SIZE)
+    
+    def test_out_of_order_chunks(self):
+        """Test assembling chunks sent in any order"""
+        import hashlib, io
+        payload = os.urandom(2500)
+        session = self.store.create('manual.pdf', len(payload))
+        self.assertEqual(session['chunk_count'], 3)
+        
+        for index in (2, 0):
+            chunk = payload[index * 1000:(index + 1) * 1000]
+            self.store.write_chunk(session['upload_id'], index, io.BytesIO(chunk),
+                                   hashlib.sha256(chunk).hexdigest())
+        
+        # Resume: only the middle chunk is missing
+        self.assertEqual(self.store.get(session['upload_id'])['missing_chunks'], [1])
+        with self.assertRaises(UploadSessionError):
+            self.store.verify(session['upload_id'])
+        with self.assertRaises(UploadSessionError):
+            self.store.write_chunk(session['upload_id'], 1, io.BytesIO(payload[1000:1500]))
+        
+        self.store.write_chunk(session['upload_id'], 1, io.BytesIO(payload[1000:2000]))
+        with self.assertRaises(UploadSessionError):
+            self.store.verify(session['upload_id'], '0' * 64)
+        
+        _, file_hash = self.store.verify(session['upload_id'], hashlib.sha256(payload).hexdigest())
+        target = self.store.move_to(session['upload_id'], self.test_dir / 'manual.pdf')
+        self.assertEqual(target.read_bytes(), payload)
+        self.assertEqual(file_hash, hashlib.sha256(payload).hexdigest())
+        self.assertIsNone(self.store.get(session['upload_id']))
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test bulk import of archives"""
+    
+    def setUp(self):
+        self.data_dirs = TempDataDirs().start()
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.processor = FileProcessor()
+        self.processor.config.RAG_DIR = self.test_dir
+        self.processor.save_to_rag = lambda processed: self.test_dir / f"{processed['metadata']['filename']}.md"
+        self.importer = BulkImporter(self.processor, ['.txt', '.md'], staging_dir=self.test_dir / 'staging')
+    
+    def tearDown(self):
+        self.data_dirs.stop()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+    
+    def _archive_entries(self):
+        unique = str(time.time())
+        return [
+            ('docs/a.txt', f'First document {unique}'.encode()),
+            ('docs/copy-of-a.txt', f'First document {unique}'.encode()),
+            ('docs/b.md', f'# Second document {unique}'.encode()),
+            ('docs/image.png', b'not a document'),
+            ('__MACOSX/docs/._a.txt', b'resource fork')
+        ]
+    
+    def test_zip_import(self):
+        """Test zip entries are filtered, de-duplicated and processed"""
+        import io, zipfile
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w') as zf:
+            for name, data in self._archive_entries():
+                zf.writestr(name, data)
+        buffer.seek(0)
+        
+        result = self.importer.import_stream(buffer, 'application/zip')
+        self.assertEqual(result['counts'], {'processed': 2, 'duplicate': 1, 'skipped': 1, 'failed': 0})
+        self.assertEqual(list((self.test_dir / 'staging').iterdir()), [])
+    
+    def test_tar_stream_import(self):
+        """Test compressed tar streams are imported sequentially"""
+        import io, tarfile
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz') as tf:
+            for name, data in self._archive_entries():
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tf.addfile(info, io.BytesIO(data))
+        buffer.seek(0)
+        
+        result = self.importer.import_stream(buffer, 'application/gzip')
+        self.assertEqual(result['counts']['processed'], 2)
+        self.assertEqual(result['counts']['duplicate'], 1)
+
+
+class TestDocumentCatalog(unittest.TestCase):
+    """Test the SQLite document metadata catalog"""
+    
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.catalog = DocumentCatalog(self.test_dir / 'catalog.db')
+        for i in range(5):
+            self.catalog.add_document(self.test_dir / f'doc_{i}_abcd1234.md', {
+                'file_hash': f'hash{i}',
+                'processed_at': f'2024-01-0{i + 1}T10:00:00',
+                'metadata': {
+                    'filename': f'doc_{i}.pdf' if i % 2 else f'doc_{i}.txt',
+                    'file_size': 100 * i,
+                    'mime_type': 'application/pdf' if i % 2 else 'text/plain',
+                    'created_at': '2024-01-01T00:00:00'
+                }
+            })
+    
+    def test_recent_ordering_and_filters(self):
+        """Test sort-by-recency and indexed filters"""
+        recent = self.catalog.recent_documents(limit=2)
+        self.assertEqual([doc['rag_filename'] for doc in recent],
+                         ['doc_4_abcd1234.md', 'doc_3_abcd1234.md'])
+        self.assertEqual(self.catalog.count(mime_type='application/pdf'), 2)
+        # Comma separated alternatives, as for the search filters
+        self.assertEqual(self.catalog.count(mime_type='application/pdf, Text/Plain'), 5)
+        self.assertTrue(self.catalog.has_hash('hash3'))
+        self.assertFalse(self.catalog.has_hash('unknown'))
+    
+    def test_range_filters(self):
+        """Test date, size and extension filters on the catalog"""
+        ranges = parse_range_filters({'processed_after': '2024-01-02', 'max_size': '300'})
+        docs = self.catalog.list_documents(ranges=ranges)
+        self.assertEqual([doc['rag_filename'] for doc in docs],
+                         ['doc_1_abcd1234.md', 'doc_2_abcd1234.md', 'doc_3_abcd1234.md'])
+        self.assertEqual(self.catalog.count(extension='pdf', ranges=ranges), 2)
+        with self.assertRaises(ValueError):
+            parse_range_filters({'processed_before': 'yesterday'})
+    
+    def test_keyset_pagination(self):
+        """Test that keyset pages cover the catalog exactly once"""
+        seen = []
+        after = None
+        while True:
+            page = self.catalog.list_documents(limit=2, after=after, sort='recent')
+            if not page:
+                break
+            seen.extend(doc['rag_filename'] for doc in page)
+            after = DocumentCatalog.sort_key(page[-1], 'recent')
+        self.assertEqual(len(seen), 5)
+        self.assertEqual(len(set(seen)), 5)
+    
+    def test_category_update(self):
+        """Test category assignment from the aggregator"""
+        self.catalog.update_categories({'doc_0_abcd1234.md': 'processes'})
+        docs = self.catalog.list_documents(category='processes')
+        self.assertEqual([doc['rag_filename'] for doc in docs], ['doc_0_abcd1234.md'])
+
+
+class TestRagDocument(unittest.TestCase):
+    """Test lazy RAG document handles"""
+    
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.body = "Übersicht Prozessschritte Antrag " * 5000
+        self.path = self.test_dir / 'doc_1234abcd.md'
+        self.path.write_text(f"---\nfilename: doc.pdf\nfile_hash: abc\n---\n\n{self.body}\n", encoding='utf-8')
+    
+    def test_header_and_prefix(self):
+        """Test frontmatter parsing and bounded prefix reads"""
+        document = RagDocument(self.path)
+        self.assertEqual(document.metadata, {'filename': 'doc.pdf', 'file_hash': 'abc'})
+        self.assertEqual(document.read_prefix(9), 'Übersicht')
+        self.assertEqual(document.content, self.body.strip())
+    
+    def test_streamed_words(self):
+        """Test that streamed words match a full read across chunk boundaries"""
+        import re
+        document = RagDocument(self.path)
+        self.assertEqual(list(document.iter_words()), re.findall(r'\w+', self.body.lower()))
+        self.assertTrue(document.contains_any(['antrag']))
+        self.assertFalse(document.contains_any(['definition']))
+    
+    def test_corpus_is_reiterable(self):
+        """Test that the corpus yields fresh handles on every pass"""
+        corpus = RagCorpus.from_directory(self.test_dir)
+        self.assertEqual(len(corpus), 1)
+        self.assertEqual([doc.filename for doc in corpus], [doc.filename for doc in corpus])
 
 
 class TestAggregator(unittest.TestCase):
     """Test knowledge aggregation and API optimization"""
     
     def setUp(self):
+        self.data_dirs = TempDataDirs().start()
         self.aggregator = Aggregator()
     
+    def tearDown(self):
+        self.data_dirs.stop()
+    
     @mock.patch('openai.ChatCompletion.create')
     def test_content_categorization(self, mock_openai):
         """Test content categorization"""
@@ -132,10 +601,14 @@ class TestActionsAPI(unittest.TestCase):
     """Test Custom GPT Actions API"""
     
     def setUp(self):
+        self.data_dirs = TempDataDirs().start()
         self.api = ActionsAPI()
         self.app = self.api.app
         self.client = self.app.test_client()
     
+    def tearDown(self):
+        self.data_dirs.stop()
+    
     def test_health_endpoint(self):
         """Test API health check"""
         response = self.client.get('/health')
@@ -168,6 +641,495 @@ class TestActionsAPI(unittest.TestCase):
         self.assertIn('categories', data)
 
 
+class TestAsyncAPI(unittest.TestCase):
+    """Test the ASGI serving mode"""
+    
+    def setUp(self):
+        self.data_dirs = TempDataDirs().start()
+        kb_dir = Config.KNOWLEDGE_BASE_DIR
+        knowledge_base = {"action_response": {"data": {"knowledge_base": {
+            "categories": {
+                "processes": {"documents": ["onboarding.md", "billing.md"]},
+                "reference": {"documents": ["glossary.md"]}
+            },
+            "documents": [
+                {"filename": "onboarding.md", "content_preview": "Steps for the onboarding workflow",
+                 "metadata": {"filename": "onboarding.docx"}},
+                {"filename": "billing.md", "content_preview": "Monthly billing workflow and invoices"},
+                {"filename": "glossary.md", "content_preview": "Definitions of terms"}
+            ]
+        }}}}
+        (kb_dir / 'knowledge_base.json').write_text(json.dumps(knowledge_base), encoding='utf-8')
+        
+        self.api = ActionsAPI()
+        self.asgi_app = AsyncActionsApp(self.api, max_workers=2)
+    
+    def tearDown(self):
+        self.data_dirs.stop()
+    
+    def _get(self, path, query=b''):
+        import asyncio
+        scope = {'type': 'http', 'method': 'GET', 'path': path, 'query_string': query, 'headers': []}
+        responses = [[] for _ in range(5)]
+        
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+        
+        async def request(messages):
+            async def send(message):
+                messages.append(message)
+            await self.asgi_app(scope, receive, send)
+        
+        async def run():
+            # Concurrent requests share one non-blocking knowledge base load
+            await asyncio.gather(*[request(messages) for messages in responses])
+        
+        asyncio.run(run())
+        start, *body = responses[0]
+        # The body arrives in chunks, the last message closes it
+        self.assertEqual([message.get('more_body') for message in body], [True] * (len(body) - 1) + [False])
+        self.last_chunks = len(body) - 1
+        return start['status'], json.loads(b''.join(message['body'] for message in body))
+    
+    def test_search(self):
+        """Test search runs on the event loop with ranked results"""
+        status, data = self._get('/api/v1/search', b'query=onboarding+workflow')
+        self.assertEqual(status, 200)
+        self.assertEqual([r['title'] for r in data['results']], ['onboarding.md', 'billing.md'])
+        self.assertEqual(data['results'][0]['source_file'], 'onboarding.docx')
+        
+        status, data = self._get('/api/v1/search')
+        self.assertEqual(status, 400)
+    
+    def test_knowledge_base_page(self):
+        """Test paginated knowledge base through the ASGI app"""
+        status, data = self._get('/api/v1/knowledge-base', b'limit=2&fields=title')
+        self.assertEqual(status, 200)
+        self.assertEqual(data['knowledge_base'], {'processes': [{'title': 'billing.md'}, {'title': 'onboarding.md'}]})
+        self.assertTrue(data['pagination']['has_more'])
+    
+    def test_chunked_body(self):
+        """Test large responses are sent as several body messages"""
+        payload = {'files': [{'filename': f"datei_{i}.md", 'category': 'reference' * 20} for i in range(2000)]}
+        with mock.patch.object(self.api, 'build_files_response', return_value=(payload, 200)):
+            status, data = self._get('/api/v1/files')
+        self.assertEqual(status, 200)
+        self.assertEqual(data, payload)
+        self.assertGreater(self.last_chunks, 1)
+
+
+class TestSearchIndex(unittest.TestCase):
+    """Test the inverted search index and batch search"""
+    
+    def setUp(self):
+        self.data_dirs = TempDataDirs().start()
+        self.index = SearchIndex([
+            {'title': 'billing.md', 'category': 'processes', 'source_file': 'billing.md',
+             'content': 'Monthly billing workflow and invoices'},
+            {'title': 'glossary.md', 'category': 'reference', 'source_file': 'glossary.md',
+             'content': 'Definitions of terms used in billing'},
+            {'title': 'onboarding.md', 'category': 'processes', 'source_file': 'onboarding.md',
+             'content': 'Steps for the onboarding workflow'}
+        ])
+    
+    def tearDown(self):
+        self.data_dirs.stop()
+    
+    def test_search(self):
+        """Test ranking, partial word matches and category filter"""
+        results = self.index.search('billing workflow')
+        self.assertEqual([r['title'] for r in results], ['billing.md', 'glossary.md', 'onboarding.md'])
+        self.assertEqual(results[0]['relevance_score'], 0.667)
+        self.assertEqual([r['title'] for r in self.index.search('invoice')], ['billing.md'])
+        self.assertEqual([r['title'] for r in self.index.search('billing', category='reference')], ['glossary.md'])
+        self.assertEqual(self.index.search('!!'), [])
+    
+    def test_batch_matches_single_queries(self):
+        """Test a batch returns the same results as separate searches"""
+        queries = [
+            {'query': 'billing workflow'},
+            {'query': 'workflow', 'category': 'processes', 'limit': 1},
+            {'query': 'billing workflow', 'limit': 2},
+            {'query': 'terms'}
+        ]
+        batch = self.index.search_batch(queries)
+        single = [self.index.search(q['query'], q.get('category'), q.get('limit', 10)) for q in queries]
+        self.assertEqual(batch, single)
+        self.assertEqual(len(batch[2]), 2)
+    
+    def test_substring_lookup(self):
+        """Test the n-gram index finds the same words as a substring scan"""
+        words = sorted({f"{a}{b}{c}" for a in ('ab', 'ba', 'abc') for b in ('', 'x', 'cab') for c in ('a', 'bb', '')})
+        vocabulary = SubstringIndex(words)
+        for term in ('a', 'ab', 'abc', 'cab', 'abca', 'xcab', 'bcabb', 'zz', 'abcabcabcabb', ''):
+            self.assertEqual(vocabulary.lookup(term), [word for word in words if term and term in word])
+    
+    def test_term_completion(self):
+        """Test prefix completion ranked by document frequency"""
+        self.assertEqual(self.index.terms.complete('b', 5), [('billing', 2)])
+        self.assertEqual(self.index.terms.complete('WORK'), [('workflow', 2)])
+        self.assertEqual(self.index.terms.complete('zz'), [])
+        
+        frequencies = {f'term{i}': (i * 7) % 13 for i in range(200)}
+        dictionary = TermDictionary(frequencies)
+        dictionary.save(self.data_dirs.root / 'terms.bin')
+        loaded = TermDictionary.load(self.data_dirs.root / 'terms.bin')
+        for prefix in ('term1', 'term', 'term19', 'term5'):
+            expected = sorted((t, f) for t, f in frequencies.items() if t.startswith(prefix))
+            expected.sort(key=lambda item: -item[1])
+            self.assertEqual(dictionary.complete(prefix, 7), expected[:7])
+            self.assertEqual(loaded.complete(prefix, 7), expected[:7])
+        self.assertIsNone(TermDictionary.load(self.data_dirs.root / 'missing.bin'))
+    
+    def test_full_corpus_completion(self):
+        """Test completion covers the full documents, not only the previews"""
+        rag_dir = Config.RAG_DIR
+        (rag_dir / 'billing.md').write_text('---\nfilename: billing.pdf\n---\n\n' + 'Rechnung ' * 100 + 'Mahnlauf Vertrage',
+                                            encoding='utf-8')
+        (rag_dir / 'glossary.md').write_text('---\nfilename: glossary.pdf\n---\n\nMahnung und Mahnlauf, Vertrag',
+                                             encoding='utf-8')
+        aggregator = Aggregator()
+        aggregator.aggregate_knowledge_base()
+        
+        self.assertEqual(aggregator.suggest_terms('mahn'), [
+            {'term': 'mahnlauf', 'document_frequency': 2}, {'term': 'mahnung', 'document_frequency': 1}
+        ])
+        
+        # Suggested terms past the previews are searched, not corrected
+        self.assertEqual(aggregator.suggest_terms('vertrage'), [{'term': 'vertrage', 'document_frequency': 1}])
+        self.assertEqual(aggregator.query_corrections('vertrage'), {})
+        self.assertEqual({r['title'] for r in aggregator.search_content('vertrage')}, {'billing.md'})
+        self.assertEqual({r['title'] for r in aggregator.search_content('mahnlauf')}, {'billing.md', 'glossary.md'})
+        
+        # Typos are corrected to words of the document bodies, which are no typos themselves
+        index = aggregator._knowledge_snapshot()['index']
+        self.assertEqual(index.corrections('vertrage'), [])
+        self.assertEqual(aggregator.query_corrections('vertrahe'), {'vertrahe': ['vertrage']})
+    
+    def test_typo_tolerance(self):
+        """Test misspelled terms are matched within a bounded edit distance"""
+        self.assertEqual(edit_distance('defintion', 'definitions', 2), 2)
+        self.assertEqual(edit_distance('wrokflow', 'workflow', 2), 1)
+        self.assertEqual(edit_distance('abc', 'xyz', 1), 2)
+        
+        self.assertEqual(self.index.corrections('defintions'), ['definitions'])
+        self.assertEqual([r['title'] for r in self.index.search('wrokflow')], ['billing.md', 'onboarding.md'])
+        self.assertEqual(self.index.query_corrections('billing invocies xyz'), {'invocies': ['invoices']})
+        # Resolved terms are reused by later queries and the corrections of a query
+        with mock.patch.object(self.index.vocabulary, 'lookup') as lookup:
+            self.assertEqual(self.index.query_corrections('invocies'), {'invocies': ['invoices']})
+            self.index.search('billing invocies')
+        lookup.assert_not_called()
+        self.assertEqual(self.index.search('bil'), self.index.search('billing'))
+        self.assertEqual(self.index.search('xyz'), [])
+    
+    def test_phrase_and_near_queries(self):
+        """Test phrase and proximity clauses against the positional index"""
+        rag_dir = Path(tempfile.mkdtemp())
+        filler = 'text ' * 500
+        (rag_dir / 'billing.md').write_text(f"---\nfilename: billing.pdf\n---\n\n{filler} Antrag stellen bis Monatsende", encoding='utf-8')
+        (rag_dir / 'glossary.md').write_text("---\nfilename: glossary.pdf\n---\n\nstellen Sie den Antrag", encoding='utf-8')
+        PositionalIndex.build(RagCorpus.from_directory(rag_dir), rag_dir / 'positions.bin')
+        positions = PositionalIndex.load(rag_dir / 'positions.bin')
+        
+        # Spilling every document to a run file gives the same index
+        spilled = PositionalIndex.build(RagCorpus.from_directory(rag_dir), rag_dir / 'spilled.bin', spill_bytes=1)
+        self.assertEqual(sorted(rag_dir.iterdir()), [rag_dir / name for name in ('billing.md', 'glossary.md', 'positions.bin', 'spilled.bin')])
+        for word in ('antrag', 'stellen', 'text', 'sie'):
+            self.assertEqual(spilled.positions(word), positions.positions(word))
+        self.assertEqual(spilled.checkpoint(0, 510), positions.checkpoint(0, 510))
+        self.assertEqual(list(spilled.documents_with('antrag')), [0, 1])
+        self.assertEqual(list(positions.documents_with('monatsende')), [0])
+        self.assertEqual(positions.positions('fehlt'), {})
+        self.assertIsNone(PositionalIndex.load(rag_dir / 'billing.md'))
+        
+        self.assertEqual(positions.phrase_documents(['antrag', 'stellen']), {'billing.md'})
+        self.assertEqual(positions.near_documents('stellen', 'antrag', 3), {'billing.md', 'glossary.md'})
+        self.assertEqual(positions.near_documents('antrag', 'monatsende', 2), set())
+        
+        parsed = parse_query('"Antrag stellen" frist NEAR/2 ende')
+        self.assertEqual(parsed.terms, ['antrag', 'stellen', 'frist', 'ende'])
+        self.assertEqual((parsed.phrases, parsed.near), ([('antrag', 'stellen')], [('frist', 'ende', 2)]))
+        
+        index = SearchIndex(self.index.entries, positions=lambda: positions)
+        self.assertEqual([r['title'] for r in index.search('"antrag stellen"')], ['billing.md'])
+        self.assertEqual([r['title'] for r in index.search('antrag NEAR/3 stellen')], ['billing.md', 'glossary.md'])
+        self.assertEqual(index.search('"stellen antrag"'), [])
+    
+    def test_snippets(self):
+        """Test snippets are read from the checkpoint before the best match window"""
+        rag_dir = Path(tempfile.mkdtemp())
+        filler = 'Größe ' * 300
+        (rag_dir / 'billing.md').write_text(
+            f"---\nfilename: billing.pdf\n---\n\n{filler}Der Antrag,  bitte bis\nMonatsende stellen. {filler}",
+            encoding='utf-8'
+        )
+        positions = PositionalIndex.build(RagCorpus.from_directory(rag_dir), rag_dir / 'positions.bin')
+        document = RagDocument(rag_dir / 'billing.md')
+        
+        snippet = positions.snippet(document, ['antrag', 'monat'], size=8)
+        self.assertEqual(snippet, '… Größe Der **Antrag**, bitte bis **Monatsende** stellen. Größe …')
+        
+        # Words resolved during the search place and highlight the window (here a correction)
+        self.assertEqual(positions.snippet(document, ['antrga', 'monat'], size=8, matches={'antrga': ['antrag'], 'monat': ['monatsende']}), snippet)
+        self.assertIsNone(positions.snippet(document, ['antrga'], size=8))
+        self.assertIsNone(positions.snippet(document, ['fehlt']))
+        self.assertIsNone(positions.snippet(RagDocument(rag_dir / 'other.md'), ['antrag']))
+    
+    def test_facets(self):
+        """Test metadata filters and facet counts"""
+        metadata = [
+            {'filename': 'billing.pdf', 'mime_type': 'application/pdf', 'processed_at': '2024-05-02T10:00:00'},
+            {'filename': 'glossary.docx', 'mime_type': 'application/msword', 'processed_at': '2024-06-01T09:00:00'},
+            {'filename': 'onboarding.PDF', 'mime_type': 'application/pdf', 'processed_at': '2023-12-24T12:00:00'}
+        ]
+        index = SearchIndex(self.index.entries, metadata=metadata)
+        
+        search = index.facet_search('billing workflow', limit=1)
+        self.assertEqual(search['total_matches'], 3)
+        self.assertEqual(len(search['results']), 1)
+        self.assertEqual(search['facets']['extension'], {'.pdf': 2, '.docx': 1})
+        self.assertEqual(search['facets']['category'], {'processes': 2, 'reference': 1})
+        
+        titles = lambda **filters: [r['title'] for r in index.search('billing workflow', filters=filters)]
+        self.assertEqual(titles(extension='pdf'), ['billing.md', 'onboarding.md'])
+        self.assertEqual(titles(date='2024', mime_type='application/pdf'), ['billing.md'])
+        self.assertEqual(titles(date='2024-06,2023'), ['glossary.md', 'onboarding.md'])
+        self.assertEqual(titles(extension='txt'), [])
+        
+        ranges = lambda **args: [r['title'] for r in index.search('billing workflow', ranges=parse_range_filters(args))]
+        self.assertEqual(ranges(processed_after='2024-05-02T10:00:00'), ['billing.md', 'glossary.md'])
+        self.assertEqual(ranges(processed_before='2024-06-01', processed_after='2024-01-01'), ['billing.md'])
+        self.assertEqual(index.search('workflow', category='processes', filters={'extension': ['.pdf']}),
+                         index.search('workflow', filters={'category': 'processes'}))
+    
+    def test_batch_request_validation(self):
+        """Test batch search request parsing"""
+        parse = ActionsAPI._parse_batch_queries
+        parsed = parse({'queries': ['billing', {'id': 'b', 'query': 'billing', 'limit': 99}]})
+        self.assertEqual([(q['id'], q['limit']) for q in parsed], [('billing', 10), ('b', 50)])
+        for body in (None, {'queries': []}, {'queries': [{'query': ' '}]},
+                     {'queries': ['a', 'a']}, {'queries': ['x'] * 21}):
+            with self.assertRaises(ValueError):
+                parse(body)
+        
+        # The response echoes the filters of every query
+        body = {'queries': ['billing', {'id': 'pdf', 'query': 'billing', 'type': 'pdf', 'max_size': '1024'}]}
+        with mock.patch.object(Aggregator, 'search_batch', return_value=[[], []]):
+            response, status = ActionsAPI().build_search_batch_response(body)
+        self.assertEqual(status, 200)
+        self.assertEqual(response['results']['billing']['filters'], {})
+        self.assertEqual(response['results']['pdf']['filters'], {'type': 'pdf', 'max_size': '1024'})
+
+
+class TestQueryCache(unittest.TestCase):
+    """Test the search result cache"""
+    
+    def test_hits_and_generations(self):
+        """Test cached results are reused until the generation changes"""
+        cache = QueryCache(max_entries=2, ttl=60)
+        calls = []
+        compute = lambda: calls.append(1) or len(calls)
+        
+        self.assertEqual(cache.get_or_compute('a', 1, compute), 1)
+        self.assertEqual(cache.get_or_compute('a', 1, compute), 1)
+        self.assertEqual(cache.get_or_compute('a', 2, compute), 2)
+        cache.get_or_compute('b', 2, compute)
+        cache.get_or_compute('c', 2, compute)
+        self.assertEqual(cache.get_or_compute('a', 2, compute), 5)  # evicted (LRU)
+        
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 5, 2))
+    
+    def test_single_flight(self):
+        """Test concurrent identical misses compute once"""
+        cache = QueryCache()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'result'
+        
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('q', 1, compute)))
+                   for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while cache.stats()['coalesced'] < 3:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        self.assertEqual(results, ['result'] * 4)
+        self.assertEqual(len(calls), 1)
+
+
+class TestConverterSandbox(unittest.TestCase):
+    """Test isolated converter worker processes"""
+    
+    def setUp(self):
+        self.data_dirs = TempDataDirs().start()
+    
+    def tearDown(self):
+        self.data_dirs.stop()
+    
+    def test_limits_and_recycling(self):
+        """Test timeouts, memory limits, crashes and worker recycling"""
+        sandbox = ConverterSandbox(os.getpid, workers=1, timeout=30, max_tasks=2)
+        first, second, third = sandbox.run(), sandbox.run(), sandbox.run()
+        self.assertNotEqual(first, os.getpid())
+        self.assertEqual(first, second)
+        self.assertNotEqual(second, third)  # recycled after max_tasks
+        sandbox.close()
+        
+        failures = [
+            (ConverterSandbox(time.sleep, timeout=2), (60,), 'timeout'),
+            (ConverterSandbox(bytearray, memory_limit=512 * 1024 * 1024), (2 * 1024 ** 3,), 'memory'),
+            (ConverterSandbox(os._exit), (3,), 'crashed'),
+            (ConverterSandbox(int), ('kein int',), 'error')
+        ]
+        for sandbox, args, reason in failures:
+            with self.assertRaises(SandboxError) as raised:
+                sandbox.run(*args)
+            self.assertEqual(raised.exception.reason, reason)
+            # Only an exception in the target leaves the worker in the pool
+            self.assertEqual(len(sandbox._idle), 1 if reason == 'error' else 0)
+            sandbox.close()
+    
+    def test_quarantine(self):
+        """Test that files failing in the sandbox are quarantined and skipped"""
+        test_dir = self.data_dirs.root
+        processor = FileProcessor()
+        path = test_dir / 'endlos.txt'
+        path.write_text('Inhalt', encoding='utf-8')
+        
+        with mock.patch.object(processor.config, 'CONVERTER_WORKERS', 1), \
+                mock.patch.object(ConverterSandbox, 'run', side_effect=SandboxError('timeout', 'no result')) as run:
+            self.assertIsNone(processor.process_file(path))
+            self.assertIsNone(processor.process_file(path))
+        run.assert_called_once()
+        self.assertEqual(processor.catalog.quarantined()[0]['reason'], 'timeout: no result')
+        
+        self.assertTrue(processor.catalog.release(processor._generate_file_hash(path)))
+        self.assertEqual(processor.catalog.count_quarantined(), 0)
+        
+        # A converter exception is not quarantined, the file is tried again
+        with mock.patch.object(processor.config, 'CONVERTER_WORKERS', 1), \
+                mock.patch.object(ConverterSandbox, 'run', side_effect=SandboxError('error', 'ValueError')) as run:
+            self.assertIsNone(processor.process_file(path))
+            self.assertIsNone(processor.process_file(path))
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(processor.catalog.count_quarantined(), 0)
+    
+    def test_worker_processor(self):
+        """Test sandbox workers convert with the parent's settings and leave catalog and spools alone"""
+        settings = {name: getattr(Config, name) for name in SANDBOX_SETTINGS}
+        settings['RAG_DIR'] = self.data_dirs.root / 'worker_rag'
+        settings['RAG_DIR'].mkdir()
+        path = self.data_dirs.root / 'notiz.txt'
+        path.write_text('Notiz', encoding='utf-8')
+        
+        with mock.patch('services.file_processor.DocumentCatalog') as catalog, \
+                mock.patch.object(FileProcessor, '_remove_stale_spools') as remove_stale_spools, \
+                mock.patch('services.file_processor._worker_processor', None):
+            spool = _convert_in_worker(settings, str(path), None)
+        catalog.assert_not_called()
+        remove_stale_spools.assert_not_called()
+        self.assertEqual(Path(spool).parent, settings['RAG_DIR'])
+
+
+class TestStreaming(unittest.TestCase):
+    """Test streamed and compressed API serialization"""
+    
+    def test_encoding_negotiation(self):
+        """Test Accept-Encoding negotiation"""
+        self.assertEqual(negotiate_encoding('gzip, deflate, br'), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip;q=0.5, deflate'), 'deflate')
+        self.assertEqual(negotiate_encoding('gzip;q=0'), None)
+        self.assertEqual(negotiate_encoding(''), None)
+    
+    def test_streamed_json_roundtrip(self):
+        """Test chunked JSON encoding and gzip/deflate compression"""
+        import gzip
+        import zlib
+        payload = {'documents': [{'filename': f'doc_{i}.md', 'text': 'Prozess ' * 50} for i in range(200)]}
+        
+        chunks = list(iter_json(payload, chunk_size=1024))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b''.join(chunks)), payload)
+        
+        gzipped = b''.join(compress_chunks(iter_json(payload), 'gzip'))
+        self.assertEqual(json.loads(gzip.decompress(gzipped)), payload)
+        
+        deflated = b''.join(compress_chunks(iter_json(payload), 'deflate'))
+        self.assertEqual(json.loads(zlib.decompress(deflated)), payload)
+
+
+class TestEvents(unittest.TestCase):
+    """Test the server-sent events broker"""
+    
+    def test_publish_and_replay(self):
+        """Test fan-out to subscribers and Last-Event-ID replay"""
+        broker = EventBroker()
+        stream = broker.stream(initial={'id': 0, 'event': 'status', 'data': {'total_processed_files': 3}},
+                               heartbeat=0.01)
+        self.assertEqual(next(stream), 'retry: 5000\n\n')
+        self.assertIn('event: status', next(stream))
+        
+        first = broker.publish('ingest', {'stage': 'started', 'file': 'a.txt'})
+        broker.publish('ingest', {'stage': 'completed', 'file': 'a.txt'})
+        self.assertIn('"stage": "started"', next(stream))
+        self.assertIn('"stage": "completed"', next(stream))
+        self.assertEqual(next(stream), ': keepalive\n\n')
+        self.assertEqual(broker.subscriber_count, 1)
+        stream.close()
+        self.assertEqual(broker.subscriber_count, 0)
+        
+        # A reconnecting client only receives what it missed
+        replay = broker.subscribe(last_event_id=first)
+        self.assertEqual(replay.get_nowait()['data']['stage'], 'completed')
+        self.assertTrue(replay.empty())
+
+
+class TestPagination(unittest.TestCase):
+    """Test cursor pagination and field projection helpers"""
+    
+    def test_cursor_roundtrip(self):
+        """Test opaque cursor encoding"""
+        for key in ['Prüfbericht_1a2b.md', ['processes', 'Antrag stellen']]:
+            self.assertEqual(decode_cursor(encode_cursor(key)), key)
+        with self.assertRaises(PaginationError):
+            decode_cursor('not a cursor!')
+    
+    def test_keyset_pages(self):
+        """Test that consecutive pages cover the listing exactly once"""
+        keys = [f'doc_{i:04d}.md' for i in range(95)]
+        seen = []
+        after = None
+        while True:
+            start, end = page_bounds(keys, after, 10)
+            seen.extend(keys[start:end])
+            if end >= len(keys):
+                break
+            after = decode_cursor(encode_cursor(keys[end - 1]))
+        self.assertEqual(seen, keys)
+    
+    def test_field_projection(self):
+        """Test fields= validation and projection"""
+        fields = parse_fields('filename,file_hash', ['filename', 'file_hash', 'file_size'])
+        record = {'filename': 'a.md', 'file_hash': 'abc', 'file_size': '12'}
+        self.assertEqual(project(record, fields), {'filename': 'a.md', 'file_hash': 'abc'})
+        with self.assertRaises(PaginationError):
+            parse_fields('content', ['filename'])
+
+
 class TestFlaskApp(unittest.TestCase):
     """Test Flask application endpoints"""
     
@@ -198,10 +1160,15 @@ class TestIntegration(unittest.TestCase):
     """End-to-end integration tests"""
     
     def setUp(self):
+        self.data_dirs = TempDataDirs().start()
         self.test_dir = tempfile.mkdtemp()
         self.processor = FileProcessor()
         self.aggregator = Aggregator()
     
+    def tearDown(self):
+        self.data_dirs.stop()
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+    
     def test_full_workflow(self):
         """Test complete file upload to API workflow"""
         # 1. Create test file
@@ -309,8 +1276,19 @@ def main():
     test_classes = [
         TestConfig,
         TestFileProcessor,
+        TestUploadSessions,
+        TestBulkImport,
+        TestDocumentCatalog,
+        TestRagDocument,
         TestAggregator,
         TestActionsAPI,
+        TestAsyncAPI,
+        TestSearchIndex,
+        TestQueryCache,
+        TestConverterSandbox,
+        TestStreaming,
+        TestEvents,
+        TestPagination,
         TestFlaskApp,
         TestIntegration
     ]